@@ -15,7 +15,7 @@
 # - Scale bar in microns using 2bm:MCTOptics:ImagePixelSize (assumed µm/pixel)
 # - Shutter A/B buttons (no numeric text)
 # - IOC/Server status panel (centered header):
-#     * green/red dot for each ServerRunning PV
+#     * green/red dot for each ServerRunning PV (alarm rules, see alarm_rules.py)
 #     * status strings printed next to server status
 #
 # Usage:
@@ -23,6 +23,11 @@
 #   python 02bm_PV_monitor_plot.py --view          # EPICS+PVA, show window + save
 #   python 02bm_PV_monitor_plot.py --dummy         # Dummy PVs + synthetic image
 #   python 02bm_PV_monitor_plot.py --view --dummy  # Dummy + show window + save
+#   python 02bm_PV_monitor_plot.py --both-detectors  # SP1+SP2 PVA monitors, instant camera switch
+#   python 02bm_PV_monitor_plot.py --side-by-side    # SP1 and SP2 previews next to each other
+#   python 02bm_PV_monitor_plot.py --alarm-rules extra_rules.json  # more alarm rules
+#   python 02bm_PV_monitor_plot.py --notify smtp://mailhost/ops@anl.gov  # e-mail alarm events (notify.py)
+#   python 02bm_PV_monitor_plot.py --status /tmp/02bm.status.json  # status JSON (status_file.py; none by default)
 #
 # Requirements:
 #   pip install matplotlib numpy pyepics pvapy
@@ -30,6 +35,7 @@
 # Notes:
 # - Mode/Acquire are read as strings via caget(..., as_string=True).
 # - For "red if not found/timeout", we use caget(timeout=...) and treat None as red.
+# - Alarm state changes are printed to stdout, one line per event.
 
 import argparse
 import time
@@ -47,6 +53,15 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 import numpy as np
 
+from alarm_rules import (AlarmEngine, format_event, load_rules, rules_from_ioc_groups,
+                         shared_engine)
+from atomic_file import write_json
+from image_panel import clear_figure, image_panel
+from image_stats import draw_stats_overlay, frame_stats, stats_to_json
+from preview import PreviewProcessor, decimate_frame
+from scheduling import AdaptiveScheduler
+from status_file import StatusFile
+
 
 # ----------------------------
 # IOC Groups (MEDM-inspired)
@@ -203,10 +218,23 @@ class EpicsPVSource:
 
         self._pva = pva
         self._pva_cache = {}    # channel_name -> pvaccess.Channel
+        self._pva_monitors = []  # monitored channels (pva_subscribe)
+
+        self._monitors = []     # auto_monitor PVs kept alive for subscribe()
 
     def next_refresh(self):
         pass
 
+    def subscribe(self, pvname, callback):
+        """Call callback(pvname, value) from the CA thread on every monitor update."""
+        def _cb(pvname=None, value=None, char_value=None, **_kw):
+            callback(pvname, char_value if char_value is not None else value)
+
+        pv = self._epics.PV(pvname, auto_monitor=True, callback=_cb,
+                            connection_timeout=self._connect_timeout)
+        self._monitors.append(pv)
+        return pv
+
     def _pv(self, pvname):
         pv = self._pv_cache.get(pvname)
         if pv is None:
@@ -257,36 +285,59 @@ class EpicsPVSource:
             pva_img = ch.get("")
         except Exception:
             return None
+        return ntnda_to_array(pva_img)
+
+    def pva_subscribe(self, channel_name, callback, due=None):
+        """
+        Monitor an NTNDArray channel in the background: callback(ndarray) from the
+        PVA thread for each new frame. Frames arriving while due() is False are
+        dropped before they are parsed.
+        """
+        def _cb(pva_img):
+            if due is not None and not due():
+                return
+            arr = ntnda_to_array(pva_img)
+            if arr is not None:
+                callback(arr)
+
+        ch = self._pva.Channel(channel_name)
+        ch.subscribe("preview", _cb)
+        ch.startMonitor("")
+        self._pva_monitors.append(ch)
+        return ch
+
+
+def ntnda_to_array(pva_img):
+    """NTNDArray PvObject -> 2D numpy array (height, width), or None."""
+    try:
+        width = int(pva_img["dimension"][0]["size"])
+        height = int(pva_img["dimension"][1]["size"])
+        val = pva_img["value"]
+        if val is None or len(val) < 1:
+            return None
+        v0 = val[0]
+    except Exception:
+        return None
 
+    arr1d = None
+    for k in (
+        "ubyteValue", "ushortValue", "uintValue", "ulongValue",
+        "byteValue", "shortValue", "intValue", "longValue",
+        "floatValue", "doubleValue", "booleanValue",
+    ):
         try:
-            width = int(pva_img["dimension"][0]["size"])
-            height = int(pva_img["dimension"][1]["size"])
-            val = pva_img["value"]
-            if val is None or len(val) < 1:
-                return None
-            v0 = val[0]
+            if k in v0:
+                arr1d = np.asarray(v0[k])
+                break
         except Exception:
-            return None
+            pass
 
-        arr1d = None
-        for k in (
-            "ubyteValue", "ushortValue", "uintValue", "ulongValue",
-            "byteValue", "shortValue", "intValue", "longValue",
-            "floatValue", "doubleValue", "booleanValue",
-        ):
-            try:
-                if k in v0:
-                    arr1d = np.asarray(v0[k])
-                    break
-            except Exception:
-                pass
-
-        if arr1d is None:
-            return None
-        if width <= 0 or height <= 0 or arr1d.size < width * height:
-            return None
+    if arr1d is None:
+        return None
+    if width <= 0 or height <= 0 or arr1d.size < width * height:
+        return None
 
-        return arr1d[: width * height].reshape((height, width))
+    return arr1d[: width * height].reshape((height, width))
 
 
 # ----------------------------
@@ -326,69 +377,12 @@ def _fmt_str(v):
 def _shutter_color_open_pl(v):
     return "green" if str(v).strip() in ("1", "1.0") else "red"
 
-def dot_color_for_running(val, mode):
-    """
-    mode:
-      - 'server_running': green if value indicates running
-    """
-    if val is None:
-        return "red"
-
-    s = str(val).strip().lower()
-    if s in ("1", "true", "yes", "running", "on", "ok"):
-        return "green"
-
-    return "red"
+def _beam_on_open_pl(*shutters):
+    """True if all *_OPEN_PL shutters read open, False if any reads closed, None if unknown."""
+    if any(v is None for v in shutters):
+        return None
+    return all(_shutter_color_open_pl(v) == "green" for v in shutters)
 
-def add_scale_bar(ax, img_shape, um_per_px, bar_um=200.0, margin_px=20, height_px=8):
-    """
-    Draw a scale bar in data coordinates (pixel coordinates).
-    um_per_px assumed microns/pixel.
-    """
-    if um_per_px is None:
-        return
-    try:
-        um_per_px = float(um_per_px)
-    except Exception:
-        return
-    if um_per_px <= 0:
-        return
-
-    h, w = img_shape[:2]
-    max_bar_px = max(10, int(0.30 * w))
-    bar_px = int(round(bar_um / um_per_px))
-    if bar_px <= 0:
-        return
-
-    if bar_px > max_bar_px:
-        bar_px = max_bar_px
-        bar_um = bar_px * um_per_px
-
-    x0 = margin_px
-    y0 = h - margin_px - height_px
-
-    ax.add_patch(
-        Rectangle(
-            (x0, y0),
-            bar_px,
-            height_px,
-            facecolor="white",
-            edgecolor="black",
-            linewidth=1.0,
-            alpha=0.9,
-        )
-    )
-    ax.text(
-        x0 + bar_px / 2,
-        y0 - 6,
-        f"{bar_um:.0f} µm",
-        color="white",
-        ha="center",
-        va="bottom",
-        fontsize=10,
-        fontweight="bold",
-        bbox=dict(facecolor="black", alpha=0.35, edgecolor="none", pad=2),
-    )
 
 
 # ----------------------------
@@ -418,12 +412,53 @@ PV_DISPLAY = {
     "SP2 PVA Image": "2bmSP2:Pva1:Image",
 }
 
+# PVs that drive the adaptive refresh (see scheduling.py)
+BUSY_PVS = [
+    "2bmb:TomoScan:ScanStatus",
+    "2bmb:TomoScanFPGA:ScanStatus",
+    "2bmb:TomoScanStream:ScanStatus",
+    PV_DISPLAY["SP1 Acquire"],
+    PV_DISPLAY["SP2 Acquire"],
+]
+TRIGGER_PVS = [
+    PV_DISPLAY["Shutter A"],
+    PV_DISPLAY["Shutter B"],
+    PV_DISPLAY["Camera Selected"],
+    PV_DISPLAY["Mode"],
+]
+
+# Alarm rules (see alarm_rules.py): one per IOC group, plus shutters and beam
+ALARM_RULES = rules_from_ioc_groups(IOC_GROUPS) + [
+    # *_OPEN_PL: 1 = open (info: transitions are events, not alarms)
+    {"name": "Shutter A", "kind": "enum", "pv": PV_DISPLAY["Shutter A"], "ok": ["1"],
+     "severity": "info", "message": "Shutter A closed"},
+    {"name": "Shutter B", "kind": "enum", "pv": PV_DISPLAY["Shutter B"], "ok": ["1"],
+     "severity": "info", "message": "Shutter B closed"},
+    {"name": "Beam current", "kind": "threshold", "pv": PV_DISPLAY["Current"],
+     "low": 1.0, "deadband": 0.5, "severity": "minor", "message": "Storage ring current below 1 mA"},
+    {"name": "Beam current stale", "kind": "stale", "pv": PV_DISPLAY["Current"],
+     "max_age": 300, "severity": "minor", "message": "No storage ring current update for 5 min"},
+    {"name": "TomoScan down with beam", "kind": "all", "rules": [
+        {"kind": "enum", "pv": PV_DISPLAY["Shutter A"], "alarm": ["1"], "missing": "ok"},
+        {"kind": "enum", "pv": PV_DISPLAY["Shutter B"], "alarm": ["1"], "missing": "ok"},
+        "TomoScan",
+    ], "message": "Shutters open but the TomoScan server is not running"},
+]
+
 
 # ----------------------------
 # Rendering
 # ----------------------------
 
-def render_2bm_dashboard(fig, source, pv, out_png=None):
+def render_2bm_dashboard(fig, source, pv, out_png=None, sparklines=None,
+                         previews=None, side_by_side=False,
+                         stats_overlay=False, json_out=None, tiles=None,
+                         preview_procs=None, alarms=None, preview_size=1024):
+    if alarms is None:
+        # no engine from main(): one kept across calls, fed by the reads of each render
+        from history_store import RecordingSource
+        alarms = shared_engine(ALARM_RULES)
+        source = RecordingSource(source, [alarms])
     caget_func = source.caget
     energy = caget_num(caget_func, pv["Energy"], timeout=0.3)
     mode = caget_str(caget_func, pv["Mode"], timeout=0.3)
@@ -448,9 +483,35 @@ def render_2bm_dashboard(fig, source, pv, out_png=None):
     acq_txt = _fmt_str(acq)
     temp_txt = "N/A" if temp is None else f"{_fmt_num(temp, 2)} \N{DEGREE SIGN}C"
     file_txt = _fmt_num(filecount, 0)
-    img = source.pva_image(pva_chan)
 
-    fig.clf()
+    want_stats = stats_overlay or bool(json_out)
+
+    beam_on = _beam_on_open_pl(sh_a, sh_b)
+    alarms.tick()
+
+    def get_image(chan):
+        """(image, detector pixels per image pixel, image stats or None, full frame)"""
+        if previews is None:
+            raw = img = source.pva_image(chan)
+            factor = 1
+            stats = frame_stats(img) if want_stats else None
+            if preview_procs is not None:
+                img, factor = decimate_frame(img, max_side=preview_size)
+        else:
+            img, factor = previews.get(chan)
+            stats = previews.stats(chan)
+            raw = previews.raw(chan)
+        if preview_procs is not None:
+            # running average + dark/flat correction (stats and tiles use the raw frame)
+            img = preview_procs[chan].process(img, beam_on=beam_on)
+        return img, factor, stats, raw
+
+    if side_by_side:
+        images = [get_image(pv["SP1 PVA Image"]), get_image(pv["SP2 PVA Image"])]
+    else:
+        images = [get_image(pva_chan)]
+
+    clear_figure(fig, keep=sparklines.axes if sparklines is not None else ())
     fig.set_facecolor("#1e1e1e")
     gs = fig.add_gridspec(
         nrows=24, ncols=6,
@@ -479,46 +540,47 @@ def render_2bm_dashboard(fig, source, pv, out_png=None):
                 ha="center", va="center", fontsize=18, fontweight="bold", color=color)
     lcd(ax_read, 0.00, 0.10, 0.32, 0.65, "Energy (keV)", _fmt_num(energy, 4), color="cyan")
     lcd(ax_read, 0.34, 0.10, 0.32, 0.65, "Mode", _fmt_str(mode), color="white")
-    lcd(ax_read, 0.68, 0.10, 0.32, 0.65, "Current (mA)", _fmt_num(current, 3), color="yellow")
-
-    # Image snapshot
-    ax_img = fig.add_subplot(gs[3:12, :])
-    ax_img.set_facecolor("black")
-    ax_img.set_xticks([])
-    ax_img.set_yticks([])
-    ax_img.set_title(
-        f"Detector: {det_name}    Acquire: {acq_txt}    Temp.: {temp_txt}    File count: {file_txt}",
-        color="white",
-        fontsize=11,
-    )
-    if img is None:
-        ax_img.text(
-            0.5, 0.5,
-            f"No PVA image / parse failed:\n{pva_chan}",
-            transform=ax_img.transAxes,
-            ha="center", va="center",
-            color="#cfcfcf", fontsize=11
+    lcd(ax_read, 0.68, 0.10, 0.32, 0.65, "Current (mA)", _fmt_num(current, 3),
+        color=alarms.color("Beam current", ok="yellow"))
+
+    # Trend sparklines under the readouts (optional)
+    if sparklines is not None:
+        sparklines.update(fig, gs[3, :], [
+            ("Current (mA)", pv["Current"]),
+            ("Temp. (\N{DEGREE SIGN}C)", pv["SP1 Temp."] if cam_is_sp1 else pv["SP2 Temp."]),
+            ("File count", pv["SP1 File count"] if cam_is_sp1 else pv["SP2 File count"]),
+        ])
+
+    # Image snapshot (persistent panels: artists are reused between cycles)
+    def draw_image(slot, spec, img, factor, stats, chan, title, title_color="white", fontsize=11):
+        ax_img = image_panel(fig, slot).draw(
+            fig, spec, img, um_per_px, factor=factor, title=title,
+            title_color=title_color, fontsize=fontsize,
+            missing=f"No PVA image / parse failed:\n{chan}",
         )
+        if stats_overlay and img is not None:
+            draw_stats_overlay(ax_img, stats, factor)
+
+    img_rows = slice(3, 12) if sparklines is None else slice(4, 12)
+    if side_by_side:
+        # both detectors; the selected one gets the cyan title
+        for k, (name, acq_k, file_k, chan_k) in enumerate((
+            ("Oryx 5MP", sp1_acq, sp1_file, pv["SP1 PVA Image"]),
+            ("Oryx 32MP", sp2_acq, sp2_file, pv["SP2 PVA Image"]),
+        )):
+            img_k, factor_k, stats_k, _ = images[k]
+            selected = (k == 0) == cam_is_sp1
+            draw_image(
+                f"sp{k + 1}", gs[img_rows, 3 * k:3 * k + 3], img_k, factor_k, stats_k, chan_k,
+                f"{name}   {_fmt_str(acq_k)}   File: {_fmt_num(file_k, 0)}",
+                title_color="cyan" if selected else "white", fontsize=9.5,
+            )
     else:
-        arr = np.asarray(img)
-        vmin = np.percentile(arr, 1)
-        vmax = np.percentile(arr, 99)
-        if not np.isfinite(vmin) or not np.isfinite(vmax) or vmax <= vmin:
-            vmin, vmax = float(arr.min()), float(arr.max()) if arr.size else (0, 1)
-        ax_img.imshow(arr, cmap="gray", vmin=vmin, vmax=vmax, aspect="auto")
-        add_scale_bar(ax_img, arr.shape, um_per_px, bar_um=200.0)
-        if um_per_px is not None:
-            try:
-                ax_img.text(
-                    0.99, 0.01,
-                    f"{float(um_per_px):.3f} µm/px",
-                    transform=ax_img.transAxes,
-                    ha="right", va="bottom",
-                    color="white", fontsize=9,
-                    bbox=dict(facecolor="black", alpha=0.35, edgecolor="none", pad=2),
-                )
-            except Exception:
-                pass
+        img, factor, stats, _ = images[0]
+        draw_image(
+            "main", gs[img_rows, :], img, factor, stats, pva_chan,
+            f"Detector: {det_name}    Acquire: {acq_txt}    Temp.: {temp_txt}    File count: {file_txt}",
+        )
 
     # Shutters (no numeric text)
     ax_sh = fig.add_subplot(gs[12:14, :])
@@ -528,8 +590,8 @@ def render_2bm_dashboard(fig, source, pv, out_png=None):
             facecolor=color, edgecolor="black", linewidth=1.2))
         ax.text(x + w/2, 0.58, label, transform=ax.transAxes,
                 ha="center", va="center", fontsize=14, color="white", fontweight="bold")
-    shutter_button(ax_sh, 0.10, 0.38, "Shutter A", _shutter_color_open_pl(sh_a))
-    shutter_button(ax_sh, 0.52, 0.38, "Shutter B", _shutter_color_open_pl(sh_b))
+    shutter_button(ax_sh, 0.10, 0.38, "Shutter A", alarms.color("Shutter A"))
+    shutter_button(ax_sh, 0.52, 0.38, "Shutter B", alarms.color("Shutter B"))
 
     # IOC / Server status panel (moved up to fill removed detector panel)
     ax_ioc = fig.add_subplot(gs[14:24, :])
@@ -549,10 +611,9 @@ def render_2bm_dashboard(fig, source, pv, out_png=None):
         label = grp["label"]
         run_pv = grp["running_pv"]
         status_pv = grp.get("status_pv")
-        mode_kind = grp.get("mode", "server_running")
         run_val = caget_str(caget_func, run_pv, timeout=0.3)
         status_val = caget_str(caget_func, status_pv, timeout=0.3) if status_pv else None
-        dot = dot_color_for_running(run_val, mode_kind)
+        dot = alarms.color(label)
         ax_ioc.add_patch(plt.Circle((0.04, y), 0.015, transform=ax_ioc.transAxes,
                                    facecolor=dot, edgecolor="black", linewidth=1.0))
         ax_ioc.text(0.08, y, label, transform=ax_ioc.transAxes,
@@ -577,6 +638,20 @@ def render_2bm_dashboard(fig, source, pv, out_png=None):
     fig.canvas.draw()
     if out_png:
         fig.savefig(out_png, bbox_inches="tight", pad_inches=0.06)
+    if tiles is not None:
+        # full-resolution deep-zoom tiles of the selected camera: the frame behind the
+        # (decimated, processed) preview, not a second fetch
+        img_full = images[1 if side_by_side and not cam_is_sp1 else 0][3]
+        if img_full is not None:
+            tiles.update(pva_chan, img_full)
+    if json_out:
+        chans = [pv["SP1 PVA Image"], pv["SP2 PVA Image"]] if side_by_side else [pva_chan]
+        write_json(json_out, {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "detector": det_name,
+            "image_stats": {c: stats_to_json(im[2]) for c, im in zip(chans, images)},
+            "alarms": alarms.snapshot(),
+        })
 
 
 # ----------------------------
@@ -592,7 +667,53 @@ def main():
     parser.add_argument("--out", default="/net/joulefs/coulomb_Public/docroot/tomolog/02bm_monitor.png",
                     help="Output PNG path.")
     parser.add_argument("--period", type=int, default=60,
-                        help="Update period in seconds.")
+                        help="Update period in seconds while idle.")
+    parser.add_argument("--fast-period", type=float, default=5.0,
+                        help="Update period in seconds while a scan or acquisition is running.")
+    parser.add_argument("--min-interval", type=float, default=2.0,
+                        help="Minimum seconds between renders (shutter/camera changes render at once).")
+    parser.add_argument("--history", default=None,
+                        help="Persistent PV history directory, one per monitor process (disabled if not given).")
+    parser.add_argument("--sparklines", action="store_true",
+                        help="Show trend sparklines under the readouts (in-memory history).")
+    parser.add_argument("--sparkline-len", type=int, default=1440,
+                        help="Samples kept per PV for the sparklines (one per render: the time span depends on the render rate).")
+    parser.add_argument("--both-detectors", action="store_true",
+                        help="Keep background PVA monitors on both SP1 and SP2 images (instant camera switch).")
+    parser.add_argument("--side-by-side", action="store_true",
+                        help="Show SP1 and SP2 previews next to each other (implies --both-detectors).")
+    parser.add_argument("--preview-size", type=int, default=1024,
+                        help="Longer side in pixels of the decimated previews.")
+    parser.add_argument("--stats", action="store_true",
+                        help="Overlay saturation, mean/std, centroid and projections on the image.")
+    parser.add_argument("--json", default=None,
+                        help="Also write a JSON snapshot (image statistics) to this path each update.")
+    parser.add_argument("--tiles", default=None,
+                        help="Write a deep-zoom (DZI) tile pyramid of the full frame to this directory.")
+    parser.add_argument("--tile-format", default="png", choices=("png", "jpg"),
+                        help="Tile image format for --tiles.")
+    parser.add_argument("--timelapse", default=None,
+                        help="Write a rolling time-lapse of the dashboard to this directory.")
+    parser.add_argument("--timelapse-format", default="webp", choices=("webp", "mp4"),
+                        help="Animated WebP segments, or MP4 segments through a local ffmpeg.")
+    parser.add_argument("--timelapse-hours", type=float, default=12.0,
+                        help="Hours of time-lapse kept (older segments are deleted).")
+    parser.add_argument("--average", type=float, default=None, metavar="ALPHA",
+                        help="Running average of the preview, weight of the newest frame (e.g. 0.3).")
+    parser.add_argument("--correct", choices=("dark", "flat"), default=None,
+                        help="Dark (shutters closed) or dark+flat correction of the preview.")
+    parser.add_argument("--alarm-rules", default=None,
+                        help="JSON file with extra alarm rules (added to the built-in ones).")
+    parser.add_argument("--notify", action="append", default=[], metavar="SINK",
+                        help="Send alarm events to a JSONL file, smtp://host/to@addr or http(s)://webhook "
+                             "(repeatable, see notify.py).")
+    parser.add_argument("--notify-level", default="info", choices=("info", "minor", "major"),
+                        help="Lowest severity that is notified.")
+    parser.add_argument("--notify-rate", type=float, default=6.0,
+                        help="Notifications per hour and rule once the burst of 3 is used up.")
+    parser.add_argument("--status", default=None, metavar="PATH",
+                        help="Write a status JSON here every update (default: none). It "
+                             "holds host, pid and errors: keep it outside the web docroot.")
     args = parser.parse_args()
 
     # If not viewing, force Agg for headless rendering
@@ -600,19 +721,84 @@ def main():
         matplotlib.use("Agg")
 
     source = DummyPVSource() if args.dummy else EpicsPVSource()
+    scheduler = AdaptiveScheduler(source, busy_pvs=BUSY_PVS, trigger_pvs=TRIGGER_PVS,
+                                  fast_period=args.fast_period, slow_period=args.period,
+                                  min_interval=args.min_interval)
+    rules = ALARM_RULES + (load_rules(args.alarm_rules) if args.alarm_rules else [])
+    alarms = AlarmEngine(rules)
+    alarms.add_listener(lambda event: print(format_event(event), flush=True))
+    if args.notify:
+        from notify import Notifier, make_sink
+        alarms.add_listener(Notifier([make_sink(s) for s in args.notify],
+                                     min_severity=args.notify_level, per_hour=args.notify_rate))
+    alarms.watch(source)
+    sinks = [alarms]
+    if args.history:
+        from history_store import HistoryStore
+        sinks.append(HistoryStore(args.history))
+    sparklines = None
+    if args.sparklines:
+        from sparkline import PVHistory, SparklineRow
+        sparklines = SparklineRow(PVHistory(capacity=args.sparkline_len))
+        sinks.append(sparklines.history)
+    from history_store import RecordingSource
+    source = RecordingSource(source, sinks)
+    previews = None
+    if args.both_detectors or args.side_by_side:
+        from preview import BackgroundPreviews
+        previews = BackgroundPreviews(
+            source, [PV_DISPLAY["SP1 PVA Image"], PV_DISPLAY["SP2 PVA Image"]],
+            max_side=args.preview_size, with_stats=args.stats or bool(args.json),
+            keep_raw=bool(args.tiles),
+            min_interval=scheduler.period,      # one decimation per render at most
+        )
+    tiles = None
+    if args.tiles:
+        from tile_pyramid import TileStore
+        tiles = TileStore(args.tiles, fmt=args.tile_format)
+    preview_procs = None
+    if args.average is not None or args.correct:
+        preview_procs = {
+            ch: PreviewProcessor(alpha=1.0 if args.average is None else args.average,
+                                 correct=args.correct)
+            for ch in (PV_DISPLAY["SP1 PVA Image"], PV_DISPLAY["SP2 PVA Image"])
+        }
+    timelapse = None
+    if args.timelapse:
+        from timelapse import TimeLapse
+        timelapse = TimeLapse(args.timelapse, fmt=args.timelapse_format,
+                              hours=args.timelapse_hours)
+        timelapse.close_on_exit()
+    status = StatusFile(args.status, outputs=[args.out, args.json],
+                        period=args.period)
     fig = plt.figure(figsize=(6.5, 11.0), dpi=120)
 
     if args.view:
         while plt.fignum_exists(fig.number):
-            source.next_refresh()
-            render_2bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out)
-            plt.pause(0.1)
-            time.sleep(args.period)
+            with status.cycle():
+                source.next_refresh()
+                render_2bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out,
+                                     sparklines=sparklines, previews=previews,
+                                     side_by_side=args.side_by_side,
+                                     stats_overlay=args.stats, json_out=args.json, tiles=tiles,
+                                     preview_procs=preview_procs, alarms=alarms,
+                                     preview_size=args.preview_size)
+            if timelapse is not None:
+                timelapse.add_figure(fig)
+            scheduler.wait(sleep=plt.pause)
     else:
         while True:
-            source.next_refresh()
-            render_2bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out)
-            time.sleep(args.period)
+            with status.cycle():
+                source.next_refresh()
+                render_2bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out,
+                                     sparklines=sparklines, previews=previews,
+                                     side_by_side=args.side_by_side,
+                                     stats_overlay=args.stats, json_out=args.json, tiles=tiles,
+                                     preview_procs=preview_procs, alarms=alarms,
+                                     preview_size=args.preview_size)
+            if timelapse is not None:
+                timelapse.add_figure(fig)
+            scheduler.wait()
 
 
 if __name__ == "__main__":
@@ -12,6 +12,9 @@
 #   python 07bm_monitor.py --view          # EPICS+PVA, show window + save
 #   python 07bm_monitor.py --dummy         # Dummy PVs + synthetic image
 #   python 07bm_monitor.py --view --dummy  # Dummy + show window + save
+#   python 07bm_monitor.py --alarm-rules extra_rules.json  # more alarm rules (alarm_rules.py)
+#   python 07bm_monitor.py --notify /path/events.jsonl     # log alarm events (notify.py)
+#   python 07bm_monitor.py --status /tmp/07bm.status.json  # status JSON (status_file.py; none by default)
 #
 # Requirements:
 #   pip install matplotlib numpy pyepics pvapy
@@ -31,6 +34,14 @@ import matplotlib.pyplot as plt
 from matplotlib.patches import Rectangle
 import numpy as np
 
+from alarm_rules import (AlarmEngine, format_event, load_rules, rules_from_ioc_groups,
+                         shared_engine)
+from atomic_file import write_json
+from image_panel import clear_figure, image_panel
+from image_stats import draw_stats_overlay, frame_stats, stats_to_json
+from scheduling import AdaptiveScheduler
+from status_file import StatusFile
+
 
 # ----------------------------
 # IOC Groups (MEDM-inspired)
@@ -153,9 +164,21 @@ class EpicsPVSource:
         self._pva = pva
         self._pva_cache = {}    # channel_name -> pvaccess.Channel
 
+        self._monitors = []     # auto_monitor PVs kept alive for subscribe()
+
     def next_refresh(self):
         pass
 
+    def subscribe(self, pvname, callback):
+        """Call callback(pvname, value) from the CA thread on every monitor update."""
+        def _cb(pvname=None, value=None, char_value=None, **_kw):
+            callback(pvname, char_value if char_value is not None else value)
+
+        pv = self._epics.PV(pvname, auto_monitor=True, callback=_cb,
+                            connection_timeout=self._connect_timeout)
+        self._monitors.append(pv)
+        return pv
+
     def _pv(self, pvname):
         pv = self._pv_cache.get(pvname)
         if pv is None:
@@ -262,76 +285,6 @@ def _fmt_str(v):
         return "N/A"
     return str(v)
 
-def _shutter_color_closed_pl(v):
-    """
-    PV is 'CLOSED pilot light':
-      - 1 => closed => red
-      - 0 => not closed (open/unknown) => green
-    """
-    s = str(v).strip()
-    return "red" if s in ("1", "1.0", "true", "True") else "green"
-
-def dot_color_for_running(val, mode):
-    if val is None:
-        return "red"
-
-    if mode == "nonzero_ok":
-        try:
-            return "green" if float(val) != 0.0 else "red"
-        except Exception:
-            return "green" if str(val).strip() not in ("0", "0.0", "") else "red"
-
-    s = str(val).strip().lower()
-    if s in ("1", "true", "yes", "running", "on", "ok"):
-        return "green"
-    return "red"
-
-def add_scale_bar(ax, img_shape, um_per_px, bar_um=200.0, margin_px=20, height_px=8):
-    if um_per_px is None:
-        return
-    try:
-        um_per_px = float(um_per_px)
-    except Exception:
-        return
-    if um_per_px <= 0:
-        return
-
-    h, w = img_shape[:2]
-    max_bar_px = max(10, int(0.30 * w))
-    bar_px = int(round(bar_um / um_per_px))
-    if bar_px <= 0:
-        return
-
-    if bar_px > max_bar_px:
-        bar_px = max_bar_px
-        bar_um = bar_px * um_per_px
-
-    x0 = margin_px
-    y0 = h - margin_px - height_px
-
-    ax.add_patch(
-        Rectangle(
-            (x0, y0),
-            bar_px,
-            height_px,
-            facecolor="white",
-            edgecolor="black",
-            linewidth=1.0,
-            alpha=0.9,
-        )
-    )
-    ax.text(
-        x0 + bar_px / 2,
-        y0 - 6,
-        f"{bar_um:.0f} µm",
-        color="white",
-        ha="center",
-        va="bottom",
-        fontsize=10,
-        fontweight="bold",
-        bbox=dict(facecolor="black", alpha=0.35, edgecolor="none", pad=2),
-    )
-
 def mode_label_from_inbd_white(pv_value) -> str:
     """
     PB:07BM:INBD_WHITE_SW.VAL:
@@ -374,12 +327,50 @@ PV_DISPLAY = {
     "Server Running": "7bmtomo:TomoScan:ServerRunning",
 }
 
+# PVs that drive the adaptive refresh (see scheduling.py)
+BUSY_PVS = [
+    PV_DISPLAY["Scan Status"],
+    PV_DISPLAY["Acquire"],
+]
+TRIGGER_PVS = [
+    PV_DISPLAY["Shutter A"],
+    PV_DISPLAY["Shutter B"],
+    PV_DISPLAY["Mode"],
+    PV_DISPLAY["Filter 1"],
+    PV_DISPLAY["Filter 2"],
+]
+
+# Alarm rules (see alarm_rules.py): one per IOC group, plus shutters and beam
+CLOSED = ["1", "true"]
+ALARM_RULES = rules_from_ioc_groups(IOC_GROUPS) + [
+    # *_CLSD_PL: 1 = closed (info: transitions are events, not alarms; unreadable shows open)
+    {"name": "Shutter A", "kind": "enum", "pv": PV_DISPLAY["Shutter A"], "alarm": CLOSED,
+     "severity": "info", "message": "Shutter A closed", "missing": "ok"},
+    {"name": "Shutter B", "kind": "enum", "pv": PV_DISPLAY["Shutter B"], "alarm": CLOSED,
+     "severity": "info", "message": "Shutter B closed", "missing": "ok"},
+    {"name": "Beam current", "kind": "threshold", "pv": PV_DISPLAY["Current"],
+     "low": 1.0, "deadband": 0.5, "severity": "minor", "message": "Storage ring current below 1 mA"},
+    {"name": "Beam current stale", "kind": "stale", "pv": PV_DISPLAY["Current"],
+     "max_age": 300, "severity": "minor", "message": "No storage ring current update for 5 min"},
+    {"name": "TomoScan down with beam", "kind": "all", "rules": [
+        {"kind": "enum", "pv": PV_DISPLAY["Shutter A"], "ok": CLOSED, "missing": "ok"},
+        {"kind": "enum", "pv": PV_DISPLAY["Shutter B"], "ok": CLOSED, "missing": "ok"},
+        "TomoScan",
+    ], "message": "Shutters open but the TomoScan server is not running"},
+]
+
 
 # ----------------------------
 # Rendering
 # ----------------------------
 
-def render_7bm_dashboard(fig, source, pv, out_png=None):
+def render_7bm_dashboard(fig, source, pv, out_png=None, sparklines=None,
+                         stats_overlay=False, json_out=None, tiles=None, alarms=None):
+    if alarms is None:
+        # no engine from main(): one kept across calls, fed by the reads of each render
+        from history_store import RecordingSource
+        alarms = shared_engine(ALARM_RULES)
+        source = RecordingSource(source, [alarms])
     caget_func = source.caget
 
     filt1 = caget_str(caget_func, pv["Filter 1"], timeout=0.3)
@@ -408,9 +399,11 @@ def render_7bm_dashboard(fig, source, pv, out_png=None):
     file_txt = _fmt_num(filecount, 0)
 
     img = source.pva_image(pv["PVA Image"])
+    img_stats = frame_stats(img) if (stats_overlay or json_out) else None
+    alarms.tick()
 
     # Layout
-    fig.clf()
+    clear_figure(fig, keep=sparklines.axes if sparklines is not None else ())
     fig.set_facecolor("#1e1e1e")
     gs = fig.add_gridspec(
         nrows=24, ncols=6,
@@ -448,50 +441,26 @@ def render_7bm_dashboard(fig, source, pv, out_png=None):
     lcd(ax_read, 0.68, top_y, tile_w, tile_h, "Mode", _fmt_str(mode), color="white")
 
     # Bottom row
-    lcd(ax_read, 0.00, bot_y, tile_w, tile_h, "Current (mA)", _fmt_num(current, 3), color="yellow")
-
-    # Image snapshot
-    ax_img = fig.add_subplot(gs[3:12, :])
-    ax_img.set_facecolor("black")
-    ax_img.set_xticks([])
-    ax_img.set_yticks([])
-    ax_img.set_title(
+    lcd(ax_read, 0.00, bot_y, tile_w, tile_h, "Current (mA)", _fmt_num(current, 3),
+        color=alarms.color("Beam current", ok="yellow"))
+
+    # Trend sparklines under the readouts (optional)
+    if sparklines is not None:
+        sparklines.update(fig, gs[3, :], [
+            ("Current (mA)", pv["Current"]),
+            ("Temp. (\N{DEGREE SIGN}C)", pv["Temp."]),
+            ("File", pv["File"]),
+        ])
+
+    # Image snapshot (persistent panel: artists are reused between cycles)
+    ax_img = image_panel(fig).draw(
+        fig, gs[3:12, :] if sparklines is None else gs[4:12, :], img, um_per_px,
         # (1) remove detector prefix label from title
-        f"Acquire: {acq_txt}    Exp.: {exp_txt}    Temp.: {temp_txt}    File: {file_txt}",
-        color="white",
-        fontsize=11,
+        title=f"Acquire: {acq_txt}    Exp.: {exp_txt}    Temp.: {temp_txt}    File: {file_txt}",
+        missing=f"No PVA image / parse failed:\n{pv['PVA Image']}",
     )
-
-    if img is None:
-        ax_img.text(
-            0.5, 0.5,
-            f"No PVA image / parse failed:\n{pv['PVA Image']}",
-            transform=ax_img.transAxes,
-            ha="center", va="center",
-            color="#cfcfcf", fontsize=11
-        )
-    else:
-        arr = np.asarray(img)
-        vmin = np.percentile(arr, 1)
-        vmax = np.percentile(arr, 99)
-        if not np.isfinite(vmin) or not np.isfinite(vmax) or vmax <= vmin:
-            vmin, vmax = float(arr.min()), float(arr.max()) if arr.size else (0, 1)
-        ax_img.imshow(arr, cmap="gray", vmin=vmin, vmax=vmax, aspect="auto")
-
-        add_scale_bar(ax_img, arr.shape, um_per_px, bar_um=200.0)
-
-        if um_per_px is not None:
-            try:
-                ax_img.text(
-                    0.99, 0.01,
-                    f"{float(um_per_px):.3f} µm/px",
-                    transform=ax_img.transAxes,
-                    ha="right", va="bottom",
-                    color="white", fontsize=9,
-                    bbox=dict(facecolor="black", alpha=0.35, edgecolor="none", pad=2),
-                )
-            except Exception:
-                pass
+    if stats_overlay and img is not None:
+        draw_stats_overlay(ax_img, img_stats)
 
     # Shutters (no numeric text)
     ax_sh = fig.add_subplot(gs[12:14, :])
@@ -503,8 +472,8 @@ def render_7bm_dashboard(fig, source, pv, out_png=None):
         ax.text(x + w/2, 0.58, label, transform=ax.transAxes,
                 ha="center", va="center", fontsize=14, color="white", fontweight="bold")
 
-    shutter_button(ax_sh, 0.10, 0.38, "Shutter A", _shutter_color_closed_pl(sh_a))
-    shutter_button(ax_sh, 0.52, 0.38, "Shutter B", _shutter_color_closed_pl(sh_b))
+    shutter_button(ax_sh, 0.10, 0.38, "Shutter A", alarms.color("Shutter A"))
+    shutter_button(ax_sh, 0.52, 0.38, "Shutter B", alarms.color("Shutter B"))
 
     # IOC / Server status panel
     ax_ioc = fig.add_subplot(gs[14:24, :])
@@ -525,12 +494,11 @@ def render_7bm_dashboard(fig, source, pv, out_png=None):
         label = grp["label"]
         run_pv = grp["running_pv"]
         status_pv = grp.get("status_pv")
-        mode_kind = grp.get("mode", "server_running")
 
         run_val = caget_str(caget_func, run_pv, timeout=0.3)
         status_val = caget_str(caget_func, status_pv, timeout=0.3) if status_pv else None
 
-        dot = dot_color_for_running(run_val, mode_kind)
+        dot = alarms.color(label)
 
         ax_ioc.add_patch(plt.Circle((0.04, y), 0.015, transform=ax_ioc.transAxes,
                                     facecolor=dot, edgecolor="black", linewidth=1.0))
@@ -558,6 +526,14 @@ def render_7bm_dashboard(fig, source, pv, out_png=None):
     fig.canvas.draw()
     if out_png:
         fig.savefig(out_png, bbox_inches="tight", pad_inches=0.06)
+    if tiles is not None:
+        tiles.update(pv["PVA Image"], img)   # full-resolution deep-zoom tiles
+    if json_out:
+        write_json(json_out, {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "image_stats": {pv["PVA Image"]: stats_to_json(img_stats)},
+            "alarms": alarms.snapshot(),
+        })
 
 
 # ----------------------------
@@ -573,26 +549,107 @@ def main():
     parser.add_argument("--out", default="/net/joulefs/coulomb_Public/docroot/tomolog/07bm_monitor.png",
                         help="Output PNG path.")
     parser.add_argument("--period", type=int, default=60,
-                        help="Update period in seconds.")
+                        help="Update period in seconds while idle.")
+    parser.add_argument("--fast-period", type=float, default=5.0,
+                        help="Update period in seconds while a scan or acquisition is running.")
+    parser.add_argument("--min-interval", type=float, default=2.0,
+                        help="Minimum seconds between renders (shutter/camera changes render at once).")
+    parser.add_argument("--history", default=None,
+                        help="Persistent PV history directory, one per monitor process (disabled if not given).")
+    parser.add_argument("--sparklines", action="store_true",
+                        help="Show trend sparklines under the readouts (in-memory history).")
+    parser.add_argument("--sparkline-len", type=int, default=1440,
+                        help="Samples kept per PV for the sparklines (one per render: the time span depends on the render rate).")
+    parser.add_argument("--stats", action="store_true",
+                        help="Overlay saturation, mean/std, centroid and projections on the image.")
+    parser.add_argument("--json", default=None,
+                        help="Also write a JSON snapshot (image statistics) to this path each update.")
+    parser.add_argument("--tiles", default=None,
+                        help="Write a deep-zoom (DZI) tile pyramid of the full frame to this directory.")
+    parser.add_argument("--tile-format", default="png", choices=("png", "jpg"),
+                        help="Tile image format for --tiles.")
+    parser.add_argument("--timelapse", default=None,
+                        help="Write a rolling time-lapse of the dashboard to this directory.")
+    parser.add_argument("--timelapse-format", default="webp", choices=("webp", "mp4"),
+                        help="Animated WebP segments, or MP4 segments through a local ffmpeg.")
+    parser.add_argument("--timelapse-hours", type=float, default=12.0,
+                        help="Hours of time-lapse kept (older segments are deleted).")
+    parser.add_argument("--alarm-rules", default=None,
+                        help="JSON file with extra alarm rules (added to the built-in ones).")
+    parser.add_argument("--notify", action="append", default=[], metavar="SINK",
+                        help="Send alarm events to a JSONL file, smtp://host/to@addr or http(s)://webhook "
+                             "(repeatable, see notify.py).")
+    parser.add_argument("--notify-level", default="info", choices=("info", "minor", "major"),
+                        help="Lowest severity that is notified.")
+    parser.add_argument("--notify-rate", type=float, default=6.0,
+                        help="Notifications per hour and rule once the burst of 3 is used up.")
+    parser.add_argument("--status", default=None, metavar="PATH",
+                        help="Write a status JSON here every update (default: none). It "
+                             "holds host, pid and errors: keep it outside the web docroot.")
     args = parser.parse_args()
 
     if not args.view:
         matplotlib.use("Agg")
 
     source = DummyPVSource() if args.dummy else EpicsPVSource()
+    scheduler = AdaptiveScheduler(source, busy_pvs=BUSY_PVS, trigger_pvs=TRIGGER_PVS,
+                                  fast_period=args.fast_period, slow_period=args.period,
+                                  min_interval=args.min_interval)
+    rules = ALARM_RULES + (load_rules(args.alarm_rules) if args.alarm_rules else [])
+    alarms = AlarmEngine(rules)
+    alarms.add_listener(lambda event: print(format_event(event), flush=True))
+    if args.notify:
+        from notify import Notifier, make_sink
+        alarms.add_listener(Notifier([make_sink(s) for s in args.notify],
+                                     min_severity=args.notify_level, per_hour=args.notify_rate))
+    alarms.watch(source)
+    sinks = [alarms]
+    if args.history:
+        from history_store import HistoryStore
+        sinks.append(HistoryStore(args.history))
+    sparklines = None
+    if args.sparklines:
+        from sparkline import PVHistory, SparklineRow
+        sparklines = SparklineRow(PVHistory(capacity=args.sparkline_len))
+        sinks.append(sparklines.history)
+    from history_store import RecordingSource
+    source = RecordingSource(source, sinks)
+    tiles = None
+    if args.tiles:
+        from tile_pyramid import TileStore
+        tiles = TileStore(args.tiles, fmt=args.tile_format)
+    timelapse = None
+    if args.timelapse:
+        from timelapse import TimeLapse
+        timelapse = TimeLapse(args.timelapse, fmt=args.timelapse_format,
+                              hours=args.timelapse_hours)
+        timelapse.close_on_exit()
+    status = StatusFile(args.status, outputs=[args.out, args.json],
+                        period=args.period)
     fig = plt.figure(figsize=(6.5, 11.0), dpi=120)
 
     if args.view:
         while plt.fignum_exists(fig.number):
-            source.next_refresh()
-            render_7bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out)
-            plt.pause(0.1)
-            time.sleep(args.period)
+            with status.cycle():
+                source.next_refresh()
+                render_7bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out,
+                                     sparklines=sparklines,
+                                     stats_overlay=args.stats, json_out=args.json, tiles=tiles,
+                                     alarms=alarms)
+            if timelapse is not None:
+                timelapse.add_figure(fig)
+            scheduler.wait(sleep=plt.pause)
     else:
         while True:
-            source.next_refresh()
-            render_7bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out)
-            time.sleep(args.period)
+            with status.cycle():
+                source.next_refresh()
+                render_7bm_dashboard(fig, source, PV_DISPLAY, out_png=args.out,
+                                     sparklines=sparklines,
+                                     stats_overlay=args.stats, json_out=args.json, tiles=tiles,
+                                     alarms=alarms)
+            if timelapse is not None:
+                timelapse.add_figure(fig)
+            scheduler.wait()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,395 @@
+# alarm_rules.py
+#
+# Declarative alarm rules for the beamline monitors.
+#
+# Rules are plain dicts (like IOC_GROUPS), compiled once into an AlarmEngine.
+# Every rule has a boolean state, "active" (= the alarm condition holds):
+#
+#   {"name": "TomoScan", "kind": "enum", "pv": "...:ServerRunning", "ok": ["1", "running"]}
+#       active unless the value is one of `ok` (or: "alarm": [...], active if it is one of them)
+#   {"name": "Images Saved", "kind": "nonzero", "pv": "..."}
+#       active if the value is 0 / empty
+#   {"name": "Beam current", "kind": "threshold", "pv": "S:SRcurrentAI.VAL",
+#    "low": 1.0, "high": None, "deadband": 0.5}
+#       active below `low` / above `high`; clears only `deadband` inside the limits (hysteresis)
+#   {"name": "Current stale", "kind": "stale", "pv": "S:SRcurrentAI.VAL", "max_age": 300}
+#       active if the value has not changed for `max_age` seconds
+#   {"name": "Scan server down with beam", "kind": "all", "rules": ["TomoScan", {...}, ...]}
+#       "all" / "any" of other rules, by name or inline
+#
+# Optional keys: "severity" ("major" default, "minor", "info": state changes worth an
+# event but not an alarm, e.g. shutters, or None: display only, no events),
+# "missing" ("alarm" default, or "ok": how an unreadable PV counts), "message".
+#
+# The engine is a RecordingSource sink (record(pvname, t, value)) and can also follow
+# CA monitors (watch(source)). A new value re-evaluates only the rules reading that PV
+# and, if their state flips, the combinations above them. Stale rules are checked by
+# tick(). State flips of rules with a severity become events ({"time", "rule", "state":
+# "raised"/"cleared", ...}), kept in AlarmEngine.events and passed to the listeners.
+#
+# Usage (inside a monitor):
+#   alarms = AlarmEngine(ALARM_RULES)
+#   alarms.add_listener(print)
+#   source = RecordingSource(source, [alarms])
+#   ...
+#   alarms.tick()
+#   dot = alarms.color("TomoScan")          # "green" / "orange" / "red"
+#
+#   python alarm_rules.py rules.json        # check a rule file and print the compiled rules
+
+import argparse
+import heapq
+import json
+import threading
+import time
+from collections import deque
+
+
+# Values that mean "running" for IOC ServerRunning PVs (mode "server_running").
+RUNNING_WORDS = ("1", "true", "yes", "running", "on", "ok")
+
+SEVERITIES = ("major", "minor", "info", None)
+KINDS = ("enum", "nonzero", "threshold", "stale", "all", "any")
+
+
+def _norm(value):
+    """Comparable form of a PV value: None, or a stripped lower-case string ("1.0" -> "1")."""
+    if value is None:
+        return None
+    s = str(value).strip().lower()
+    try:
+        f = float(s)
+    except ValueError:
+        return s
+    return str(int(f)) if f.is_integer() else s
+
+
+def _float(norm):
+    try:
+        return float(norm)
+    except (TypeError, ValueError):
+        return None
+
+
+def rules_from_ioc_groups(groups):
+    """One rule per IOC_GROUPS entry, named by its label (modes server_running / nonzero_ok)."""
+    rules = []
+    for grp in groups:
+        rule = {"name": grp["label"], "pv": grp["running_pv"]}
+        if grp.get("mode") == "nonzero_ok":
+            rule["kind"] = "nonzero"
+        else:
+            rule["kind"] = "enum"
+            rule["ok"] = list(RUNNING_WORDS)
+        rules.append(rule)
+    return rules
+
+
+def load_rules(path):
+    with open(path) as f:
+        rules = json.load(f)
+    if not isinstance(rules, list):
+        raise ValueError(f"{path}: expected a JSON list of rules")
+    return rules
+
+
+class _Rule:
+    def __init__(self, spec, name):
+        kind = spec.get("kind")
+        if kind not in KINDS:
+            raise ValueError(f"alarm rule {name!r}: unknown kind {kind!r}")
+        severity = spec.get("severity", "major")
+        if severity not in SEVERITIES:
+            raise ValueError(f"alarm rule {name!r}: unknown severity {severity!r}")
+        self.name = name
+        self.kind = kind
+        self.severity = severity
+        self.missing_active = spec.get("missing", "alarm") != "ok"
+        self.message = spec.get("message", name)
+        self.pv = spec.get("pv")
+        if kind in ("all", "any"):
+            if self.pv is not None or not spec.get("rules"):
+                raise ValueError(f"alarm rule {name!r}: '{kind}' takes a list of rules, not a pv")
+        elif not self.pv:
+            raise ValueError(f"alarm rule {name!r}: missing pv")
+
+        self.ok = self.alarm = None
+        if kind == "enum":
+            if ("ok" in spec) == ("alarm" in spec):
+                raise ValueError(f"alarm rule {name!r}: enum needs exactly one of 'ok' / 'alarm'")
+            values = {_norm(v) for v in spec.get("ok", spec.get("alarm"))}
+            if "ok" in spec:
+                self.ok = values
+            else:
+                self.alarm = values
+        self.low = spec.get("low")
+        self.high = spec.get("high")
+        self.deadband = float(spec.get("deadband", 0.0))
+        if kind == "threshold" and self.low is None and self.high is None:
+            raise ValueError(f"alarm rule {name!r}: threshold needs 'low' and/or 'high'")
+        self.max_age = float(spec.get("max_age", 0.0))
+        if kind == "stale" and self.max_age <= 0:
+            raise ValueError(f"alarm rule {name!r}: stale needs a positive 'max_age'")
+
+        self.children = []      # _Rule, resolved by the engine
+        self.parents = []
+        self.rank = 0           # evaluation order: children before combinations
+        self.active = None      # None until first evaluated
+        self.since = None
+
+    def evaluate(self, value, changed, now):
+        """New state from the normalized value of self.pv (leaf rules)."""
+        if self.kind == "stale":
+            return now - changed > self.max_age
+        if value is None:
+            return self.missing_active
+        if self.kind == "enum":
+            return value not in self.ok if self.ok is not None else value in self.alarm
+        if self.kind == "nonzero":
+            f = _float(value)
+            return f == 0.0 if f is not None else value in ("", "0")
+        f = _float(value)
+        if f is None:
+            return self.missing_active
+        if self.active:
+            # hysteresis: stay active until the value is back inside by `deadband`
+            return not ((self.low is None or f >= self.low + self.deadband)
+                        and (self.high is None or f <= self.high - self.deadband))
+        return (self.low is not None and f < self.low) or (self.high is not None and f > self.high)
+
+
+class AlarmEngine:
+    """Compiled alarm rules, evaluated incrementally as PV values arrive."""
+
+    def __init__(self, rules, history=500):
+        self._lock = threading.RLock()
+        self._values = {}           # pv -> normalized value
+        self._raw = {}              # pv -> value as received
+        self._changed = {}          # pv -> time of the last change
+        self._start = time.time()
+        self._listeners = []
+        self.events = deque(maxlen=history)
+        self._compile(rules)
+
+    # ---- Compilation ----
+
+    def _compile(self, specs):
+        self.rules = {}             # name -> _Rule (named and inline)
+        self.names = []             # top-level rule names, in declaration order
+        pending = []                # (rule, child specs)
+
+        def add(spec, name):
+            if name in self.rules:
+                raise ValueError(f"duplicate alarm rule name {name!r}")
+            rule = self.rules[name] = _Rule(spec, name)
+            if rule.kind in ("all", "any"):
+                pending.append((rule, spec["rules"]))
+            return rule
+
+        for i, spec in enumerate(specs):
+            name = spec.get("name") or f"rule{i}"
+            add(spec, name)
+            self.names.append(name)
+        while pending:
+            rule, children = pending.pop()
+            for j, child in enumerate(children):
+                if isinstance(child, str):
+                    if child not in self.rules:
+                        raise ValueError(f"alarm rule {rule.name!r}: unknown rule {child!r}")
+                    sub = self.rules[child]
+                else:
+                    sub = add(dict(child, severity=child.get("severity")), f"{rule.name}[{j}]")
+                rule.children.append(sub)
+                sub.parents.append(rule)
+
+        # ranks (longest path from a leaf), rejecting cycles
+        state = {}
+
+        def rank(rule):
+            if state.get(rule.name) == "visiting":
+                raise ValueError(f"alarm rule {rule.name!r}: circular reference")
+            if state.get(rule.name) != "done":
+                state[rule.name] = "visiting"
+                rule.rank = 1 + max((rank(c) for c in rule.children), default=-1)
+                state[rule.name] = "done"
+            return rule.rank
+
+        for rule in self.rules.values():
+            rank(rule)
+
+        self._by_pv = {}            # pv -> leaf rules reading it
+        self._stale = []
+        for rule in self.rules.values():
+            if rule.pv is not None:
+                self._by_pv.setdefault(rule.pv, []).append(rule)
+            if rule.kind == "stale":
+                self._stale.append(rule)
+
+    @property
+    def pvs(self):
+        return list(self._by_pv)
+
+    # ---- Inputs ----
+
+    def add_listener(self, callback):
+        """callback(event) for every raised/cleared event (called outside the engine lock)."""
+        self._listeners.append(callback)
+
+    def watch(self, source):
+        """Follow the rule PVs with CA monitors, if the source has subscribe() (EpicsPVSource)."""
+        subscribe = getattr(source, "subscribe", None)
+        if subscribe is None:
+            return False
+        for pvname in self._by_pv:
+            subscribe(pvname, lambda pvname, value: self.record(pvname, time.time(), value))
+        return True
+
+    def record(self, pvname, t, value):
+        """RecordingSource sink: re-evaluate the rules that read `pvname` if its value changed."""
+        rules = self._by_pv.get(pvname)
+        if rules is None:
+            return
+        norm = _norm(value)
+        with self._lock:
+            if pvname in self._values and self._values[pvname] == norm:
+                return
+            self._values[pvname] = norm
+            self._raw[pvname] = value
+            self._changed[pvname] = t
+            events = self._update(rules, t)
+        self._dispatch(events)
+
+    def tick(self, now=None):
+        """Re-check the stale rules (call once per render cycle)."""
+        if not self._stale:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            events = self._update(self._stale, now)
+        self._dispatch(events)
+
+    # ---- Evaluation ----
+
+    def _state(self, rule, now):
+        if rule.kind == "all":
+            return all(self._current(c, now) for c in rule.children)
+        if rule.kind == "any":
+            return any(self._current(c, now) for c in rule.children)
+        return rule.evaluate(self._values.get(rule.pv),
+                             self._changed.get(rule.pv, self._start), now)
+
+    def _current(self, rule, now):
+        return rule.active if rule.active is not None else self._state(rule, now)
+
+    def _update(self, rules, now):
+        events = []
+        heap = [(r.rank, r.name) for r in rules]
+        heapq.heapify(heap)
+        seen = set()
+        while heap:
+            _, name = heapq.heappop(heap)
+            if name in seen:
+                continue
+            seen.add(name)
+            rule = self.rules[name]
+            if any(c.active is None for c in rule.children):
+                continue        # wait until every input has been seen once
+            new = self._state(rule, now)
+            old = rule.active
+            if new == old:
+                continue
+            rule.active = new
+            rule.since = now
+            for parent in rule.parents:
+                heapq.heappush(heap, (parent.rank, parent.name))
+            # first evaluation only reports an alarm that is already on
+            if rule.severity is not None and (old is not None or new):
+                events.append(self._event(rule, now))
+        return events
+
+    def _event(self, rule, now):
+        event = {
+            "time": now,
+            "rule": rule.name,
+            "state": "raised" if rule.active else "cleared",
+            "severity": rule.severity,
+            "message": rule.message,
+        }
+        if rule.pv is not None:
+            event["pv"] = rule.pv
+            event["value"] = self._raw.get(rule.pv)
+        self.events.append(event)
+        return event
+
+    def _dispatch(self, events):
+        for event in events:
+            for callback in self._listeners:
+                try:
+                    callback(event)
+                except Exception:
+                    pass    # a broken listener must not stop the monitor
+
+    # ---- Results ----
+
+    def active(self, name):
+        with self._lock:
+            return self._current(self.rules[name], time.time())
+
+    def color(self, name, ok="green"):
+        """Dashboard colour of a rule: `ok`, "orange" (minor) or "red"."""
+        if not self.active(name):
+            return ok
+        return "orange" if self.rules[name].severity == "minor" else "red"
+
+    def snapshot(self):
+        """{name: {"active", "severity", "since"}} of the top-level rules (JSON-friendly)."""
+        now = time.time()
+        with self._lock:
+            return {
+                name: {"active": bool(self._current(r, now)), "severity": r.severity,
+                       "since": r.since}
+                for name, r in ((n, self.rules[n]) for n in self.names)
+            }
+
+
+_SHARED = {}
+
+
+def shared_engine(rules):
+    """
+    One AlarmEngine per rule list for the life of the process, for renders called
+    without an engine: a new one per call would forget hysteresis and stale timers.
+    """
+    engine = _SHARED.get(id(rules))
+    if engine is None:
+        engine = _SHARED[id(rules)] = AlarmEngine(rules)
+    return engine
+
+
+def format_event(event):
+    """One log line for an event: ALARM (major/minor) or EVENT (info, e.g. shutters)."""
+    stamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(event["time"]))
+    value = f" value={event['value']!r}" if "value" in event else ""
+    label = "EVENT" if event["severity"] == "info" else "ALARM"
+    return (f"[{stamp}] {label} {event['state']}: {event['rule']} "
+            f"({event['severity']}){value}  {event['message']}")
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Check an alarm rule file (JSON list of rules).")
+    parser.add_argument("rules", help="JSON rule file.")
+    args = parser.parse_args()
+
+    engine = AlarmEngine(load_rules(args.rules))
+    for rule in sorted(engine.rules.values(), key=lambda r: (r.rank, r.name)):
+        inputs = rule.pv if rule.pv is not None else ", ".join(c.name for c in rule.children)
+        print(f"{rule.rank}  {rule.kind:<9} {str(rule.severity):<6} {rule.name:<32} {inputs}")
+    print(f"{len(engine.rules)} rules, {len(engine.pvs)} PVs")
+
+
+if __name__ == "__main__":
+    main()
@@ -4,67 +4,53 @@ import os
 import time
 from datetime import datetime
 from io import BytesIO
-from urllib.parse import urljoin
 
-import requests
-from bs4 import BeautifulSoup
 from PIL import Image
 
+import http_client
+from image_fetch import (cached_image_url, digest, download_image_bytes,
+                         fetch_first_image_url, forget, image_gone, invalidate_image_url,
+                         mark_written, new_counters, probe, unchanged, write_atomic)
+from scheduling import CircuitBreaker, FixedRateTimer
+from status_file import StatusFile
 
-PAGE_URL = "https://www3.aps.anl.gov/aod/blops/status/smallHistory.html"
-
-
-def fetch_first_image_url(page_url: str, timeout=15) -> str:
-    r = requests.get(page_url, timeout=timeout)
-    r.raise_for_status()
-    soup = BeautifulSoup(r.text, "html.parser")
-
-    img = soup.find("img")
-    if img is None or not img.get("src"):
-        raise RuntimeError(f"No <img src=...> found on {page_url}")
-
-    return urljoin(page_url, img["src"])
-
-
-def download_image_bytes(img_url: str, timeout=30) -> bytes:
-    r = requests.get(img_url, timeout=timeout)
-    r.raise_for_status()
-    return r.content
-
-
-def save_as_png(img_bytes: bytes, out_png: str):
-    im = Image.open(BytesIO(img_bytes))
-    if im.mode not in ("RGB", "RGBA"):
-        im = im.convert("RGBA")
-    im.save(out_png, format="PNG")
 
+PAGE_URL = "https://www3.aps.anl.gov/aod/blops/status/smallHistory.html"
 
-# def _fmt_ts(epoch: float | None) -> str:
-def _fmt_ts(epoch) -> str:
-    if epoch is None:
-        return "-"
-    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S")
-
-
-def print_status_table(out_path: str):
-    out_path = os.path.abspath(out_path)
-    directory = os.path.dirname(out_path)
-    filename = os.path.basename(out_path)
-
-    last_update = None
-    size = None
-    if os.path.exists(out_path):
-        st = os.stat(out_path)
-        last_update = st.st_mtime
-        size = st.st_size
-
-    print()
-    print(f"Update: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"{'LAST_UPDATE':<20} {'SIZE':>12}  {'FILENAME':<25} {'DIRECTORY'}")
-    print(f"{'-'*20} {'-'*12}  {'-'*25} {'-'*60}")
-    print(f"{_fmt_ts(last_update):<20} {str(size if size is not None else '-'):>12}  "
-          f"{filename:<25} {directory}")
-    print(flush=True)
+# per-cycle transfer counters (image_fetch.new_counters()), reset by main()
+TRANSFER = new_counters()
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def save_as_png(img_bytes: bytes, out_png: str, quantize=None, optimize=False) -> bool:
+    """
+    Write the downloaded image to out_png as PNG; returns False if nothing was written.
+
+    - content identical to what was last written (hash of the source bytes) is skipped
+    - PNG input is written as-is (temp file + rename), without decoding
+    - other formats are decoded and re-encoded, optionally quantized to a palette of
+      `quantize` colours and with optimize=True
+    """
+    source_digest = digest(img_bytes)
+    is_png = img_bytes.startswith(PNG_SIGNATURE)
+    # (after a restart a PNG is compared with the file already there: one read, no write)
+    if unchanged(out_png, source_digest, len(img_bytes) if is_png else None):
+        return False
+
+    if is_png:
+        write_atomic(out_png, img_bytes)
+    else:
+        im = Image.open(BytesIO(img_bytes))
+        if quantize:
+            im = im.convert("RGB").quantize(colors=int(quantize))
+        elif im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        buf = BytesIO()
+        im.save(buf, format="PNG", optimize=optimize)
+        write_atomic(out_png, buf.getvalue())
+    mark_written(out_png, source_digest)
+    return True
 
 
 def main():
@@ -76,28 +62,109 @@ def main():
         help="Output PNG file path (if a directory is given, smallHistory.png is used inside it).",
     )
     parser.add_argument("--period", type=int, default=60,
-                        help="Update period in seconds.")
+                        help="Update period in seconds (fixed rate: the fetch time is not added).")
+    parser.add_argument("--jitter", type=float, default=0.05,
+                        help="Random shift of each cycle, as a fraction of the period.")
+    parser.add_argument("--breaker-failures", type=int, default=3,
+                        help="Consecutive failed cycles before backing off from the server.")
+    parser.add_argument("--breaker-backoff", type=float, default=300.0,
+                        help="Seconds to back off after --breaker-failures (doubles while the probe fails).")
+    parser.add_argument("--breaker-max", type=float, default=3600.0,
+                        help="Longest back-off in seconds.")
+    parser.add_argument("--page-recheck", type=float, default=3600.0,
+                        help="Seconds between checks of the HTML page for a new image URL.")
+    parser.add_argument("--quantize", type=int, default=None, metavar="COLORS",
+                        help="Re-encoded (non-PNG) images: reduce to a palette of this many colours.")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Re-encoded (non-PNG) images: PNG optimize=True (smaller, slower).")
+    parser.add_argument("--archive", default=None, metavar="DIR",
+                        help="Also keep every distinct image in a content-addressed archive.")
+    parser.add_argument("--status", default=None, metavar="PATH",
+                        help="Write a status JSON here every cycle (default: none). It "
+                             "holds host, pid and errors: keep it outside the web docroot.")
     args = parser.parse_args()
 
     out_path = args.out
     if os.path.isdir(out_path):
         out_path = os.path.join(out_path, "smallHistory.png")
 
-    # print an initial table even before first successful fetch
-    print_status_table(out_path)
+    archive = None
+    if args.archive:
+        from image_archive import ImageArchive
+        archive = ImageArchive(args.archive)
+
+    status_file = StatusFile(args.status, outputs=[out_path],
+                             period=args.period)
+
+    timer = FixedRateTimer(args.period, jitter=args.jitter)
+    breaker = CircuitBreaker(threshold=args.breaker_failures, backoff=args.breaker_backoff,
+                             max_backoff=args.breaker_max)
+    # the breaker does the retrying: a failed request fails the cycle at once instead of
+    # being retried with backoff by urllib3 inside it, which stretched the fixed period
+    http_client.configure(retries=0)
 
     while True:
+        for k in TRANSFER:
+            TRANSFER[k] = 0
+        if not breaker.ready():
+            # backing off: no request at all until the breaker lets a probe through
+            status_file.update(circuit=breaker.state, retry_in=round(breaker.retry_in()))
+            timer.wait()
+            continue
+
+        cpu0 = time.process_time()
+        t0 = time.perf_counter()
+        status = "updated"
+        error = None
         try:
-            img_url = fetch_first_image_url(PAGE_URL)
-            img_bytes = download_image_bytes(img_url)
-            save_as_png(img_bytes, out_path)
+            if breaker.state == "half-open":
+                probe_url = cached_image_url(PAGE_URL) or PAGE_URL
+                if not probe(probe_url, counters=TRANSFER):
+                    raise RuntimeError(f"probe failed: HEAD {probe_url}")
+            img_url = fetch_first_image_url(PAGE_URL, timeout=15, recheck=args.page_recheck,
+                                            counters=TRANSFER)
+            if not os.path.exists(out_path):
+                forget(img_url)     # output gone: download it again even if unchanged
+            try:
+                img_bytes = download_image_bytes(img_url, timeout=30, counters=TRANSFER)
+            except Exception as e:
+                if not image_gone(e):
+                    raise           # timeout / 5xx: the server is the problem, not the URL
+                # the page may point to a different image now: resolve it again
+                invalidate_image_url(PAGE_URL)
+                img_url = fetch_first_image_url(PAGE_URL, timeout=15, recheck=args.page_recheck,
+                                                counters=TRANSFER)
+                img_bytes = download_image_bytes(img_url, timeout=30, counters=TRANSFER)
+            if img_bytes is None:
+                status = "not modified"     # 304: nothing to decode or write
+            else:
+                if not save_as_png(img_bytes, out_path, quantize=args.quantize,
+                                   optimize=args.optimize):
+                    status = "unchanged"        # same bytes as the file already written
+                if archive is not None and archive.add(os.path.basename(out_path), img_bytes):
+                    status += ", archived"
+            breaker.success()
         except Exception as e:
             # keep looping; just report error on stderr-like output
+            status = "error"
+            error = e
             print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: {e}", flush=True)
-
-        # always print the status table after each cycle
-        print_status_table(out_path)
-        time.sleep(args.period)
+            if breaker.failure():
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {breaker.failures} failures: "
+                      f"backing off for {breaker.retry_in():.0f} s", flush=True)
+
+        cpu_ms = 1e3 * (time.process_time() - cpu0)
+        print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] {status}: "
+              f"{TRANSFER['requests']} requests ({TRANSFER['not_modified']} not modified, "
+              f"{TRANSFER['parsed']} parsed), "
+              f"{TRANSFER['bytes'] / 1024:.1f} kB, cpu {cpu_ms:.1f} ms", flush=True)
+
+        extra = {"result": status, "circuit": breaker.state, "retry_in": round(breaker.retry_in())}
+        if error is None:
+            status_file.success(time.perf_counter() - t0, bytes=TRANSFER["bytes"], **extra)
+        else:
+            status_file.failure(error, time.perf_counter() - t0, **extra)
+        timer.wait()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,36 @@
+# atomic_file.py
+#
+# Whole-file writes through a temp file + rename, so readers (the web server, the
+# phones, aps_status.sh) never see a partially written file. Used for the monitors'
+# JSON snapshots, the status files (status_file.py) and the mirrored images
+# (image_fetch.py).
+#
+# The temp file is <path>.<pid>.tmp next to the target: os.replace is only atomic
+# within one filesystem, and web_mirror.py never serves *.tmp files.
+#
+# Usage:
+#   write_json("/path/02bm_monitor.json", {"time": ..., "pvs": {...}})
+#   write_bytes("/path/smallHistory.png", data)
+
+import json
+import os
+
+
+def write_bytes(path, data):
+    """Replace `path` with `data` (bytes) in one step."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def write_json(path, data, **kwargs):
+    """Replace `path` with `data` as JSON (json.dumps keyword arguments in `kwargs`)."""
+    write_bytes(path, json.dumps(data, **kwargs).encode())
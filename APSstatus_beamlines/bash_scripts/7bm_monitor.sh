@@ -5,15 +5,18 @@ HOST="7bmb@stokes"
 ENV="APSstatus"
 SCRIPT="07bm_monitor.py"
 OUTPNG="/net/joulefs/coulomb_Public/docroot/tomolog/07bm_monitor.png"
+# status JSON (status_file.py) read by aps_status.sh; not under the web docroot
+STATUSJSON="${APS_STATUS_DIR:-/net/joulefs/coulomb_Public/apsstatus_status}/07bm_monitor.status.json"
 
 ACTION="${1:-}"
 case "$ACTION" in start|stop|status) ;; *) echo "Usage: $0 {start|stop|status}"; exit 2;; esac
 
-ssh -T "$HOST" bash -s -- "$ACTION" "$ENV" "$SCRIPT" "$OUTPNG" <<'REMOTE'
+ssh -T "$HOST" bash -s -- "$ACTION" "$ENV" "$SCRIPT" "$OUTPNG" "$STATUSJSON" <<'REMOTE'
 ACTION="$1"
 ENV="$2"
 SCRIPT="$3"
 OUTPNG="$4"
+STATUSJSON="$5"
 
 RUNDIR="$HOME/.apsstatus_monitors"
 PIDFILE="$RUNDIR/07bm.pid"
@@ -52,7 +55,8 @@ start() {
   conda activate "$ENV"
   cd "$WORKDIR"
 
-  nohup python "$SCRIPT" >> "$LOGFILE" 2>&1 &
+  mkdir -p "$(dirname "$STATUSJSON")"
+  nohup python "$SCRIPT" --status "$STATUSJSON" >> "$LOGFILE" 2>&1 &
   echo $! > "$PIDFILE"
   echo "07bm started (pid $(cat "$PIDFILE"))"
 }
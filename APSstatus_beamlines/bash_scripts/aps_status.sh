@@ -5,6 +5,10 @@ usage() {
   cat <<'EOF'
 Usage:
   aps_status.sh [--parallel] {start|stop|status|restart|logs}
+
+status reads the *.status.json each monitor writes to $STATUS_DIR (--status of the
+start scripts, status_file.py) and only falls back to SSH for monitors whose status
+file is missing or stale.
 EOF
 }
 
@@ -24,6 +28,19 @@ ITEMS=(
   "32id|$HOME/bin/32id_monitor.sh|usertxm@gauss|/net/joulefs/coulomb_Public/docroot/tomolog/32id_monitor.png"
 )
 
+# status JSON files: shared, but outside the web docroot (they hold hosts, pids and
+# error messages); the start scripts pass --status "$STATUS_DIR/<png name>.status.json"
+STATUS_DIR="${APS_STATUS_DIR:-/net/joulefs/coulomb_Public/apsstatus_status}"
+# status_file.py (the summary line and the staleness rule come from it)
+STATUS_PY="$(dirname "$(readlink -f "$0")")/../status_file.py"
+[[ -f "$STATUS_PY" ]] || STATUS_PY="$HOME/conda/APSstatus/APSstatus_beamlines/status_file.py"
+
+# status JSON of processes without a start/stop script (shown by "status" only)
+EXTRA_STATUS=(
+  "$STATUS_DIR/smallHistory.status.json"
+  "$STATUS_DIR/web_mirror.status.json"
+)
+
 tmpdir="$(mktemp -d)"
 trap 'rm -rf "$tmpdir"' EXIT
 
@@ -58,10 +75,25 @@ png_stat_ssh() {
   ssh -T "$host" "bash -lc 'stat -c \"%y %s\" \"$png\" 2>/dev/null'" 2>/dev/null || true
 }
 
+status_json() {
+  local json="$1" png="${2:-}"
+  # returns: "STATE|PID|ELAPSED|PNG_TIME|PNG_SIZE|DETAIL" from a status_file.py JSON, or empty
+  python3 "$STATUS_PY" --line ${png:+--output "$png"} "$json" 2>/dev/null || true
+}
+
 # Run scripts
 pids=()
 for item in "${ITEMS[@]}"; do
   IFS='|' read -r beam script host png <<<"$item"
+  if [[ "$ACTION" == "status" ]]; then
+    # one read of the shared status file instead of SSH, unless it is missing or stale
+    line="$(status_json "$STATUS_DIR/$(basename "$png" .png).status.json" "$png")"
+    if [[ -n "$line" && "$line" != stale\|* ]]; then
+      echo "$line" >"$tmpdir/${beam}.json"
+      echo 0 >"$tmpdir/${beam}.rc"
+      continue
+    fi
+  fi
   if (( PARALLEL )); then
     run_one "$beam" "$script" &
     pids+=("$!")
@@ -86,6 +118,13 @@ if [[ "$ACTION" == "status" ]]; then
     rcf="$tmpdir/${beam}.rc"
     thisrc="$(cat "$rcf" 2>/dev/null || echo 1)"
 
+    if [[ -f "$tmpdir/${beam}.json" ]]; then
+      IFS='|' read -r state pid etime pngts pngsz cmd <"$tmpdir/${beam}.json"
+      printf "%-6s %-16s %-8s %-10s %-28s %-10s %s\n" \
+        "$beam" "$state" "$pid" "$etime" "$pngts" "$pngsz" "$cmd"
+      continue
+    fi
+
     state="not running"; pid="-"; etime="-"; cmd="-"; pngts="-"; pngsz="-"
 
     # PID from: "... running (pid 12345)"
@@ -131,6 +170,18 @@ if [[ "$ACTION" == "status" ]]; then
     [[ "$thisrc" -eq 0 || "$thisrc" -eq 1 ]] || overall=1
   done
 
+  for json in "${EXTRA_STATUS[@]}"; do
+    name="$(basename "$json" .status.json)"
+    line="$(status_json "$json")"
+    if [[ -z "$line" ]]; then
+      printf "%-6s %-16s %-8s %-10s %-28s %-10s %s\n" "$name" "no status" "-" "-" "-" "-" "$json"
+      continue
+    fi
+    IFS='|' read -r state pid etime pngts pngsz cmd <<<"$line"
+    printf "%-6s %-16s %-8s %-10s %-28s %-10s %s\n" \
+      "$name" "$state" "$pid" "$etime" "$pngts" "$pngsz" "$cmd"
+  done
+
   exit "$overall"
 else
   printf "%-6s %-14s %s\n" "BL" "RESULT" "MESSAGE"
@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+# history_store.py
+#
+# Persistent per-PV history for the beamline monitors, with tiered downsampling.
+#
+# Layout (one directory per PV, one subdirectory per tier):
+#   <root>/<quoted pv name>/raw/000000.dat ...   raw samples      (t, value)
+#   <root>/<quoted pv name>/1m/000000.dat ...    1 min rollups    (t, min, mean, max, n)
+#   <root>/<quoted pv name>/10m/...              10 min rollups
+#   <root>/<quoted pv name>/1h/...               1 h rollups
+#
+# Each chunk file is a 16-byte header (magic, version, record count) followed by a
+# preallocated block of fixed-width little-endian records, accessed with np.memmap.
+# Rollup records are keyed by bucket start time and are maintained on every append
+# directly from the raw sample, so a query over "last 24 h" reads ~1440 one-minute
+# records and never touches raw data.
+#
+# Usage (inside a monitor):
+#   store = HistoryStore("/path/to/history")
+#   source = RecordingSource(source, [store])       # every caget result is recorded
+#
+# Usage (command line):
+#   python history_store.py /path/to/history --list
+#   python history_store.py /path/to/history S:SRcurrentAI.VAL --hours 24
+#
+# Requirements:
+#   pip install numpy
+#
+# Notes:
+# - Non-numeric values (enum strings, None) are ignored.
+# - Samples must be time ordered per PV; a sample not newer than the last one is dropped.
+# - One writer per store: give each monitor process its own directory.
+# - The rollup bucket in progress lives in memory and is included in query results; after
+#   a restart it is rebuilt from the raw tail after the last flushed rollup (normally less
+#   than one bucket of raw data per tier).
+
+import argparse
+import bisect
+import math
+import os
+import struct
+import time
+from datetime import datetime
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+
+MAGIC = b"APSH"
+VERSION = 1
+HEADER_SIZE = 16  # magic(4) version(u2) reserved(u2) count(u8)
+
+RAW_DTYPE = np.dtype([("t", "<f8"), ("value", "<f8")])
+ROLLUP_DTYPE = np.dtype([("t", "<f8"), ("min", "<f8"), ("mean", "<f8"),
+                         ("max", "<f8"), ("n", "<u4"), ("pad", "<u4")])
+
+# name, bucket seconds (None = raw), records per chunk file
+TIERS = [
+    ("raw", None, 65536),   # 1 MiB chunks
+    ("1m", 60, 16384),      # ~11 days per chunk
+    ("10m", 600, 8192),     # ~57 days per chunk
+    ("1h", 3600, 8192),     # ~11 months per chunk
+]
+
+
+# ----------------------------
+# Chunked record files
+# ----------------------------
+
+def _create_chunk(path, dtype, capacity):
+    with open(path, "wb") as f:
+        f.write(MAGIC + struct.pack("<HHQ", VERSION, 0, 0))
+        f.truncate(HEADER_SIZE + dtype.itemsize * capacity)  # sparse on Linux
+
+
+def _open_chunk(path, dtype, mode):
+    with open(path, "rb") as f:
+        head = f.read(HEADER_SIZE)
+    if head[:4] != MAGIC:
+        raise ValueError(f"Not a history chunk: {path}")
+    capacity = (os.path.getsize(path) - HEADER_SIZE) // dtype.itemsize
+    count = np.memmap(path, dtype="<u8", mode=mode, offset=8, shape=(1,))
+    recs = np.memmap(path, dtype=dtype, mode=mode, offset=HEADER_SIZE, shape=(capacity,))
+    return count, recs
+
+
+class _Tier:
+    """Append-only, time-ordered records split across fixed-size chunk files."""
+
+    def __init__(self, dirpath, dtype, capacity):
+        self.dir = dirpath
+        self.dtype = dtype
+        self.capacity = int(capacity)
+        os.makedirs(dirpath, exist_ok=True)
+
+        self.chunks = sorted(int(n[:-4]) for n in os.listdir(dirpath) if n.endswith(".dat"))
+        self.first_t = []
+        for c in self.chunks:
+            count, recs = _open_chunk(self._path(c), dtype, "r")
+            self.first_t.append(float(recs["t"][0]) if count[0] else math.inf)
+        self._count = None
+        self._recs = None
+        if self.chunks:
+            self._count, self._recs = _open_chunk(self._path(self.chunks[-1]), dtype, "r+")
+
+    def _path(self, chunk):
+        return os.path.join(self.dir, f"{chunk:06d}.dat")
+
+    def last(self):
+        if self._count is None or not self._count[0]:
+            return None
+        return self._recs[int(self._count[0]) - 1]
+
+    def append(self, rec):
+        if self._count is None or self._count[0] >= len(self._recs):
+            chunk = self.chunks[-1] + 1 if self.chunks else 0
+            _create_chunk(self._path(chunk), self.dtype, self.capacity)
+            if self._recs is not None:
+                self._recs.flush()
+                self._count.flush()
+            self._count, self._recs = _open_chunk(self._path(chunk), self.dtype, "r+")
+            self.chunks.append(chunk)
+            self.first_t.append(math.inf)
+        i = int(self._count[0])
+        self._recs[i] = rec
+        self._count[0] = i + 1          # publish after the record is written
+        if i == 0:
+            self.first_t[-1] = float(rec[0])
+
+    def read(self, t0, t1):
+        """Copy of the records with t0 <= t <= t1; only overlapping chunks are opened."""
+        if not self.chunks:
+            return np.empty(0, dtype=self.dtype)
+        lo = max(0, bisect.bisect_right(self.first_t, t0) - 1)
+        hi = bisect.bisect_right(self.first_t, t1)
+        parts = []
+        for k in range(lo, hi):
+            if k == len(self.chunks) - 1 and self._recs is not None:
+                count, recs = self._count, self._recs
+            else:
+                count, recs = _open_chunk(self._path(self.chunks[k]), self.dtype, "r")
+            recs = recs[: int(count[0])]
+            ts = recs["t"]
+            i0 = np.searchsorted(ts, t0, side="left")
+            i1 = np.searchsorted(ts, t1, side="right")
+            if i1 > i0:
+                parts.append(np.array(recs[i0:i1]))
+        if not parts:
+            return np.empty(0, dtype=self.dtype)
+        return np.concatenate(parts)
+
+    def flush(self):
+        if self._recs is not None:
+            self._recs.flush()
+            self._count.flush()
+
+
+# ----------------------------
+# Per-PV history
+# ----------------------------
+
+class _Bucket:
+    __slots__ = ("start", "vmin", "vmax", "vsum", "n")
+
+    def __init__(self, start, v):
+        self.start = start
+        self.vmin = v
+        self.vmax = v
+        self.vsum = v
+        self.n = 1
+
+    def add(self, v):
+        if v < self.vmin:
+            self.vmin = v
+        if v > self.vmax:
+            self.vmax = v
+        self.vsum += v
+        self.n += 1
+
+    def record(self):
+        return (self.start, self.vmin, self.vsum / self.n, self.vmax, self.n, 0)
+
+
+class PVHistoryFile:
+    """Raw samples + rollup tiers for one PV."""
+
+    def __init__(self, dirpath):
+        self.tiers = {}
+        self.steps = {}
+        for name, step, capacity in TIERS:
+            dtype = RAW_DTYPE if step is None else ROLLUP_DTYPE
+            self.tiers[name] = _Tier(os.path.join(dirpath, name), dtype, capacity)
+            self.steps[name] = step
+
+        last = self.tiers["raw"].last()
+        self.last_t = float(last["t"]) if last is not None else -math.inf
+
+        # rebuild in-progress buckets from the raw tail after the last flushed rollup
+        self.buckets = {}
+        for name, step in self.steps.items():
+            if step is None:
+                continue
+            self.buckets[name] = None
+            flushed = self.tiers[name].last()
+            t_from = float(flushed["t"]) + step if flushed is not None else -math.inf
+            if self.last_t < t_from:
+                continue
+            tail = self.tiers["raw"].read(t_from, self.last_t)
+            for t, v in zip(tail["t"], tail["value"]):
+                self._add_to_bucket(name, step, float(t), float(v))
+
+    def _add_to_bucket(self, name, step, t, v):
+        start = math.floor(t / step) * step
+        b = self.buckets[name]
+        if b is not None and b.start == start:
+            b.add(v)
+            return
+        if b is not None:
+            self.tiers[name].append(b.record())
+        self.buckets[name] = _Bucket(start, v)
+
+    def append(self, t, v):
+        if t <= self.last_t:
+            return False
+        self.tiers["raw"].append((t, v))
+        self.last_t = t
+        for name, step in self.steps.items():
+            if step is not None:
+                self._add_to_bucket(name, step, t, v)
+        return True
+
+    def read(self, tier, t0, t1):
+        recs = self.tiers[tier].read(t0, t1)
+        b = self.buckets.get(tier)
+        if b is not None and t0 <= b.start <= t1:
+            live = np.array([b.record()], dtype=ROLLUP_DTYPE)
+            recs = np.concatenate([recs, live]) if recs.size else live
+        return recs
+
+    def flush(self):
+        for tier in self.tiers.values():
+            tier.flush()
+
+
+# ----------------------------
+# Store
+# ----------------------------
+
+class HistoryStore:
+    """
+    Directory of PVHistoryFile objects, opened lazily on first record/query.
+
+    Implements the sink interface used by RecordingSource: record(pvname, t, value).
+    """
+
+    def __init__(self, root, raw_max_span=3600.0, flush_interval=60.0):
+        self.root = root
+        self.raw_max_span = float(raw_max_span)
+        self.flush_interval = float(flush_interval)
+        self._pvs = {}
+        self._last_flush = time.monotonic()
+        os.makedirs(root, exist_ok=True)
+
+    def _pv(self, pvname, create=True):
+        """PVHistoryFile of pvname; None if it has no directory yet and create is False."""
+        h = self._pvs.get(pvname)
+        if h is None:
+            path = os.path.join(self.root, quote(pvname, safe=""))
+            if not create and not os.path.isdir(path):
+                return None
+            h = PVHistoryFile(path)
+            self._pvs[pvname] = h
+        return h
+
+    def pvs(self):
+        return sorted(unquote(n) for n in os.listdir(self.root)
+                      if os.path.isdir(os.path.join(self.root, n)))
+
+    def record(self, pvname, t, value):
+        if value is None or isinstance(value, str):
+            return
+        try:
+            v = float(value)
+        except (TypeError, ValueError):
+            return
+        if not math.isfinite(v):
+            return
+        self._pv(pvname).append(float(t), v)
+
+        now = time.monotonic()
+        if now - self._last_flush >= self.flush_interval:
+            self.flush()
+            self._last_flush = now
+
+    def choose_tier(self, span, max_points=2000):
+        """Raw for short spans, else the finest rollup with at most max_points buckets."""
+        if span <= self.raw_max_span:
+            return "raw"
+        for name, step, _ in TIERS:
+            if step is not None and span / step <= max_points:
+                return name
+        return TIERS[-1][0]
+
+    def query(self, pvname, t0, t1=None, max_points=2000, tier=None):
+        """
+        Return (tier_name, records) for pvname over [t0, t1] (epoch seconds, t1 defaults to now).
+        raw records have fields t/value; rollups have t (bucket start)/min/mean/max/n.
+        A PV that was never recorded gives no records (and is not created).
+        """
+        t1 = time.time() if t1 is None else t1
+        tier = tier or self.choose_tier(t1 - t0, max_points)
+        h = self._pv(pvname, create=False)     # a query never creates a PV directory
+        if h is None:
+            return tier, np.empty(0, dtype=RAW_DTYPE if tier == "raw" else ROLLUP_DTYPE)
+        return tier, h.read(tier, t0, t1)
+
+    def flush(self):
+        for h in self._pvs.values():
+            h.flush()
+
+
+class RecordingSource:
+    """
+    Wraps a DummyPVSource/EpicsPVSource and forwards every caget result to sinks
+    (objects with record(pvname, t, value)). Everything else is passed through.
+    """
+
+    def __init__(self, source, sinks, pvnames=None):
+        self._source = source
+        self._sinks = list(sinks)
+        self._pvnames = set(pvnames) if pvnames is not None else None
+
+    def next_refresh(self):
+        self._source.next_refresh()
+
+    def caget(self, pvname, **kwargs):
+        val = self._source.caget(pvname, **kwargs)
+        if self._pvnames is None or pvname in self._pvnames:
+            t = time.time()
+            for sink in self._sinks:
+                sink.record(pvname, t, val)
+        return val
+
+    def __getattr__(self, name):
+        return getattr(self._source, name)
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect a monitor history store.")
+    parser.add_argument("root", help="History store directory.")
+    parser.add_argument("pv", nargs="?", help="PV name to query.")
+    parser.add_argument("--list", action="store_true", help="List recorded PVs.")
+    parser.add_argument("--hours", type=float, default=24.0, help="Query span ending now.")
+    parser.add_argument("--max-points", type=int, default=2000,
+                        help="Pick the finest tier with at most this many points.")
+    parser.add_argument("--tier", choices=[t[0] for t in TIERS], help="Force a tier.")
+    args = parser.parse_args()
+
+    store = HistoryStore(args.root)
+    if args.list or not args.pv:
+        for pv in store.pvs():
+            print(pv)
+        return
+
+    t1 = time.time()
+    t0_query = time.perf_counter()
+    tier, recs = store.query(args.pv, t1 - args.hours * 3600.0, t1,
+                             max_points=args.max_points, tier=args.tier)
+    dt = time.perf_counter() - t0_query
+
+    print(f"{args.pv}: tier {tier}, {recs.size} records, query {dt*1e3:.2f} ms")
+    if recs.size:
+        first = datetime.fromtimestamp(recs["t"][0]).strftime("%Y-%m-%d %H:%M:%S")
+        last = datetime.fromtimestamp(recs["t"][-1]).strftime("%Y-%m-%d %H:%M:%S")
+        if tier == "raw":
+            v = recs["value"]
+            print(f"  {first} .. {last}  min {v.min():.6g}  mean {v.mean():.6g}  max {v.max():.6g}")
+        else:
+            n = recs["n"].astype(float)
+            mean = float((recs["mean"] * n).sum() / n.sum())
+            print(f"  {first} .. {last}  min {recs['min'].min():.6g}  mean {mean:.6g}"
+                  f"  max {recs['max'].max():.6g}")
+
+
+if __name__ == "__main__":
+    main()
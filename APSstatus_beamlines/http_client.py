@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# http_client.py
+#
+# Shared HTTP client for the status fetchers and scrapers.
+#
+# One pooled requests.Session per host (scheme + host + port), so polling loops reuse
+# kept-alive TCP/TLS connections instead of opening a new one per request:
+#   - pool of `pool_maxsize` connections per host
+#   - default (connect, read) timeout on every request
+#   - retries with exponential backoff on connection errors and 429/5xx responses
+#     (Retry-After is honoured)
+#
+# Usage:
+#   import http_client
+#   r = http_client.get(url, params={...})        # same arguments as requests.get
+#   http_client.configure(retries=5, timeout=(3, 60))   # before the first request
+#
+# Requirements:
+#   pip install requests
+#
+# Notes:
+# - This is the only copy: APSstatus_tools/http_client.py and ESRFstatus_tools/http_client.py
+#   are shims that load this file, so the standalone scripts there keep importing it by
+#   name.
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+USER_AGENT = "APSstatus-fetcher"
+
+_config = {
+    "timeout": (5.0, 30.0),     # (connect, read) seconds
+    "retries": 3,
+    "backoff": 0.5,             # sleeps 0.5, 1, 2 ... s between retries
+    "pool_maxsize": 4,
+}
+_sessions = {}                  # (scheme, netloc) -> Session
+_lock = threading.Lock()
+
+
+def configure(timeout=None, retries=None, backoff=None, pool_maxsize=None):
+    """Change the defaults; applies to sessions created afterwards."""
+    for key, value in (("timeout", timeout), ("retries", retries),
+                       ("backoff", backoff), ("pool_maxsize", pool_maxsize)):
+        if value is not None:
+            _config[key] = value
+
+
+def _new_session():
+    retry = Retry(
+        total=_config["retries"],
+        backoff_factor=_config["backoff"],
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET", "HEAD"),
+        respect_retry_after_header=True,
+        raise_on_status=False,      # hand the last response back; callers raise_for_status
+    )
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=_config["pool_maxsize"],
+                          max_retries=retry)
+    s = requests.Session()
+    s.mount("http://", adapter)
+    s.mount("https://", adapter)
+    s.headers["User-Agent"] = USER_AGENT
+    return s
+
+
+def session(url):
+    """The pooled Session for the host of `url`."""
+    u = urlsplit(url)
+    key = (u.scheme, u.netloc)
+    s = _sessions.get(key)
+    if s is None:
+        with _lock:
+            s = _sessions.get(key)
+            if s is None:
+                s = _sessions[key] = _new_session()
+    return s
+
+
+def request(method, url, **kwargs):
+    kwargs.setdefault("timeout", _config["timeout"])
+    return session(url).request(method, url, **kwargs)
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def head(url, **kwargs):
+    kwargs.setdefault("allow_redirects", True)
+    return request("HEAD", url, **kwargs)
+
+
+def close():
+    """Close every pooled connection."""
+    with _lock:
+        for s in _sessions.values():
+            s.close()
+        _sessions.clear()
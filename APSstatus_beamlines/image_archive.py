@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+# image_archive.py
+#
+# Content-addressed archive of the mirrored status images (smallHistory.png etc.),
+# so past machine-history plots are kept instead of being overwritten every cycle.
+#
+# Layout:
+#   <root>/blobs/ab/ab12...ef        each distinct image once, named by its BLAKE2b-128 hash
+#   <root>/index/<name>.idx          time index per series: 16-byte header + 24-byte records
+#                                    (t float64, digest 16 bytes), little endian
+# An index record is appended only when the image differs from the previous one of the
+# series, so storage grows only when the content actually changes (blobs are also
+# shared between series). "What did the plot show at time T" is a binary search
+# (np.searchsorted) in the index, which is held in memory (24 bytes per change).
+#
+# Usage (inside aps_monitor.py / web_mirror.py, --archive DIR):
+#   archive = ImageArchive("/path/to/archive")
+#   archive.add("smallHistory.png", img_bytes)          # t defaults to now
+#   data = archive.at("smallHistory.png", t)
+#
+# Usage (command line):
+#   python image_archive.py /path/to/archive --list
+#   python image_archive.py /path/to/archive smallHistory.png --at "2026-10-01 08:00" --out h.png
+#   python image_archive.py /path/to/archive smallHistory.png --hours 24
+#
+# Requirements:
+#   pip install numpy
+#
+# Notes:
+# - Index times must increase per series; an older or equal timestamp is dropped.
+# - One writer per archive directory (several series from one process are fine).
+
+import argparse
+import hashlib
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+MAGIC = b"APSI"
+VERSION = 1
+HEADER_SIZE = 16  # magic(4) version(u2) reserved(u2) reserved(u8)
+INDEX_DTYPE = np.dtype([("t", "<f8"), ("digest", "V16")])
+
+
+def digest_of(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+class _Series:
+    """Time index of one image series (timestamps and digests in memory)."""
+
+    def __init__(self, path):
+        self.path = path
+        if not os.path.exists(path):
+            with open(path, "wb") as f:
+                f.write(MAGIC + struct.pack("<HHQ", VERSION, 0, 0))
+        with open(path, "rb") as f:
+            if f.read(HEADER_SIZE)[:4] != MAGIC:
+                raise ValueError(f"Not an image index: {path}")
+            raw = f.read()
+        n = len(raw) // INDEX_DTYPE.itemsize          # ignore a torn last record
+        recs = np.frombuffer(raw[:n * INDEX_DTYPE.itemsize], dtype=INDEX_DTYPE)
+        self.t = np.array(recs["t"])
+        self.digests = [bytes(d) for d in recs["digest"]]
+        if len(raw) != n * INDEX_DTYPE.itemsize:
+            with open(path, "r+b") as f:
+                f.truncate(HEADER_SIZE + n * INDEX_DTYPE.itemsize)
+        self._len = n
+
+    def last(self):
+        return self.digests[-1] if self._len else None
+
+    def append(self, t, digest):
+        rec = np.array([(t, digest)], dtype=INDEX_DTYPE)
+        with open(self.path, "ab") as f:
+            f.write(rec.tobytes())
+        if self._len == len(self.t):                  # grow the array geometrically
+            grown = np.empty(max(64, 2 * len(self.t)), dtype="<f8")
+            grown[:self._len] = self.t[:self._len]
+            self.t = grown
+        self.t[self._len] = t
+        self._len += 1
+        self.digests.append(digest)
+
+    def times(self):
+        return self.t[:self._len]
+
+    def find(self, t):
+        """Index of the last record at or before t, or -1."""
+        return int(np.searchsorted(self.times(), t, side="right")) - 1
+
+
+class ImageArchive:
+    """Deduplicating image store with a per-series time index."""
+
+    def __init__(self, root):
+        self.root = root
+        self._blobs = os.path.join(root, "blobs")
+        self._index = os.path.join(root, "index")
+        os.makedirs(self._blobs, exist_ok=True)
+        os.makedirs(self._index, exist_ok=True)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name, create=True):
+        with self._lock:
+            s = self._series.get(name)
+            if s is None:
+                path = os.path.join(self._index, f"{name}.idx")
+                if not create and not os.path.exists(path):
+                    raise KeyError(name)
+                s = self._series[name] = _Series(path)
+            return s
+
+    def blob_path(self, digest: bytes) -> str:
+        h = digest.hex()
+        return os.path.join(self._blobs, h[:2], h)
+
+    def names(self):
+        return sorted(n[:-4] for n in os.listdir(self._index) if n.endswith(".idx"))
+
+    # ---- Writing ----
+
+    def add(self, name, data: bytes, t=None) -> bool:
+        """Record `data` as the image of series `name` at time t; False if unchanged."""
+        t = time.time() if t is None else float(t)
+        d = digest_of(data)
+        s = self._get(name)
+        n = s._len
+        if s.last() == d or (n and t <= s.t[n - 1]):
+            return False
+        path = self.blob_path(d)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        s.append(t, d)          # blob first: the index never points to a missing file
+        return True
+
+    # ---- Reading ----
+
+    def lookup(self, name, t):
+        """(time, digest) of the image shown at time t, or None before the first one."""
+        s = self._get(name, create=False)
+        i = s.find(t)
+        if i < 0:
+            return None
+        return float(s.t[i]), s.digests[i]
+
+    def at(self, name, t):
+        """Bytes of the image of series `name` at time t, or None."""
+        hit = self.lookup(name, t)
+        if hit is None:
+            return None
+        with open(self.blob_path(hit[1]), "rb") as f:
+            return f.read()
+
+    def changes(self, name, t0=-np.inf, t1=np.inf):
+        """[(time, digest)] of the changes with t0 <= time <= t1."""
+        s = self._get(name, create=False)
+        ts = s.times()
+        i0 = int(np.searchsorted(ts, t0, side="left"))
+        i1 = int(np.searchsorted(ts, t1, side="right"))
+        return [(float(ts[i]), s.digests[i]) for i in range(i0, i1)]
+
+
+# ----------------------------
+# Command line
+# ----------------------------
+
+def _parse_time(text):
+    try:
+        return float(text)
+    except ValueError:
+        return datetime.fromisoformat(text).timestamp()
+
+
+def _fmt_ts(epoch):
+    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query an image archive.")
+    parser.add_argument("root", help="Archive directory.")
+    parser.add_argument("name", nargs="?", help="Series (e.g. smallHistory.png).")
+    parser.add_argument("--list", action="store_true", help="List the series.")
+    parser.add_argument("--at", default=None,
+                        help="Time (epoch or ISO 'YYYY-MM-DD HH:MM[:SS]') to look up.")
+    parser.add_argument("--out", default=None, help="With --at: write the image here.")
+    parser.add_argument("--hours", type=float, default=None,
+                        help="List the changes of the last N hours.")
+    args = parser.parse_args()
+
+    archive = ImageArchive(args.root)
+    if args.name and args.name not in archive.names():
+        parser.error(f"no series {args.name!r} in {args.root}")
+    if args.list or not args.name:
+        print(f"{'SERIES':<30} {'CHANGES':>8}  {'FIRST':<20} {'LAST':<20}")
+        for name in archive.names():
+            ch = archive.changes(name)
+            first = _fmt_ts(ch[0][0]) if ch else "-"
+            last = _fmt_ts(ch[-1][0]) if ch else "-"
+            print(f"{name:<30} {len(ch):>8}  {first:<20} {last:<20}")
+        return
+
+    if args.at is not None:
+        hit = archive.lookup(args.name, _parse_time(args.at))
+        if hit is None:
+            print("no image at that time")
+            return
+        t, d = hit
+        print(f"{_fmt_ts(t)}  {d.hex()}  {archive.blob_path(d)}")
+        if args.out:
+            with open(args.out, "wb") as f:
+                f.write(archive.at(args.name, t))
+        return
+
+    t0 = time.time() - 3600.0 * args.hours if args.hours else -np.inf
+    for t, d in archive.changes(args.name, t0):
+        print(f"{_fmt_ts(t)}  {d.hex()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# image_fetch.py
+#
+# Fetching and writing of the web status images, shared by aps_monitor.py and
+# web_mirror.py.
+#
+# - conditional GET (If-None-Match / If-Modified-Since from the last 200 of the same
+#   URL); a 304 costs no transfer
+# - image URL of an HTML page: first <img src>, read from a streamed response only as
+#   far as needed; cached and re-checked every `recheck` seconds
+# - content-hash dedup and atomic writes (atomic_file.py) of the output files
+# Transfers are counted into a caller-owned dict: {"requests", "not_modified", "bytes",
+# "parsed"} (see new_counters()).
+#
+# Usage:
+#   counters = new_counters()
+#   url = fetch_first_image_url(page_url, counters=counters)
+#   data = download_image_bytes(url, counters=counters)    # None: not modified
+#   if data is not None:
+#       write_if_changed("smallHistory.png", data)
+#
+# Requirements:
+#   pip install requests
+
+import hashlib
+import os
+import threading
+import time
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+from atomic_file import write_bytes as write_atomic
+import http_client
+
+# image responses that mean "moved": resolve the page again (anything else is an error)
+IMAGE_GONE = (404, 410)
+
+# url -> (etag, last_modified) from the last 200 response
+_VALIDATORS = {}
+# page url -> {"url": resolved image url, "checked": monotonic time of the last page check}
+_IMAGE_URLS = {}
+# output path -> digest of the source bytes last written there
+_WRITTEN = {}
+_lock = threading.Lock()
+
+
+def new_counters():
+    return {"requests": 0, "not_modified": 0, "bytes": 0, "parsed": 0}
+
+
+def _count(counters, key, n=1):
+    if counters is not None:
+        counters[key] += n
+
+
+# ----------------------------
+# HTTP
+# ----------------------------
+
+def conditional_get(url, timeout=None, stream=False, counters=None):
+    """
+    GET with If-None-Match / If-Modified-Since from the previous response.
+    Returns the response, or None on 304 Not Modified. A 304 without validators sent
+    (there is no cached copy to reuse) is retried once with Cache-Control: no-cache,
+    then raised as an error. With stream=True the body is left unread (the caller
+    counts the bytes).
+    """
+    headers = {}
+    cached = _VALIDATORS.get(url)
+    if cached is not None:
+        etag, last_modified = cached
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    kwargs = {} if timeout is None else {"timeout": timeout}
+    r = http_client.get(url, headers=headers, stream=stream, **kwargs)
+    _count(counters, "requests")
+    if r.status_code == 304 and cached is not None:
+        _count(counters, "not_modified")
+        r.close()
+        return None
+    if r.status_code == 304:
+        # 304 to an unconditional GET (a caching proxy): ask once more, past the caches
+        r.close()
+        r = http_client.get(url, headers={"Cache-Control": "no-cache"}, stream=stream, **kwargs)
+        _count(counters, "requests")
+        if r.status_code == 304:
+            r.close()
+            raise RuntimeError(f"304 Not Modified without a conditional request: {url}")
+    if not stream:
+        _count(counters, "bytes", len(r.content))
+    try:
+        r.raise_for_status()
+    except Exception:
+        r.close()
+        raise
+    return r
+
+
+def remember(url, r):
+    """Keep the validators of a 200 response for the next conditional_get(url)."""
+    etag = r.headers.get("ETag")
+    last_modified = r.headers.get("Last-Modified")
+    if etag or last_modified:
+        _VALIDATORS[url] = (etag, last_modified)
+
+
+def forget(url):
+    """Drop the validators of `url`, so the next fetch is unconditional."""
+    _VALIDATORS.pop(url, None)
+
+
+def probe(url, timeout=(3.0, 5.0), counters=None):
+    """Cheap liveness check (HEAD) before resuming full downloads after failures."""
+    try:
+        r = http_client.head(url, timeout=timeout)
+    except Exception:
+        return False
+    finally:
+        _count(counters, "requests")
+    r.close()
+    return r.status_code < 500
+
+
+# ----------------------------
+# Pages and images
+# ----------------------------
+
+class FirstImageSrc(HTMLParser):
+    """Streaming scan for the first <img src=...>; feed() stops once it is found."""
+
+    class Found(Exception):
+        pass
+
+    def __init__(self):
+        super().__init__()
+        self.src = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "img":
+            src = dict(attrs).get("src")
+            if src:
+                self.src = src
+                raise self.Found()
+
+
+def scan_first_image(r, chunk_size=4096, counters=None):
+    """First <img src> of a streamed response, reading only as far as needed."""
+    parser = FirstImageSrc()
+    try:
+        for chunk in r.iter_content(chunk_size=chunk_size, decode_unicode=True):
+            if isinstance(chunk, bytes):
+                chunk = chunk.decode(r.encoding or "utf-8", errors="replace")
+            _count(counters, "bytes", len(chunk))
+            parser.feed(chunk)
+    except FirstImageSrc.Found:
+        pass
+    finally:
+        r.close()
+    _count(counters, "parsed")
+    return parser.src
+
+
+def invalidate_image_url(page_url):
+    """Forget the resolved image URL of `page_url` (e.g. after the image went away)."""
+    _IMAGE_URLS.pop(page_url, None)
+    forget(page_url)
+
+
+def cached_image_url(page_url):
+    """Image URL last resolved from `page_url`, or None."""
+    cached = _IMAGE_URLS.get(page_url)
+    return cached["url"] if cached else None
+
+
+def fetch_first_image_url(page_url, timeout=None, recheck=3600.0, counters=None):
+    """
+    URL of the first <img> on `page_url`. The result is cached: the page is only
+    requested again after `recheck` seconds (conditional GET, parsed only if it
+    changed) or after invalidate_image_url().
+    """
+    cached = _IMAGE_URLS.get(page_url)
+    now = time.monotonic()
+    if cached is not None and now - cached["checked"] < recheck:
+        return cached["url"]
+
+    r = conditional_get(page_url, timeout, stream=True, counters=counters)
+    if r is None and cached is not None:
+        cached["checked"] = now                     # page unchanged -> same image URL
+        return cached["url"]
+    if r is None:
+        forget(page_url)                            # 304 without a cached URL: ask again
+        r = conditional_get(page_url, timeout, stream=True, counters=counters)
+
+    src = scan_first_image(r, counters=counters)
+    if not src:
+        raise RuntimeError(f"No <img src=...> found on {page_url}")
+
+    img_url = urljoin(page_url, src)
+    remember(page_url, r)
+    _IMAGE_URLS[page_url] = {"url": img_url, "checked": now}
+    return img_url
+
+
+def download_image_bytes(img_url, timeout=None, counters=None):
+    """Image bytes, or None if the image has not changed since the last download."""
+    r = conditional_get(img_url, timeout, counters=counters)
+    if r is None:
+        return None
+    remember(img_url, r)
+    return r.content
+
+
+def image_gone(exc):
+    """True if `exc` is an HTTP error meaning the image URL no longer exists."""
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code in IMAGE_GONE
+
+
+# ----------------------------
+# Output files
+# ----------------------------
+
+def digest(data):
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
+def unchanged(path, source_digest, stored_size=None):
+    """
+    True if `path` was last written from content with `source_digest`. After a restart
+    the file on disk is hashed once, if the content is stored as-is (`stored_size` is
+    its length) and the size matches.
+    """
+    with _lock:
+        if (path not in _WRITTEN and stored_size is not None and os.path.exists(path)
+                and os.path.getsize(path) == stored_size):
+            with open(path, "rb") as f:
+                _WRITTEN[path] = digest(f.read())
+        return _WRITTEN.get(path) == source_digest and os.path.exists(path)
+
+
+def mark_written(path, source_digest):
+    with _lock:
+        _WRITTEN[path] = source_digest
+
+
+def write_if_changed(path, data):
+    """Write `data` to `path` as-is unless it already holds it; returns True if written."""
+    d = digest(data)
+    if unchanged(path, d, len(data)):
+        return False
+    write_atomic(path, data)
+    mark_written(path, d)
+    return True
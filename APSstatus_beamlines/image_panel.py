@@ -0,0 +1,201 @@
+# image_panel.py
+#
+# Persistent detector image panel for the beamline monitor dashboards.
+#
+# The dashboards rebuild most of the figure every cycle. The image Axes is kept
+# instead: its AxesImage gets set_data(), and the scale bar / µm-per-pixel label
+# artists are created once and only moved when their geometry key changes.
+#
+# - scale_bar_geometry(): memoized per (image shape, µm/px, axes size in screen px);
+#   picks a round 1-2-5 bar length that fits, and sizes margins/height in screen
+#   pixels so the bar looks the same on a 900 px preview and a 6464 px raw frame.
+# - image_panel(fig, slot): the persistent ImagePanel for `slot` of `fig`.
+# - clear_figure(fig, keep): fig.clf() that keeps the panels (and `keep` axes).
+#
+# Usage (inside a render function):
+#   clear_figure(fig, keep=sparklines.axes if sparklines else ())
+#   panel = image_panel(fig, "main")
+#   ax_img = panel.draw(fig, gs[3:12, :], img, um_per_px, title=...)
+
+import functools
+import math
+import weakref
+
+import numpy as np
+from matplotlib.patches import Rectangle
+
+_PANELS = weakref.WeakKeyDictionary()   # fig -> {slot: ImagePanel}
+
+# 1-2-5 series from 0.1 µm to 50 mm
+_NICE_UM = (np.array([1.0, 2.0, 5.0])[None, :] * 10.0 ** np.arange(-1, 5)[:, None]).ravel()
+
+
+def nice_length(max_um, preferred_um=200.0):
+    """`preferred_um` if it fits in `max_um`, else the largest 1-2-5 value that does."""
+    if preferred_um <= max_um:
+        return preferred_um
+    fits = _NICE_UM[_NICE_UM <= max_um]
+    return float(fits[-1]) if fits.size else None
+
+
+@functools.lru_cache(maxsize=64)
+def scale_bar_geometry(shape, um_per_px, axes_px, bar_um=200.0, max_frac=0.30,
+                       margin_px=12, height_px=5, gap_px=3):
+    """
+    Scale bar in image (data) coordinates, or None if it cannot be drawn.
+    Returns (x0, y0, width, height, label, label_x, label_y).
+    """
+    h, w = shape[:2]
+    ax_w, ax_h = axes_px
+    if um_per_px <= 0 or w <= 0 or h <= 0 or ax_w <= 0 or ax_h <= 0:
+        return None
+    length_um = nice_length(max_frac * w * um_per_px, bar_um)
+    if length_um is None:
+        return None
+
+    sx, sy = w / float(ax_w), h / float(ax_h)      # image px per screen px
+    width = length_um / um_per_px
+    height = height_px * sy
+    x0 = margin_px * sx
+    y0 = h - margin_px * sy - height
+    label = f"{length_um:g} µm"
+    return (x0, y0, width, height, label, x0 + width / 2.0, y0 - gap_px * sy)
+
+
+def clear_figure(fig, keep=()):
+    """fig.clf() that keeps the image panels of `fig` and the `keep` axes alive."""
+    kept = set(keep)
+    kept.update(p.ax for p in _PANELS.get(fig, {}).values() if p.ax is not None)
+    for ax in tuple(fig.axes):
+        if ax not in kept:
+            fig.delaxes(ax)
+    fig.texts.clear()
+
+
+def image_panel(fig, slot="main"):
+    panels = _PANELS.setdefault(fig, {})
+    panel = panels.get(slot)
+    if panel is None:
+        panel = panels[slot] = ImagePanel()
+    return panel
+
+
+class ImagePanel:
+    """One image Axes whose artists are reused from cycle to cycle."""
+
+    def __init__(self, bar_um=200.0):
+        self.bar_um = float(bar_um)
+        self.ax = None
+        self._im = None
+        self._bar = None
+        self._bar_text = None
+        self._px_text = None
+        self._msg = None
+        self._bar_key = None
+        self._px_label = None
+
+    def _create(self, fig, subplot_spec):
+        ax = fig.add_subplot(subplot_spec)
+        ax.set_facecolor("black")
+        ax.set_xticks([])
+        ax.set_yticks([])
+        self._bar = Rectangle((0, 0), 0, 0, facecolor="white", edgecolor="black",
+                              linewidth=1.0, alpha=0.9, visible=False)
+        ax.add_patch(self._bar)
+        self._bar_text = ax.text(
+            0, 0, "", color="white", ha="center", va="bottom",
+            fontsize=10, fontweight="bold", visible=False,
+            bbox=dict(facecolor="black", alpha=0.35, edgecolor="none", pad=2),
+        )
+        self._px_text = ax.text(
+            0.99, 0.01, "", transform=ax.transAxes, ha="right", va="bottom",
+            color="white", fontsize=9, visible=False,
+            bbox=dict(facecolor="black", alpha=0.35, edgecolor="none", pad=2),
+        )
+        self._msg = ax.text(0.5, 0.5, "", transform=ax.transAxes, ha="center", va="center",
+                            color="#cfcfcf", fontsize=11, visible=False)
+        self.ax = ax
+
+    def _clear_dynamic(self):
+        """Remove what callers drew on top last cycle (e.g. the statistics overlay)."""
+        own = {self._im, self._bar, self._bar_text, self._px_text, self._msg}
+        for artist in (*self.ax.lines, *self.ax.texts, *self.ax.patches, *self.ax.collections):
+            if artist not in own:
+                artist.remove()
+
+    def draw(self, fig, subplot_spec, img, um_per_px, factor=1, title="",
+             title_color="white", fontsize=11, missing="No PVA image"):
+        """
+        Show `img` (None: show `missing`). `factor` is detector pixels per image pixel
+        (decimated previews); um_per_px is the detector pixel size. Returns the Axes.
+        """
+        if self.ax is None or self.ax.figure is not fig:
+            self._create(fig, subplot_spec)
+        else:
+            self._clear_dynamic()
+        ax = self.ax
+        ax.set_title(title, color=title_color, fontsize=fontsize)
+
+        if img is None:
+            if self._im is not None:
+                self._im.set_visible(False)
+            self._bar.set_visible(False)
+            self._bar_text.set_visible(False)
+            self._px_text.set_visible(False)
+            self._msg.set_text(missing)
+            self._msg.set_visible(True)
+            return ax
+        self._msg.set_visible(False)
+
+        arr = np.asarray(img)
+        sample = arr[::4, ::4] if arr.size > 1_000_000 else arr
+        vmin, vmax = np.percentile(sample, (1, 99))
+        if not np.isfinite(vmin) or not np.isfinite(vmax) or vmax <= vmin:
+            vmin, vmax = (float(arr.min()), float(arr.max())) if arr.size else (0.0, 1.0)
+        h, w = arr.shape[:2]
+        if self._im is None:
+            self._im = ax.imshow(arr, cmap="gray", vmin=vmin, vmax=vmax, aspect="auto")
+        else:
+            self._im.set_data(arr)
+            self._im.set_clim(vmin, vmax)
+            if self._im.get_extent() != [-0.5, w - 0.5, h - 0.5, -0.5]:
+                self._im.set_extent((-0.5, w - 0.5, h - 0.5, -0.5))
+                ax.set_xlim(-0.5, w - 0.5)
+                ax.set_ylim(h - 0.5, -0.5)
+            self._im.set_visible(True)
+
+        self._update_scale_bar((h, w), um_per_px, factor)
+        return ax
+
+    def _update_scale_bar(self, shape, um_per_px, factor):
+        try:
+            det_um = float(um_per_px)
+        except (TypeError, ValueError):
+            det_um = float("nan")
+        if not math.isfinite(det_um) or det_um <= 0:
+            self._bar.set_visible(False)
+            self._bar_text.set_visible(False)
+            self._px_text.set_visible(False)
+            self._bar_key = None
+            return
+
+        bbox = self.ax.get_window_extent()
+        key = (shape, det_um * factor, (int(bbox.width), int(bbox.height)))
+        if key != self._bar_key:
+            geo = scale_bar_geometry(*key, bar_um=self.bar_um)
+            self._bar_key = key
+            if geo is None:
+                self._bar.set_visible(False)
+                self._bar_text.set_visible(False)
+            else:
+                x0, y0, width, height, label, lx, ly = geo
+                self._bar.set_bounds(x0, y0, width, height)
+                self._bar_text.set_position((lx, ly))
+                self._bar_text.set_text(label)
+                self._bar.set_visible(True)
+                self._bar_text.set_visible(True)
+
+        if det_um != self._px_label:
+            self._px_text.set_text(f"{det_um:.3f} µm/px")
+            self._px_label = det_um
+        self._px_text.set_visible(True)
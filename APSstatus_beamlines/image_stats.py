@@ -0,0 +1,188 @@
+# image_stats.py
+#
+# Detector image statistics for the beamline monitor previews.
+#
+# frame_stats() works on a strided decimation of the raw detector frame (every
+# step-th pixel, step chosen so the longer side is <= max_side), so a 32 MP frame
+# costs about as much as a 1 MP one:
+#   - saturated-pixel fraction against the dtype max (integer frames only), counted on
+#     the full frame: a hot spot smaller than the stride must not read 0%. One max()
+#     pass, plus a count only if that reaches the dtype max
+#   - mean / std
+#   - intensity-weighted centroid (in full-frame detector pixels)
+#   - row / column projections (mean per row / column)
+#
+# draw_stats_overlay() puts them on an imshow Axes; stats_to_json() makes a
+# JSON-friendly dict for snapshots.
+#
+# Usage:
+#   python image_stats.py --bench            # timing on a synthetic 32 MP uint16 frame
+#   python image_stats.py --bench --shape 2048 2448 --repeat 50
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+
+def dtype_max(dtype):
+    """Saturation level of an integer dtype, None for float frames."""
+    dtype = np.dtype(dtype)
+    if dtype.kind in "ui":
+        return int(np.iinfo(dtype).max)
+    if dtype.kind == "b":
+        return 1
+    return None
+
+
+def saturated_fraction(arr, top):
+    """Fraction of the pixels of `arr` at `top` or above (0.0 if top is None)."""
+    if top is None or arr.max() < top:
+        return 0.0
+    return float(np.count_nonzero(arr >= top)) / arr.size
+
+
+def frame_stats(img, max_side=1024):
+    """Statistics dict for a 2D detector frame (None if there is no frame)."""
+    if img is None:
+        return None
+    arr = np.asarray(img)
+    if arr.ndim != 2 or arr.size == 0:
+        return None
+    h, w = arr.shape
+    step = max(1, int(math.ceil(max(h, w) / float(max_side))))
+    s = arr[::step, ::step]
+
+    top = dtype_max(arr.dtype)
+    d = s.astype(np.float32)                    # the only copy (~1 MP)
+    rows = d.sum(axis=1, dtype=np.float64)
+    cols = d.sum(axis=0, dtype=np.float64)
+    n = d.size
+    total = float(rows.sum())
+    mean = total / n
+    var = float(np.einsum("ij,ij->", d, d, dtype=np.float64)) / n - mean * mean
+
+    # centroid above the projection floor, so a flat background does not pull
+    # it towards the frame centre
+    wr = rows - rows.min()
+    wc = cols - cols.min()
+    sr, sc = float(wr.sum()), float(wc.sum())
+    cy = float(wr @ np.arange(wr.size)) / sr if sr > 0 else (wr.size - 1) / 2.0
+    cx = float(wc @ np.arange(wc.size)) / sc if sc > 0 else (wc.size - 1) / 2.0
+
+    return {
+        "shape": (h, w),
+        "step": step,
+        "dtype": str(arr.dtype),
+        "saturated": saturated_fraction(arr, top),
+        "mean": mean,
+        "std": math.sqrt(max(var, 0.0)),
+        "centroid": (cx * step, cy * step),     # (x, y) detector pixels
+        "rows": rows / d.shape[1],              # one value per `step` detector rows
+        "cols": cols / d.shape[0],
+    }
+
+
+def stats_to_json(stats):
+    if stats is None:
+        return None
+    out = dict(stats)
+    out["shape"] = list(stats["shape"])
+    out["centroid"] = [round(c, 1) for c in stats["centroid"]]
+    out["rows"] = np.round(stats["rows"], 1).tolist()
+    out["cols"] = np.round(stats["cols"], 1).tolist()
+    return out
+
+
+def draw_stats_overlay(ax, stats, factor=1, color="#ff4fd8"):
+    """
+    Centroid cross, projections (column: bottom edge, row: right edge) and a
+    text box on an imshow Axes. `factor` is detector pixels per displayed pixel.
+    """
+    if stats is None:
+        return
+    xlim, ylim = ax.get_xlim(), ax.get_ylim()
+    step = stats["step"]
+
+    cx, cy = stats["centroid"]
+    ax.plot([cx / factor], [cy / factor], "+", color=color, markersize=14, markeredgewidth=1.5)
+
+    for prof, edge in ((stats["cols"], "bottom"), (stats["rows"], "right")):
+        lo, hi = float(prof.min()), float(prof.max())
+        norm = (prof - lo) / (hi - lo) if hi > lo else np.zeros_like(prof)
+        pos = (np.arange(prof.size) * step + 0.5 * step) / factor
+        if edge == "bottom":
+            ax.plot(pos, 0.02 + 0.15 * norm, color=color, linewidth=0.8, alpha=0.8,
+                    transform=ax.get_xaxis_transform())
+        else:
+            ax.plot(0.98 - 0.15 * norm, pos, color=color, linewidth=0.8, alpha=0.8,
+                    transform=ax.get_yaxis_transform())
+
+    sat = stats["saturated"]
+    ax.text(
+        0.01, 0.99,
+        f"sat {100.0 * sat:.2f}%   mean {stats['mean']:.4g} \N{PLUS-MINUS SIGN} {stats['std']:.3g}",
+        transform=ax.transAxes, ha="left", va="top",
+        color="#ff6060" if sat > 0 else "white", fontsize=8.5,
+        bbox=dict(facecolor="black", alpha=0.35, edgecolor="none", pad=2),
+    )
+    ax.set_xlim(xlim)
+    ax.set_ylim(ylim)
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def _bench(shape, repeat, max_side):
+    from preview import decimate_frame
+
+    rng = np.random.default_rng(0)
+    h, w = shape
+    y = np.linspace(-1, 1, h, dtype=np.float32)[:, None]
+    x = np.linspace(-1, 1, w, dtype=np.float32)[None, :]
+    img = 70000.0 * np.exp(-(x * x + y * y) / 0.1)     # saturated core
+    img += rng.normal(1000.0, 300.0, size=(h, w)).astype(np.float32)
+    img = np.clip(img, 0, 65535).astype(np.uint16)
+
+    def timed(fn):
+        fn()
+        ts = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            fn()
+            ts.append(time.perf_counter() - t0)
+        return 1e3 * float(np.median(ts))
+
+    t_stats = timed(lambda: frame_stats(img, max_side))
+    t_dec = timed(lambda: decimate_frame(img, max_side))
+    t_pct = timed(lambda: np.percentile(decimate_frame(img, max_side)[0], (1, 99)))
+    st = frame_stats(img, max_side)
+
+    print(f"frame {h}x{w} {img.dtype} ({h * w / 1e6:.1f} MP), max_side={max_side}, step={st['step']}")
+    print(f"  frame_stats                     {t_stats:8.2f} ms")
+    print(f"  decimate_frame (preview)        {t_dec:8.2f} ms")
+    print(f"  decimate + 1/99 percentiles     {t_pct:8.2f} ms")
+    print(f"  saturated {100 * st['saturated']:.3f}%  mean {st['mean']:.1f}  std {st['std']:.1f}  "
+          f"centroid ({st['centroid'][0]:.1f}, {st['centroid'][1]:.1f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Detector image statistics.")
+    parser.add_argument("--bench", action="store_true",
+                        help="Time frame_stats on a synthetic frame.")
+    parser.add_argument("--shape", type=int, nargs=2, default=(4852, 6464), metavar=("H", "W"),
+                        help="Synthetic frame shape (default: Oryx 32MP, 4852x6464).")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--max-side", type=int, default=1024)
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(tuple(args.shape), args.repeat, args.max_side)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
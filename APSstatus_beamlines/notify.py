@@ -0,0 +1,300 @@
+# notify.py
+#
+# Alarm/event notifications for the beamline monitors.
+#
+# Notifier is an AlarmEngine listener (alarms.add_listener(notifier)). Per event, in
+# the caller's thread and without any I/O:
+#   - duplicates are dropped: the same (rule, state) as the last one delivered for
+#     that rule, within `dedup_window` seconds
+#   - a token bucket per rule (`burst` events, refilled at `per_hour`) limits flapping
+#     rules; an event that finds the bucket empty is held (the newest one per rule
+#     replaces the older) and sent as soon as a token is back, with a "suppressed" count.
+#     A held event is dropped once its state is the one last delivered for the rule,
+#     however long ago (raised -> cleared -> raised while held sends nothing)
+#   - the event goes on a bounded queue; a full queue drops it (counted), never blocks
+# A worker thread takes events off the queue and hands them to the sinks, so SMTP/HTTP
+# timeouts never reach the render loop. Each sink has its own backlog: a failed delivery
+# is retried with backoff (in order, before that sink's newer events) while the other
+# sinks go on.
+#
+# Sinks (make_sink spec):
+#   /path/events.jsonl  or  file:/path/events.jsonl      one JSON object per line
+#   smtp://[user@]host[:port]/to@a.org,to@b.org?from=monitor@host&starttls=1
+#                                                        password from $SMTP_PASSWORD
+#   http://host:port/path  or  https://...               webhook, JSON POST
+#
+# Usage (inside a monitor):
+#   notifier = Notifier([make_sink(s) for s in args.notify], per_hour=6)
+#   alarms.add_listener(notifier)
+#
+# A local SMTP + HTTP stand-in to test against: tests/notify_server.py
+
+import collections
+import json
+import os
+import queue
+import smtplib
+import threading
+import time
+import urllib.parse
+import urllib.request
+from email.message import EmailMessage
+
+from alarm_rules import SEVERITIES, format_event
+
+
+# ----------------------------
+# Sinks
+# ----------------------------
+
+class JSONLSink:
+    def __init__(self, path):
+        self.path = path
+
+    def send(self, event):
+        with open(self.path, "a") as f:
+            f.write(json.dumps(event) + "\n")
+
+    def __repr__(self):
+        return f"JSONLSink({self.path!r})"
+
+
+class SMTPSink:
+    def __init__(self, host, recipients, port=25, sender=None, starttls=False,
+                 user=None, password=None, timeout=10.0):
+        self.host = host
+        self.port = int(port)
+        self.recipients = list(recipients)
+        self.sender = sender or f"apsstatus@{os.uname().nodename}"
+        self.starttls = starttls
+        self.user = user
+        self.password = password
+        self.timeout = float(timeout)
+
+    def send(self, event):
+        msg = EmailMessage()
+        msg["Subject"] = f"[{event['severity']}] {event['rule']} {event['state']}"
+        msg["From"] = self.sender
+        msg["To"] = ", ".join(self.recipients)
+        msg.set_content(format_event(event) + "\n\n" + json.dumps(event, indent=1) + "\n")
+        with smtplib.SMTP(self.host, self.port, timeout=self.timeout) as smtp:
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password or "")
+            smtp.send_message(msg)
+
+    def __repr__(self):
+        return f"SMTPSink({self.host}:{self.port} -> {','.join(self.recipients)})"
+
+
+class WebhookSink:
+    def __init__(self, url, timeout=5.0):
+        self.url = url
+        self.timeout = float(timeout)
+
+    def send(self, event):
+        req = urllib.request.Request(
+            self.url, data=json.dumps(event).encode(), method="POST",
+            headers={"Content-Type": "application/json"},
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            resp.read()
+
+    def __repr__(self):
+        return f"WebhookSink({self.url!r})"
+
+
+def make_sink(spec):
+    """Sink from a command-line spec (see the header)."""
+    u = urllib.parse.urlsplit(spec)
+    if u.scheme in ("http", "https"):
+        return WebhookSink(spec)
+    if u.scheme == "smtp":
+        q = urllib.parse.parse_qs(u.query)
+        recipients = [r for r in urllib.parse.unquote(u.path).strip("/").split(",") if r]
+        if not u.hostname or not recipients:
+            raise ValueError(f"smtp sink needs a host and recipients: {spec}")
+        return SMTPSink(
+            u.hostname, recipients, port=u.port or 25,
+            sender=q.get("from", [None])[0],
+            starttls=q.get("starttls", ["0"])[0] in ("1", "true", "yes"),
+            user=urllib.parse.unquote(u.username) if u.username else None,
+            password=os.environ.get("SMTP_PASSWORD"),
+        )
+    if u.scheme == "file":
+        return JSONLSink(u.path)
+    return JSONLSink(spec)
+
+
+# ----------------------------
+# Notifier
+# ----------------------------
+
+class TokenBucket:
+    def __init__(self, capacity, per_hour):
+        self.capacity = float(capacity)
+        self.rate = float(per_hour) / 3600.0
+        self.tokens = self.capacity
+        self._t = time.monotonic()
+
+    def take(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._t) * self.rate)
+        self._t = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True
+        return False
+
+
+class Notifier:
+    """Deduplicating, rate-limited event delivery to sinks on a worker thread."""
+
+    def __init__(self, sinks, min_severity="info", dedup_window=600.0, burst=3,
+                 per_hour=6.0, queue_size=1000, retries=3, retry_delay=5.0, backlog=100):
+        ranked = [s for s in SEVERITIES if s is not None]     # most severe first
+        if min_severity not in ranked:
+            raise ValueError(f"unknown severity: {min_severity}")
+        self.severities = set(ranked[:ranked.index(min_severity) + 1])
+        self.sinks = list(sinks)
+        self.dedup_window = float(dedup_window)
+        self.burst = burst
+        self.per_hour = per_hour
+        self.retries = int(retries)
+        self.retry_delay = float(retry_delay)
+        self.backlog = int(backlog)
+
+        self._lock = threading.Lock()
+        self._delivered = {}    # rule -> (state, monotonic time) last queued
+        self._buckets = {}      # rule -> TokenBucket
+        self._held = {}         # rule -> newest event waiting for a token
+        self._suppressed = {}   # rule -> events held back since the last delivery
+        self.dropped = 0        # queue or a sink backlog full
+        self.failed = 0         # delivery failed after all retries
+        self.sent = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        # worker side, per sink: events not yet delivered, and (next try, failed attempts)
+        # of the first one
+        self._pending = [collections.deque() for _ in self.sinks]
+        self._retry = [(0.0, 0) for _ in self.sinks]
+        self._thread = threading.Thread(target=self._run, name="notify", daemon=True)
+        self._thread.start()
+
+    # ---- Producer side (render / CA threads) ----
+
+    def __call__(self, event):
+        if event.get("severity") not in self.severities:
+            return
+        rule = event["rule"]
+        with self._lock:
+            if self._duplicate(rule, event["state"]):
+                # the receiver already has this state: an older held event is stale
+                self._held.pop(rule, None)
+                self._suppressed.pop(rule, None)
+                return
+            bucket = self._buckets.get(rule)
+            if bucket is None:
+                bucket = self._buckets[rule] = TokenBucket(self.burst, self.per_hour)
+            if not bucket.take():
+                if self._current(rule, event["state"]):
+                    # back to the state the receiver has: a held event in between is moot
+                    self._held.pop(rule, None)
+                    self._suppressed.pop(rule, None)
+                    return
+                if rule in self._held:
+                    self._suppressed[rule] = self._suppressed.get(rule, 0) + 1
+                self._held[rule] = event
+                return
+            self._held.pop(rule, None)
+            self._enqueue(rule, event)
+
+    def _duplicate(self, rule, state):
+        last = self._delivered.get(rule)
+        return (last is not None and last[0] == state
+                and time.monotonic() - last[1] < self.dedup_window)
+
+    def _current(self, rule, state):
+        """True if `state` is the last one delivered for `rule`, whatever its age."""
+        last = self._delivered.get(rule)
+        return last is not None and last[0] == state
+
+    def _enqueue(self, rule, event):
+        # called with the lock held
+        n = self._suppressed.pop(rule, 0)
+        if n:
+            event = dict(event, suppressed=n)
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return
+        self._delivered[rule] = (event["state"], time.monotonic())
+
+    def _release_held(self):
+        """Send held events whose bucket has a token again (and that still matter)."""
+        with self._lock:
+            for rule, event in list(self._held.items()):
+                if self._current(rule, event["state"]):
+                    del self._held[rule]    # the receiver already has this state
+                    self._suppressed.pop(rule, None)
+                elif self._buckets[rule].take():
+                    del self._held[rule]
+                    self._enqueue(rule, event)
+
+    # ---- Worker ----
+
+    def _run(self):
+        while True:
+            try:
+                event = self._queue.get(timeout=self._wait_time())
+            except queue.Empty:
+                event = None
+            if event is not None:
+                for pending in self._pending:
+                    if len(pending) >= self.backlog:
+                        pending.popleft()       # a dead sink keeps the newest events
+                        self.dropped += 1
+                    pending.append(event)
+                self._queue.task_done()
+            self._deliver_pending()
+            if self._held:
+                self._release_held()
+
+    def _wait_time(self):
+        """Seconds until the next retry is due (at most 1 s, for _release_held)."""
+        now = time.monotonic()
+        due = [t for (t, _), pending in zip(self._retry, self._pending) if pending]
+        return max(0.0, min([1.0] + [t - now for t in due]))
+
+    def _deliver_pending(self):
+        """Send each sink's backlog, oldest first, until it is empty or a send fails."""
+        for i, sink in enumerate(self.sinks):
+            pending = self._pending[i]
+            while pending and self._retry[i][0] <= time.monotonic():
+                attempts = self._retry[i][1]
+                try:
+                    sink.send(pending[0])
+                except Exception as e:
+                    attempts += 1
+                    if attempts <= self.retries:
+                        delay = self.retry_delay * (2 ** (attempts - 1))
+                        self._retry[i] = (time.monotonic() + delay, attempts)
+                        break                   # this sink waits, the others go on
+                    self.failed += 1
+                    stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+                    print(f"[{stamp}] ERROR: notification to {sink!r} failed: {e}", flush=True)
+                else:
+                    self.sent += 1
+                pending.popleft()
+                self._retry[i] = (0.0, 0)
+
+    def flush(self, timeout=None):
+        """Wait until every event is delivered or given up (for tests and clean shutdown)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks or any(self._pending):
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            time.sleep(0.05)
+        return True
@@ -0,0 +1,217 @@
+# preview.py
+#
+# Decimated detector previews for the beamline monitors.
+#
+# - decimate_frame: block-mean downsample of a detector frame so its longer side
+#   fits the dashboard (a 32 MP Oryx frame becomes ~1k px wide).
+# - PreviewCache: latest decimated frame of one PVA image channel (thread-safe,
+#   rate-limited so a fast detector does not eat the CPU).
+# - BackgroundPreviews: one PreviewCache per channel, filled in the background
+#   from PVA monitors when the source has pva_subscribe(channel, callback, due)
+#   (EpicsPVSource), else on demand with source.pva_image (DummyPVSource).
+# - PreviewProcessor: running average and dark/flat correction of the decimated
+#   frames, driven by the shutter state.
+#
+# Usage (inside a monitor):
+#   previews = BackgroundPreviews(source, ["2bmSP1:Pva1:Image", "2bmSP2:Pva1:Image"],
+#                                 min_interval=scheduler.period)   # no faster than renders
+#   img, factor = previews.get("2bmSP2:Pva1:Image")   # factor: detector px per preview px
+#   stats = previews.stats("2bmSP2:Pva1:Image")        # image_stats.frame_stats, if with_stats
+#   full = previews.raw("2bmSP2:Pva1:Image")           # undecimated frame, if keep_raw
+#
+#   proc = PreviewProcessor(alpha=0.3, correct="dark")  # running average + dark subtraction
+#   shown = proc.process(img, beam_on=shutters_open)
+
+import math
+import threading
+import time
+
+import numpy as np
+
+from image_stats import frame_stats
+
+
+def decimate_frame(img, max_side=1024):
+    """
+    Downsample `img` by an integer factor so max(shape) <= max_side.
+    Returns (frame, factor); the frame is float32 block means (or `img` itself if
+    it already fits).
+    """
+    if img is None:
+        return None, 1
+    arr = np.asarray(img)
+    h, w = arr.shape[:2]
+    f = int(math.ceil(max(h, w) / float(max_side))) if max_side else 1
+    if f <= 1:
+        return arr, 1
+    h2, w2 = (h // f) * f, (w // f) * f
+    blocks = arr[:h2, :w2].reshape(h2 // f, f, w2 // f, f)
+    return blocks.mean(axis=(1, 3), dtype=np.float32), f
+
+
+class PreviewCache:
+    """Latest decimated frame of one image channel."""
+
+    def __init__(self, max_side=1024, min_interval=1.0, with_stats=False, keep_raw=False):
+        self.max_side = int(max_side)
+        # seconds, or a callable returning them (e.g. the scheduler's current period)
+        self.min_interval = min_interval if callable(min_interval) else float(min_interval)
+        self.with_stats = with_stats
+        self.keep_raw = keep_raw
+        self._lock = threading.Lock()
+        self._raw = None        # the full frame behind _frame, with keep_raw
+        self._frame = None
+        self._factor = 1
+        self._stats = None
+        self._next = 0.0        # monotonic time the next frame is accepted
+        self.updated = None     # wall-clock time of the cached frame
+        self.frames = 0
+
+    def due(self):
+        """True if a new frame would be accepted now (checked before parsing it)."""
+        return time.monotonic() >= self._next
+
+    def put(self, img):
+        if img is None:
+            return
+        frame, factor = decimate_frame(img, self.max_side)
+        stats = frame_stats(img, self.max_side) if self.with_stats else None
+        with self._lock:
+            self._frame, self._factor, self._stats = frame, factor, stats
+            if self.keep_raw:
+                self._raw = img
+            interval = self.min_interval() if callable(self.min_interval) else self.min_interval
+            self._next = time.monotonic() + interval
+            self.updated = time.time()
+            self.frames += 1
+
+    def get(self):
+        with self._lock:
+            return self._frame, self._factor
+
+    def stats(self):
+        with self._lock:
+            return self._stats
+
+    def raw(self):
+        with self._lock:
+            return self._raw
+
+
+class BackgroundPreviews:
+    """PreviewCache per channel, kept current by PVA monitors when available."""
+
+    def __init__(self, source, channels, max_side=1024, min_interval=1.0, with_stats=False,
+                 keep_raw=False):
+        self.source = source
+        self.caches = {ch: PreviewCache(max_side, min_interval, with_stats, keep_raw)
+                       for ch in channels}
+
+        subscribe = getattr(source, "pva_subscribe", None)
+        self.live = subscribe is not None
+        if self.live:
+            for ch, cache in self.caches.items():
+                try:
+                    subscribe(ch, cache.put, due=cache.due)
+                except Exception:
+                    pass    # get() falls back to a plain read
+
+    def get(self, channel):
+        """(frame, factor) for `channel`; (None, 1) if no image is available."""
+        cache = self.caches[channel]
+        if not self.live or cache.frames == 0:
+            cache.put(self.source.pva_image(channel))
+        return cache.get()
+
+    def stats(self, channel):
+        """frame_stats of the frame last returned by get(channel) (None without with_stats)."""
+        return self.caches[channel].stats()
+
+    def raw(self, channel):
+        """Full frame behind the last get(channel) (None without keep_raw), e.g. for tiles."""
+        return self.caches[channel].raw()
+
+
+class PreviewProcessor:
+    """
+    Running average and dark/flat correction of decimated preview frames.
+
+    - average: exponentially weighted, avg += alpha * (frame - avg); alpha=1 disables it.
+      It restarts whenever the beam (shutter) state changes.
+    - correct="dark": subtract the running average (ref_alpha) of the frames seen
+      while the shutters are closed.
+    - correct="flat": also divide by (flat - dark), where flat is the averaged frame
+      captured just before the shutters last closed (the last open-beam view). There
+      is no sample-out PV, so this normalises to that view rather than to a true flat.
+
+    All work happens in float32 buffers allocated once per frame shape, with in-place
+    NumPy ops, so memory stays constant however long the monitor runs.
+    """
+
+    def __init__(self, alpha=0.3, correct=None, ref_alpha=0.2, eps=1.0):
+        self.alpha = float(alpha)
+        self.correct = correct in ("dark", "flat")
+        self.use_flat = correct == "flat"
+        self.ref_alpha = float(ref_alpha)
+        self.eps = float(eps)
+        self._shape = None
+        self._last_in = None
+        self._beam = None
+
+    def _allocate(self, shape):
+        self._shape = shape
+        self._avg = np.empty(shape, dtype=np.float32)
+        self._tmp = np.empty(shape, dtype=np.float32)
+        self._out = np.empty(shape, dtype=np.float32)
+        self._dark = np.zeros(shape, dtype=np.float32)
+        self._flat = np.empty(shape, dtype=np.float32)
+        self.have_dark = self.have_flat = False
+        self._n = 0
+
+    def _ewma(self, buf, frame, alpha):
+        np.subtract(frame, buf, out=self._tmp)
+        self._tmp *= alpha
+        buf += self._tmp
+
+    def process(self, frame, beam_on=None):
+        """
+        Feed a decimated frame (None passes through); `beam_on` is True/False from the
+        shutter PVs, None if unknown. Returns the processed float32 frame (a view of an
+        internal buffer, valid until the next call).
+        """
+        if frame is None:
+            return None
+        if frame.shape != self._shape:
+            self._allocate(frame.shape)
+        if frame is self._last_in:
+            return self._out        # no new frame since the last render
+        self._last_in = frame
+
+        if beam_on is not None and beam_on != self._beam:
+            if self._beam and self.use_flat and self._n:
+                np.copyto(self._flat, self._avg)    # last open-beam view
+                self.have_flat = True
+            self._beam = beam_on
+            self._n = 0                             # restart the average
+
+        if self._n == 0:
+            np.copyto(self._avg, frame, casting="unsafe")
+        else:
+            self._ewma(self._avg, frame, self.alpha)
+        self._n += 1
+
+        if self.correct and beam_on is False:
+            if self.have_dark:
+                self._ewma(self._dark, frame, self.ref_alpha)
+            else:
+                np.copyto(self._dark, frame, casting="unsafe")
+                self.have_dark = True
+
+        np.copyto(self._out, self._avg)
+        if self.correct and beam_on and self.have_dark:
+            self._out -= self._dark
+            if self.have_flat:
+                np.subtract(self._flat, self._dark, out=self._tmp)
+                np.maximum(self._tmp, self.eps, out=self._tmp)
+                self._out /= self._tmp
+        return self._out
@@ -0,0 +1,233 @@
+# scheduling.py
+#
+# Adaptive refresh scheduling for the beamline monitors.
+#
+# Replaces the fixed `time.sleep(period)` in the monitor main loops:
+# - fast period while a "busy" PV shows activity (TomoScan:ScanStatus, camera Acquire)
+# - slow period when the beamline is idle
+# - immediate render when a "trigger" PV changes (shutters, CameraSelected, ...)
+# - never two renders closer than `min_interval` seconds
+#
+# PV changes come from CA monitors when the source has subscribe(pvname, callback)
+# (EpicsPVSource); otherwise (DummyPVSource) the PVs are polled with source.caget.
+#
+# Usage (inside a monitor):
+#   scheduler = AdaptiveScheduler(source, busy_pvs=BUSY_PVS, trigger_pvs=TRIGGER_PVS,
+#                                 fast_period=5, slow_period=60, min_interval=2)
+#   while True:
+#       source.next_refresh()
+#       render(...)
+#       scheduler.wait()
+#
+# FixedRateTimer and CircuitBreaker (below) pace the web fetchers (aps_monitor.py,
+# web_mirror.py): fixed-rate ticks with jitter, and backing off from a failing server.
+
+import math
+import random
+import threading
+import time
+
+
+# Lower-case fragments of state strings that mean "nothing is happening".
+IDLE_WORDS = ("idle", "done", "complete", "aborted", "stopped", "not running", "n/a")
+
+
+def is_active(value):
+    """True if a state PV value (string or number) indicates activity."""
+    if value is None:
+        return False
+    if isinstance(value, (int, float)):
+        return value != 0
+    s = str(value).strip().lower()
+    if s in ("", "0", "0.0"):
+        return False
+    return not any(w in s for w in IDLE_WORDS)
+
+
+class AdaptiveScheduler:
+    """Decides when the next dashboard render is due."""
+
+    def __init__(self, source, busy_pvs=(), trigger_pvs=(),
+                 fast_period=5.0, slow_period=60.0, min_interval=2.0, poll=0.5):
+        self.source = source
+        self.busy_pvs = list(busy_pvs)
+        self.trigger_pvs = list(trigger_pvs)
+        self.fast_period = float(fast_period)
+        self.slow_period = float(slow_period)
+        self.min_interval = float(min_interval)
+        self.poll = float(poll)
+
+        self._values = {}                 # pvname -> last seen value
+        self._event = threading.Event()   # set when a trigger PV changed
+        self._last_render = time.monotonic()
+        self.reason = "start"
+
+        subscribe = getattr(source, "subscribe", None)
+        self._monitored = subscribe is not None
+        if self._monitored:
+            for pvname in dict.fromkeys(self.busy_pvs + self.trigger_pvs):
+                subscribe(pvname, self._on_change)
+
+    # ---- PV changes ----
+
+    def _on_change(self, pvname, value):
+        # runs in the CA callback thread
+        first = pvname not in self._values
+        old = self._values.get(pvname)
+        self._values[pvname] = value
+        if first or value == old:
+            return
+        if pvname in self.trigger_pvs:
+            self._event.set()
+        elif pvname in self.busy_pvs and is_active(value) and not is_active(old):
+            self._event.set()   # switch to the fast rate right away
+
+    def _poll(self):
+        for pvname in dict.fromkeys(self.busy_pvs + self.trigger_pvs):
+            try:
+                value = self.source.caget(pvname, as_string=True, timeout=0.1)
+            except Exception:
+                value = None
+            self._on_change(pvname, value)
+
+    # ---- Rate ----
+
+    def busy(self):
+        return any(is_active(self._values.get(pv)) for pv in self.busy_pvs)
+
+    def period(self):
+        return self.fast_period if self.busy() else self.slow_period
+
+    def wait(self, sleep=None):
+        """
+        Block until the next render is due and return the reason
+        ("trigger", "busy" or "idle"). `sleep` replaces time.sleep for the
+        waiting slices (e.g. plt.pause to keep a --view window responsive).
+        """
+        self._last_render = time.monotonic()
+        if not self._monitored:
+            self._poll()        # baseline after the render
+            self._event.clear()
+        # (a CA monitor event that arrived during the render is kept: the
+        #  render may have read the PV just before it changed)
+
+        while True:
+            now = time.monotonic()
+            since = now - self._last_render
+            if self._event.is_set() and since >= self.min_interval:
+                self.reason = "trigger"
+                break
+            period = self.period()
+            if since >= period:
+                self.reason = "busy" if self.busy() else "idle"
+                break
+
+            step = min(self.poll, period - since)
+            if self._event.is_set():
+                step = min(step, self.min_interval - since)
+            step = max(step, 0.01)
+            if sleep is not None:
+                sleep(step)
+            elif self._event.is_set():
+                time.sleep(step)        # trigger pending, waiting out min_interval
+            else:
+                self._event.wait(step)
+            if not self._monitored:
+                self._poll()
+
+        self._event.clear()     # the render that follows covers it
+        return self.reason
+
+
+# ----------------------------
+# Fixed-rate fetch loops
+# ----------------------------
+
+class FixedRateTimer:
+    """
+    Ticks every `period` seconds counted from the start, so the time spent working
+    is subtracted from the sleep and the loop does not drift. Each tick is shifted by
+    a random +-`jitter` fraction of the period (the grid itself is not), so several
+    fetchers started together spread out over the upstream server. Ticks missed
+    because the work overran are skipped, never caught up in a burst.
+    """
+
+    def __init__(self, period, jitter=0.05, start=None):
+        self.period = float(period)
+        self.jitter = float(jitter)
+        self._next = time.monotonic() if start is None else float(start)
+        self.skipped = 0
+
+    def schedule(self, now=None):
+        """Advance to the next tick after `now`; returns its (jittered) monotonic time."""
+        now = time.monotonic() if now is None else now
+        self._next += self.period
+        if self._next <= now:
+            missed = math.floor((now - self._next) / self.period) + 1
+            self._next += missed * self.period
+            self.skipped += missed
+        return max(now, self._next + random.uniform(-self.jitter, self.jitter) * self.period)
+
+    def wait(self, sleep=time.sleep):
+        """Sleep until the next tick."""
+        delay = self.schedule() - time.monotonic()
+        if delay > 0:
+            sleep(delay)
+
+
+class CircuitBreaker:
+    """
+    Backs off from a failing upstream. After `threshold` consecutive failures the
+    breaker opens for `backoff` seconds (+-10 %); then it is half-open: the caller
+    tries once more (a cheap probe first, e.g. an HTTP HEAD). Success closes it; a
+    failure while half-open opens it again for twice as long, up to `max_backoff`.
+
+        if breaker.ready():
+            if breaker.state == "half-open" and not probe():
+                breaker.failure()
+            else:
+                ... fetch ...; breaker.success() / breaker.failure()
+    """
+
+    def __init__(self, threshold=3, backoff=60.0, max_backoff=1800.0):
+        self.threshold = int(threshold)
+        self.backoff = float(backoff)
+        self.max_backoff = float(max_backoff)
+        self.state = "closed"
+        self.failures = 0           # consecutive
+        self.open_until = None      # monotonic time
+        self._backoff = self.backoff
+
+    def ready(self, now=None):
+        """True if a request may be made now (closed, or open long enough: half-open)."""
+        if self.state != "open":
+            return True
+        now = time.monotonic() if now is None else now
+        if now < self.open_until:
+            return False
+        self.state = "half-open"
+        return True
+
+    def retry_in(self, now=None):
+        """Seconds until ready() turns True (0 if it already is)."""
+        if self.state != "open":
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.open_until - now)
+
+    def success(self):
+        self.state = "closed"
+        self.failures = 0
+        self._backoff = self.backoff
+
+    def failure(self, now=None):
+        """Count a failure; returns True if this opened the breaker."""
+        self.failures += 1
+        if self.state == "half-open":
+            self._backoff = min(2.0 * self._backoff, self.max_backoff)
+        elif self.failures < self.threshold:
+            return False
+        now = time.monotonic() if now is None else now
+        self.state = "open"
+        self.open_until = now + self._backoff * random.uniform(0.9, 1.1)
+        return True
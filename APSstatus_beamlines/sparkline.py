@@ -0,0 +1,121 @@
+# sparkline.py
+#
+# Sparkline trend row for the beamline monitor dashboards.
+#
+# - PVHistory: bounded in-memory history per PV (fixed-size NumPy ring, O(1) append,
+#   zero-copy window views). It is a RecordingSource sink: record(pvname, t, value).
+# - SparklineRow: one persistent Axes + Line2D per slot. Each refresh only calls
+#   set_data on the existing lines, so memory stays constant however long the monitor runs.
+#
+# Usage (inside a monitor):
+#   sparklines = SparklineRow(PVHistory(capacity=1440))
+#   source = RecordingSource(source, [sparklines.history])
+#   ...
+#   image_panel.clear_figure(fig, keep=sparklines.axes)    # instead of fig.clf()
+#   sparklines.update(fig, gs[3, :], [("Current (mA)", "S:SRcurrentAI.VAL"), ...])
+
+import math
+
+import numpy as np
+
+
+class PVHistory:
+    """Last `capacity` numeric samples of every recorded PV."""
+
+    def __init__(self, capacity=1440):
+        self.capacity = int(capacity)
+        self._rings = {}    # pvname -> [buf (2, 2*capacity), head, size]
+
+    def record(self, pvname, t, value):
+        if value is None or isinstance(value, str):
+            return
+        try:
+            v = float(value)
+        except (TypeError, ValueError):
+            return
+        if not math.isfinite(v):
+            return
+
+        ring = self._rings.get(pvname)
+        if ring is None:
+            ring = [np.empty((2, 2 * self.capacity)), 0, 0]
+            self._rings[pvname] = ring
+        buf, head, size = ring
+        # written twice so the last n samples are always one contiguous slice
+        buf[0, head] = buf[0, head + self.capacity] = t
+        buf[1, head] = buf[1, head + self.capacity] = v
+        ring[1] = (head + 1) % self.capacity
+        ring[2] = min(size + 1, self.capacity)
+
+    def window(self, pvname):
+        """(t, values) views of the stored samples, oldest first; empty if never recorded."""
+        ring = self._rings.get(pvname)
+        if ring is None:
+            return np.empty(0), np.empty(0)
+        buf, head, size = ring
+        end = head + self.capacity
+        return buf[0, end - size:end], buf[1, end - size:end]
+
+
+class SparklineRow:
+    """A row of small trend plots that survives fig.clf()-style redraws."""
+
+    def __init__(self, history, slots=3, color="#7fd4ff"):
+        self.history = history
+        self.slots = int(slots)
+        self.color = color
+        self.axes = []
+        self._lines = []
+        self._dots = []
+        self._labels = []
+
+    def _build(self, fig, subplot_spec):
+        # bottom part of the cell is left empty for the title of the axes below
+        sub = subplot_spec.subgridspec(2, self.slots, wspace=0.12, hspace=0.0,
+                                       height_ratios=[0.7, 0.3])
+        for i in range(self.slots):
+            ax = fig.add_subplot(sub[0, i])
+            ax.set_facecolor("black")
+            ax.set_xticks([])
+            ax.set_yticks([])
+            for spine in ax.spines.values():
+                spine.set_color("#555555")
+            line, = ax.plot([], [], color=self.color, linewidth=1.0)
+            dot, = ax.plot([], [], "o", color="white", markersize=2.5)
+            label = ax.text(0.02, 0.95, "", transform=ax.transAxes,
+                            ha="left", va="top", fontsize=7.5, color="#cfcfcf")
+            self.axes.append(ax)
+            self._lines.append(line)
+            self._dots.append(dot)
+            self._labels.append(label)
+
+    def update(self, fig, subplot_spec, items):
+        """items: [(label, pvname), ...] for the slots, left to right."""
+        if not self.axes:
+            self._build(fig, subplot_spec)
+
+        for i, ax in enumerate(self.axes):
+            line, dot, text = self._lines[i], self._dots[i], self._labels[i]
+            if i >= len(items):
+                line.set_data([], [])
+                dot.set_data([], [])
+                text.set_text("")
+                continue
+
+            label, pvname = items[i]
+            t, v = self.history.window(pvname)
+            if t.size == 0:
+                line.set_data([], [])
+                dot.set_data([], [])
+                text.set_text(f"{label}  (no data)")
+                continue
+
+            x = t - t[-1]   # seconds before the latest sample
+            line.set_data(x, v)
+            dot.set_data(x[-1:], v[-1:])
+            vmin, vmax = float(v.min()), float(v.max())
+            pad = 0.1 * (vmax - vmin) or max(abs(vmax) * 1e-3, 1e-6)
+            ax.set_xlim(min(float(x[0]), -1.0), 0.0)
+            ax.set_ylim(vmin - pad, vmax + pad)
+            span_h = -float(x[0]) / 3600.0
+            text.set_text(f"{label}  {span_h:.1f} h  [{vmin:.4g} .. {vmax:.4g}]")
@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# status_file.py
+#
+# Machine-readable process status for the monitors and mirrors.
+#
+# With --status PATH, each process rewrites one small JSON file (atomic_file.py) after
+# every cycle:
+#   {"name": "02bm_monitor", "host": "arcturus", "pid": 12345, "started": 1760...,
+#    "updated": 1760..., "period": 60, "state": "ok" | "error",
+#    "cycles": 812, "errors": 1, "last_success": 1760..., "cycle_ms": 412.7,
+#    "bytes": 183204, "last_error": {"time": 1760..., "message": "..."} | null,
+#    "outputs": {"/path/02bm_monitor.png": {"mtime": 1760..., "size": 183204}},
+#    ...extra fields of the process (e.g. "sources" of web_mirror.py)}
+# Times are epoch seconds. A reader judges liveness from "updated" and "period"; see
+# is_stale(). Written to a shared directory, aps_status.sh gets the state of every process
+# in one read, without SSH.
+#
+# Usage (inside a monitor):
+#   status = StatusFile(args.status, outputs=[args.out], period=args.period)  # None: no file
+#   while True:
+#       with status.cycle():        # an exception is logged and recorded, the loop goes on
+#           render(...)
+#
+# Usage (command line):
+#   python status_file.py /net/joulefs/coulomb_Public/apsstatus_status/*.status.json
+#   python status_file.py --line --output /path/02bm_monitor.png 02bm_monitor.status.json
+#
+# Notes:
+# - The file holds the host name, pid and raw exception text: keep it out of the web
+#   docroot (there is no default location, the file is only written with --status).
+
+import argparse
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from datetime import datetime
+
+from atomic_file import write_json
+
+
+def is_stale(status, now=None, grace=60.0):
+    """True if the process has not reported for three periods (plus `grace` seconds)."""
+    now = time.time() if now is None else now
+    period = status.get("period") or 60.0
+    return now - status.get("updated", 0.0) > 3.0 * period + grace
+
+
+class StatusFile:
+    """Cycle bookkeeping of one process, written to a JSON file (none if path is None)."""
+
+    def __init__(self, path, name=None, outputs=(), period=None):
+        self.path = path
+        self.outputs = [o for o in outputs if o]
+        self._lock = threading.Lock()
+        if name is None:
+            base = path if path is not None else sys.argv[0]
+            name = os.path.splitext(os.path.basename(base))[0].replace(".status", "")
+        self.data = {
+            "name": name,
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+            "started": time.time(),
+            "updated": time.time(),
+            "period": period,
+            "state": "starting",
+            "cycles": 0,
+            "errors": 0,
+            "last_success": None,
+            "cycle_ms": None,
+            "bytes": None,
+            "last_error": None,
+            "outputs": {},
+        }
+        self.write()
+
+    def _stat_outputs(self):
+        out = {}
+        for p in self.outputs:
+            try:
+                st = os.stat(p)
+                out[p] = {"mtime": st.st_mtime, "size": st.st_size}
+            except OSError:
+                out[p] = None
+        return out
+
+    def success(self, duration, bytes=None, **extra):
+        """Record a successful cycle of `duration` seconds and write the file."""
+        with self._lock:
+            d = self.data
+            d["cycles"] += 1
+            d["state"] = "ok"
+            d["last_success"] = d["updated"] = time.time()
+            d["cycle_ms"] = round(1e3 * duration, 1)
+            d["outputs"] = self._stat_outputs()
+            d["bytes"] = bytes if bytes is not None else sum(
+                o["size"] for o in d["outputs"].values() if o) or None
+            d.update(extra)
+            self._write()
+
+    def failure(self, error, duration=None, **extra):
+        """Record a failed cycle and write the file."""
+        with self._lock:
+            d = self.data
+            d["cycles"] += 1
+            d["errors"] += 1
+            d["state"] = "error"
+            d["updated"] = time.time()
+            if duration is not None:
+                d["cycle_ms"] = round(1e3 * duration, 1)
+            msg = error if isinstance(error, str) else \
+                "".join(traceback.format_exception_only(type(error), error)).strip()
+            d["last_error"] = {"time": d["updated"], "message": msg}
+            d["outputs"] = self._stat_outputs()
+            d.update(extra)
+            self._write()
+
+    def update(self, **extra):
+        """Refresh "updated" (and extra fields) without counting a cycle, e.g. while backing off."""
+        with self._lock:
+            self.data["updated"] = time.time()
+            self.data.update(extra)
+            self._write()
+
+    @contextmanager
+    def cycle(self):
+        """
+        Time the block; success() if it returns. If it raises, the traceback is printed,
+        failure() records it and the exception is swallowed, so the caller's loop goes on
+        with the next cycle.
+        """
+        t0 = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: cycle failed: {e}",
+                  flush=True)
+            traceback.print_exc(file=sys.stdout)
+            sys.stdout.flush()
+            self.failure(e, time.perf_counter() - t0)
+            return
+        self.success(time.perf_counter() - t0)
+
+    def write(self):
+        with self._lock:
+            self._write()
+
+    def _write(self):
+        if self.path is None:
+            return
+        try:
+            write_json(self.path, self.data, indent=1)
+        except OSError as e:
+            # status is best effort: never stop the process because of it
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: status file "
+                  f"{self.path}: {e}", flush=True)
+
+
+# ----------------------------
+# Command line
+# ----------------------------
+
+def _fmt_ts(epoch):
+    if epoch is None:
+        return "-"
+    return datetime.fromtimestamp(epoch).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _fmt_elapsed(seconds):
+    d, r = divmod(int(seconds), 86400)
+    h, r = divmod(r, 3600)
+    m, sec = divmod(r, 60)
+    return (f"{d}-" if d else "") + (f"{h:02d}:" if d or h else "") + f"{m:02d}:{sec:02d}"
+
+
+def summary_line(s, now=None, output=None):
+    """
+    One "STATE|PID|ELAPSED|OUTPUT_TIME|OUTPUT_SIZE|DETAIL" line of a status (for
+    aps_status.sh). OUTPUT is `output` if given, else the first output of the process.
+    """
+    now = time.time() if now is None else now
+    state = "stale" if is_stale(s, now) else s.get("state", "-")
+    outputs = s.get("outputs") or {}
+    out = (outputs.get(output) if output else next(iter(outputs.values()), None)) or {}
+    err = (s.get("last_error") or {}).get("message")
+    detail = f"{s.get('host', '-')}  cycle {s.get('cycle_ms', '-')} ms, {s.get('errors', 0)} errors"
+    if err and state != "ok":
+        detail += f", last: {err}"
+    fields = (state, s.get("pid", "-"), _fmt_elapsed(now - s.get("started", now)),
+              _fmt_ts(out.get("mtime")), out.get("size", "-"), " ".join(detail.split()))
+    return "|".join(str(x).replace("|", "/") for x in fields)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize monitor/mirror status files.")
+    parser.add_argument("files", nargs="+", help="*.status.json files.")
+    parser.add_argument("--json", action="store_true", help="Print one merged JSON object.")
+    parser.add_argument("--line", action="store_true",
+                        help="Print one summary_line() per readable file (unreadable: nothing).")
+    parser.add_argument("--output", default=None,
+                        help="With --line: the output whose mtime/size is shown.")
+    args = parser.parse_args()
+
+    if args.line:
+        now = time.time()
+        for path in args.files:
+            try:
+                with open(path) as f:
+                    print(summary_line(json.load(f), now, args.output))
+            except (OSError, ValueError):
+                pass
+        return
+
+    now = time.time()
+    merged = {}
+    for path in args.files:
+        try:
+            with open(path) as f:
+                s = json.load(f)
+        except (OSError, ValueError) as e:
+            s = {"name": os.path.basename(path), "state": "unreadable", "last_error": {"message": str(e)}}
+        else:
+            if is_stale(s, now):
+                s["state"] = "stale"
+        merged[s.get("name", path)] = s
+    if args.json:
+        print(json.dumps(merged, indent=1))
+        return
+
+    print(f"{'NAME':<16} {'STATE':<10} {'HOST':<12} {'PID':>7} {'AGE':>6} {'CYCLE_MS':>9} "
+          f"{'LAST_SUCCESS':<20} {'ERRORS':>6}  LAST_ERROR")
+    for name, s in merged.items():
+        age = f"{now - s['updated']:.0f}" if s.get("updated") else "-"
+        err = (s.get("last_error") or {}).get("message", "-")
+        print(f"{name:<16} {s.get('state', '-'):<10} {str(s.get('host', '-')):<12} "
+              f"{str(s.get('pid', '-')):>7} {age:>6} {str(s.get('cycle_ms') or '-'):>9} "
+              f"{_fmt_ts(s.get('last_success')):<20} {str(s.get('errors', '-')):>6}  {err}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,15 +2,109 @@ import sys
 from PyQt5.QtWidgets import (
 	QApplication, QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QLineEdit, QComboBox, QCheckBox, QGridLayout, QGroupBox, QLCDNumber, QStackedWidget, QFileDialog, QSlider
 )
-from PyQt5.QtCore import QTimer, Qt
+from PyQt5.QtCore import Qt, QThread, pyqtSignal
 from PyQt5.QtGui import QFont
 from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
 from matplotlib.figure import Figure
 import epics 
-from epics import caget 
 import math
+import threading
 import matplotlib.patches as mpatches
 from matplotlib.patches import Rectangle
+import numpy as np
+
+# samples kept per scan (1 s timer -> 10 h); memory is fixed at startup
+HISTORY_LEN = 36000
+
+class RingBuffer:
+	"""
+	Fixed-capacity history of several float series sampled together.
+
+	Every sample is written twice (at i and i + capacity) into a preallocated
+	(nfields, 2*capacity) array, so append is O(1) and the last n samples are
+	always one contiguous slice: window() returns views, never copies.
+	"""
+	def __init__(self, capacity, fields):
+		self.capacity = int(capacity)
+		self.fields = tuple(fields)
+		self._buf = np.full((len(self.fields), 2 * self.capacity), np.nan)
+		self._head = 0      # next write position in [0, capacity)
+		self._size = 0
+
+	def __len__(self):
+		return self._size
+
+	def append(self, *values):
+		col = np.asarray(values, dtype=float)
+		self._buf[:, self._head] = col
+		self._buf[:, self._head + self.capacity] = col
+		self._head = (self._head + 1) % self.capacity
+		self._size = min(self._size + 1, self.capacity)
+
+	def clear(self):
+		self._head = 0
+		self._size = 0
+
+	def window(self, n=None):
+		"""View of the last n samples (all if None), shape (nfields, n), oldest first."""
+		n = self._size if n is None else min(int(n), self._size)
+		end = self._head + self.capacity
+		return self._buf[:, end - n:end]
+
+def log_ratio(num, den):
+	"""Vectorized log(num/den); 0 where either input is not positive (matches the old per-sample rule)."""
+	ok = (num > 0) & (den > 0)
+	out = np.zeros(num.shape)
+	np.divide(num, den, out=out, where=ok)
+	np.log(out, out=out, where=ok)
+	return out
+
+class PVReader(QThread):
+	"""
+	Acquisition thread: one CA monitor per PV keeps the latest value in a dict
+	(callbacks run on the CA thread, never on the GUI thread). Every period the
+	thread emits a {label: value} snapshot; the connection to the GUI slot is
+	queued because the receiver lives in the main thread. Disconnected PVs read None.
+	"""
+	snapshot = pyqtSignal(dict)
+	
+	def __init__(self, pv_dict, period_ms = 1000, parent = None):
+		super().__init__(parent)
+		self.pv_dict = dict(pv_dict)
+		self.period_ms = int(period_ms)
+		self._latest = {}
+		self._lock = threading.Lock()
+		self._pvs = []
+		
+	def _on_value(self, pvname = None, value = None, **kws):
+		with self._lock:
+			self._latest[pvname] = value
+			
+	def _on_connection(self, pvname = None, conn = None, **kws):
+		if not conn:
+			with self._lock:
+				self._latest[pvname] = None
+				
+	def run(self):
+		self._pvs = [
+			epics.PV(name, auto_monitor = True, callback = self._on_value,
+				connection_callback = self._on_connection)
+			for name in self.pv_dict.values()
+		]
+		while not self.isInterruptionRequested():
+			with self._lock:
+				snap = {label: self._latest.get(name) for label, name in self.pv_dict.items()}
+			self.snapshot.emit(snap)
+			self.msleep(self.period_ms)
+		for pv in self._pvs:
+			pv.clear_callbacks()
+			pv.disconnect()
+			
+	def stop(self):
+		self.requestInterruption()
+		self.wait()
+
+_UNSET = object()
 
 class BeamlineMonitor(QWidget):
 	def __init__(self):
@@ -52,15 +146,9 @@ class BeamlineMonitor(QWidget):
 		
 		self.main_layout.addLayout(top_layout)
 		
-		# initializing the values 
-		self.time_vals = []
-		self.i0_vals = []
-		self.i1_vals = []
-		self.i2_vals = []
-		self.energy_vals = []
-		self.mu01_vals = []
-		self.mu12_vals = []
-		self.t = 0
+		# scan history (bounded, preallocated): sampled only while all shutters are open,
+		# reset when one closes
+		self.scan = RingBuffer(HISTORY_LEN, ("energy", "i0", "i1", "i2"))
 		
 		self.figures = []
 		self.axes = []
@@ -77,6 +165,10 @@ class BeamlineMonitor(QWidget):
 		self.energy_plot_ax2.set_ylabel("Fluorescence")
 		self.energy_plot_fig.patch.set_facecolor('whitesmoke')
 		self.energy_plot_canvas.setStyleSheet("background-color: whitesmoke")
+		# lines are created once and updated with set_data on each tick
+		self.mu01_line, = self.energy_plot_ax.plot([], [], label = "mu01", color = "magenta")
+		self.mu12_line, = self.energy_plot_ax.plot([], [], label = "mu12", color = "cyan")
+		self.energy_plot_ax.legend()
 		
 		self.main_layout.addWidget(self.energy_plot_canvas)
 		
@@ -94,6 +186,7 @@ class BeamlineMonitor(QWidget):
 		for i, cb in enumerate([self.cb_mu01, self.cb_mu12, self.cb_flatot]):
 			cb.setChecked(True)
 			controls_layout.addWidget(cb, 0, i+1)
+			cb.stateChanged.connect(self.update_energy_plot)
 			
 		self.main_layout.addLayout(controls_layout)
 		
@@ -109,13 +202,9 @@ class BeamlineMonitor(QWidget):
 		self.ax.get_yaxis().set_visible(False)
 		self.canvas.setFixedHeight(120)
 		self.ax.set_title('Mostab Output')
-		self.green_patch = None
-		self.yellow_patch = None
-		self.red_patch = None
-		self.yellow_two_patch = None
-		self.red_two_patch = None
 		
 		self.canvas.figure.subplots_adjust(top =.78, bottom = .01, left = .00, right = .999)
+		self.show_gradient_background()
 		self.main_layout.addLayout(middle_layout)
 		
 		
@@ -134,7 +223,6 @@ class BeamlineMonitor(QWidget):
 				border-radius: 5px;
 			}
 		""")
-		self.value_text = None
 		
 		self.main_layout.addWidget(self.mt_slider)
 		
@@ -193,31 +281,92 @@ class BeamlineMonitor(QWidget):
 			"Mostab Setvalue": "12bmb2:mt_setvalue"
 	}
 		
-		#Timer to update data 
-		self.timer = QTimer()
-		self.timer.timeout.connect(self.update_data)
-		self.timer.start(1000)
+		# last value painted per widget key; widgets are only touched when it changes
+		self._shown = {}
+		
+		#Reader thread to update data (EPICS I/O never runs on the GUI thread)
+		self.reader = PVReader(self.pv_dict, period_ms = 1000)
+		self.reader.snapshot.connect(self.update_data, Qt.QueuedConnection)
+		self.reader.start()
 		
-		self.allow_energy_update = False
-		self.last_energy_plot_time = -1
 	
-	#color gradient from red to green for second plot 	
+	#color gradient from red to green for second plot (built once; updates only move the bar)
 	def show_gradient_background(self):
 		self.ax.clear()
 		self.ax.set_xlim(0,70000)
 		self.ax.set_ylim(0,1)
 		self.ax.axis('off')
-		self.figure.patch.set_facecolor('black')
+		self.canvas.figure.patch.set_facecolor('black')
 		
 		self.ax.axhspan(0, 1, xmin=0, xmax= 10000 / 70000, color = 'red', zorder = 0)
 		self.ax.axhspan(0, 1, xmin = 10000 / 70000, xmax = 20000 / 70000, color = 'yellow', zorder = 0)
 		self.ax.axhspan(0, 1, xmin = 20000 / 70000, xmax = 50000/70000, color = 'green', zorder = 0)
 		self.ax.axhspan(0, 1, xmin= 50000/70000, xmax= 60000 / 70000, color = 'yellow', zorder = 0)
 		self.ax.axhspan(0, 1, xmin = 60000/ 70000, xmax = 70000 / 70000, color = 'red', zorder = 0)
-				
-		border = mpatches.Rectangle((0, .3), 50000, .4, linewidth = .1, edgecolor = 'black', facecolor = 'none', zorder = 1)
 		
-		self.canvas.draw()
+		# bar segments and label are animated artists: drawn by blitting over a cached background
+		self.red_patch = mpatches.Rectangle((0, .25), 0, .5, color = 'red', zorder =2, animated = True)
+		self.yellow_patch = mpatches.Rectangle((10000, .25), 0, .5, color = 'yellow', zorder =2, animated = True)
+		self.green_patch = mpatches.Rectangle((20000, .25), 0, .5, color = 'green', zorder =2, animated = True)
+		self.yellow_two_patch = mpatches.Rectangle((50000, .25), 0, .5, color = 'yellow', zorder = 2, animated = True)
+		self.red_two_patch = mpatches.Rectangle((60000, .25), 0, .5, color = 'red', zorder = 2, animated = True)
+		self.mt_patches = [self.red_patch, self.yellow_patch, self.green_patch, self.yellow_two_patch, self.red_two_patch]
+		for patch in self.mt_patches:
+			self.ax.add_patch(patch)
+		self.value_text = self.ax.text(
+			500, 
+			.5,
+			"",
+			va = 'center',
+			ha = 'left',
+			fontsize = 10,
+			color = 'white',
+			weight = 'bold',
+			zorder = 3,
+			animated = True
+		)
+		
+		self._mt_background = None
+		self.canvas.mpl_connect('draw_event', self._on_mt_draw)
+		
+	# full redraw (first show, resize): re-cache the static background, then paint the bar on it
+	def _on_mt_draw(self, event):
+		self._mt_background = self.canvas.copy_from_bbox(self.ax.bbox)
+		self._blit_mt_bar()
+		
+	def _blit_mt_bar(self):
+		if self._mt_background is None:
+			return
+		self.canvas.restore_region(self._mt_background)
+		for artist in self.mt_patches + [self.value_text]:
+			self.ax.draw_artist(artist)
+		self.canvas.blit(self.ax.bbox)
+		
+	#second plot for mt output (might need to change thresholds for red, yellow, and green) 
+	def update_mt_bar(self, value):
+		red_limit = min(value, 10000)
+		yellow_limit = min(max(value - 10000, 0), 20000)
+		green_limit = min(max(value-20000, 0), 50000)
+		yellow_two_limit = min(max(value-50000, 0), 60000)
+		red_two_limit = min(max(value-60000, 0), 70000)
+		
+		for patch, width in zip(self.mt_patches, [red_limit, yellow_limit, green_limit, yellow_two_limit, red_two_limit]):
+			patch.set_width(width)
+		self.value_text.set_x(value + 500)
+		self.value_text.set_text(f"{value: .1f}")
+		self._blit_mt_bar()
+		
+	# True (and remembered) if value differs from what the widget for `key` shows now
+	def changed(self, key, value):
+		old = self._shown.get(key, _UNSET)
+		if old is not _UNSET and (old == value or (old != old and value != value)):
+			return False
+		self._shown[key] = value
+		return True
+	
+	def closeEvent(self, event):
+		self.reader.stop()
+		super().closeEvent(event)
     
 	## display variables and style 
 	def create_lcd_display(self, label, color= "white"):
@@ -233,6 +382,19 @@ class BeamlineMonitor(QWidget):
     		box.setLayout(vbox)
     		return box
     	
+	#main graph: mu01/mu12 vs energy over the current scan window (no new artists per tick)
+	def update_energy_plot(self):
+		energy, i0, i1, i2 = self.scan.window()
+		self.mu01_line.set_data(energy, log_ratio(i0, i1))
+		self.mu12_line.set_data(energy, log_ratio(i1, i2))
+		self.mu01_line.set_visible(self.cb_mu01.isChecked())
+		self.mu12_line.set_visible(self.cb_mu12.isChecked())
+		if len(self.scan):
+			self.energy_plot_ax.set_facecolor('black')
+		self.energy_plot_ax.relim(visible_only = True)
+		self.energy_plot_ax.autoscale_view()
+		self.energy_plot_canvas.draw_idle()
+	
     	#Update shutter color based on Pv ( 0 = open, 1 = closed) may need to update later	
 	def update_shutter_button_a_and_b(self, button, pv_val):
 		if pv_val == 0:
@@ -247,69 +409,56 @@ class BeamlineMonitor(QWidget):
 		else:
 			button.setStyleSheet("background-color: green; color: white")
 			
-    	#updating data for output sections, graphs, shutters, and alarm	
-	def update_data(self):
+    	#updating data for output sections, graphs, shutters, and alarm (slot for PVReader.snapshot)
+	def update_data(self, snap):
 		try:
-			alarm_val = caget(self.pv_dict["Alarm Light"])
-			if alarm_val == 1:
-				self.alarm_light.setStyleSheet("QPushButton {border: black; border-radius: 20px; background-color: green}")
-			else: 
-				self.alarm_light.setStyleSheet("QPushButton {border: black; border-radius: 20px; background-color: red}")
+			alarm_val = snap["Alarm Light"]
+			if self.changed("Alarm Light", alarm_val == 1):
+				if alarm_val == 1:
+					self.alarm_light.setStyleSheet("QPushButton {border: black; border-radius: 20px; background-color: green}")
+				else: 
+					self.alarm_light.setStyleSheet("QPushButton {border: black; border-radius: 20px; background-color: red}")
 			
-			i0 = caget(self.pv_dict["I0"])
-			i1 = caget(self.pv_dict["I1"])
-			i2 = caget(self.pv_dict["I2"])
-			energy = caget(self.pv_dict["Energy"])
-			ring = caget(self.pv_dict["Ring Current"])
-			deadtime = caget(self.pv_dict["Det DT"])
-			output = caget(self.pv_dict["Mostab Output"])
-			prefaction = caget(self.pv_dict["Mostab Prefaction"])
-			setvalue = caget(self.pv_dict["Mostab Setvalue"])
-			sh_a = caget(self.pv_dict["Shutter A"])
-			sh_b = caget(self.pv_dict["Shutter B"])
-			sh_q = caget(self.pv_dict["Shutter Q"]) 
+			i0 = snap["I0"]
+			i1 = snap["I1"]
+			i2 = snap["I2"]
+			energy = snap["Energy"]
+			ring = snap["Ring Current"]
+			deadtime = snap["Det DT"]
+			output = snap["Mostab Output"]
+			prefaction = snap["Mostab Prefaction"]
+			setvalue = snap["Mostab Setvalue"]
+			sh_a = snap["Shutter A"]
+			sh_b = snap["Shutter B"]
+			sh_q = snap["Shutter Q"] 
 			
 			if energy <= 0:
 				energy_vals = "Error"
 			
-			if i0 > 0 and i1 > 0:
-				mu01 = math.log(i0/ i1)
-			else: 
-				mu01 = 0
-			if i1 > 0 and i2 > 0:
-				mu12 = math.log(i1/i2)
-			else:
-				mu12 = 0				
-			
 		except Exception as e:
 			print(f"Error reading PVs: {e}")
 			return 
 		
 		
-		self.time_vals.append(self.t)
-		self.i0_vals.append(i0)
-		self.i1_vals.append(i1)
-		self.i2_vals.append(i2)
-		self.t += 1
-		
-		self.energy_vals.append(energy)
-		self.mu01_vals.append(mu01)
-		self.mu12_vals.append(mu12)
-		
-
-		self.i0_display.lcd.display(i0)
-		self.i1_display.lcd.display(i1)
-		self.i2_display.lcd.display(i2)
-		self.energy_display.lcd.display(energy)
-		#self.slide_display.lcd.display(energy)
-		self.ring_display.lcd.display(ring)
-		self.deadtime_label.lcd.display(deadtime)
-		self.mt_output.lcd.display(output)
-		self.mt_prefaction.lcd.display(prefaction)
-		
-		self.update_shutter_button_a_and_b(self.a_shutter, sh_a)
-		self.update_shutter_button_a_and_b(self.b_shutter, sh_b)
-		self.update_shutter_button_Q(self.q_shutter, sh_q)
+		for key, display, value in [
+			("I0", self.i0_display, i0),
+			("I1", self.i1_display, i1),
+			("I2", self.i2_display, i2),
+			("Energy", self.energy_display, energy),
+			("Ring Current", self.ring_display, ring),
+			("Det DT", self.deadtime_label, deadtime),
+			("Mostab Output", self.mt_output, output),
+			("Mostab Prefaction", self.mt_prefaction, prefaction),
+		]:
+			if self.changed(key, value):
+				display.lcd.display(value)
+		
+		if self.changed("Shutter A", sh_a):
+			self.update_shutter_button_a_and_b(self.a_shutter, sh_a)
+		if self.changed("Shutter B", sh_b):
+			self.update_shutter_button_a_and_b(self.b_shutter, sh_b)
+		if self.changed("Shutter Q", sh_q):
+			self.update_shutter_button_Q(self.q_shutter, sh_q)
 
 		#main graph showing mu01 and mu12 values 	
 		shutters_open = all([
@@ -318,121 +467,30 @@ class BeamlineMonitor(QWidget):
 			str(sh_q).strip() != 'A'
 		])
 		
-		if not hasattr(self, '_graph_cleared_on_open'):
-			self._graph_cleared_on_open = False 
-			
-
-				
 		if shutters_open:
-			if not self._graph_cleared_on_open:
-				energy_plot_ax = self.energy_plot_ax
-				energy_plot_canvas = self.energy_plot_canvas
-				self.energy_plot_ax.clear()
-				energy_plot_ax.set_facecolor('black')
-				self.energy_plot_canvas.draw()
-				self._graph_cleared_on_open = True
-				self.allow_energy_update = True 
-				self.last_energy_plot_time = self.t
-				self._graph_cleared_on_open
-			else:
-				self.allow_energy_update = False
-				
-			if self.allow_energy_update:
-				updated = False
-				if self.cb_mu01.isChecked():
-					energy_plot_ax.plot(self.energy_vals, self.mu01_vals, label = "mu01", color = "magenta")
-					updated = True
-				if self.cb_mu12.isChecked():
-					energy_plot_ax.plot(self.energy_vals, self.mu12_vals, label = "mu12", color = "cyan")
-					updated = True
-				if updated:
-					energy_plot_ax.set_title("Transmission & Fluorescence")
-					energy_plot_ax.set_xlabel("Energy (keV)")
-					energy_plot_ax.set_ylabel("Transmission")
-					energy_plot_ax.legend()
-					self.energy_plot_canvas.draw()	
-			else:
-				self.allow_energy_update = False
-				self._graph_cleared_on_open = False
-				
-		if sh_a == '0':
-			self.energy_plot_ax.clear()
-			self.energy_vals = []
-			self.mu01_vals = []
-			self.mu12_vals = []
-		if sh_b == '0':
-			self.energy_plot_ax.clear()
-			self.energy_vals = []
-			self.mu01_vals = []
-			self.mu12_vals = []
-		if sh_q == 'A':
-			self.energy_plot_ax.clear()
-			self.energy_vals = []
-			self.mu01_vals = []
-			self.mu12_vals = []
-			
+			self.scan.append(energy, i0, i1, i2)
+			self.update_energy_plot()
+		elif len(self.scan):
+			# a shutter closed: start a fresh scan next time they are all open
+			self.scan.clear()
+			self.update_energy_plot()
 			
-		#second plot for mt output (might need to change thresholds for red, yellow, and green) 
-		value = caget(self.pv_dict["Mostab Output"])
+		#second plot for mt output: only the bar artists are re-blitted, and only on change
+		value = output
 		if value is None or math.isnan(value):
 			value = 0
 		value = min(max(value, 0), 70000)
-		
-		if self.green_patch:
-			self.green_patch.remove()
-		if self.yellow_patch:
-			self.yellow_patch.remove()
-		if self.red_patch:
-			self.red_patch.remove()
-		if self.red_two_patch:
-			self.red_two_patch.remove()
-		if self.yellow_two_patch:
-			self.yellow_two_patch.remove()
-				
-		red_limit = min(value, 10000)
-		yellow_limit = min(max(value - 10000, 0), 20000)
-		green_limit = min(max(value-20000, 0), 50000)
-		yellow_two_limit = min(max(value-50000, 0), 60000)
-		red_two_limit = min(max(value-60000, 0), 70000)
-		
-		self.red_patch = mpatches.Rectangle((0, .25), red_limit, .5, color = 'red', zorder =2)
-		self.yellow_patch = mpatches.Rectangle((10000, .25), yellow_limit, .5, color = 'yellow', zorder =2)
-		self.green_patch = mpatches.Rectangle((20000, .25), green_limit, .5, color = 'green', zorder =2)
-		self.yellow_two_patch = mpatches.Rectangle((50000, .25), yellow_two_limit, .5, color = 'yellow', zorder = 2)
-		self.red_two_patch = mpatches.Rectangle((60000, .25), red_two_limit, .5, color = 'red', zorder = 2)
-		
-		self.ax.add_patch(self.red_patch)
-		self.ax.add_patch(self.yellow_patch)
-		self.ax.add_patch(self.green_patch)
-		self.ax.add_patch(self.yellow_two_patch)
-		self.ax.add_patch(self.red_two_patch)
-		
-		if hasattr(self, 'value_text') and self.value_text:
-			self.value_text.remove()
-			
-		self.value_text = self.ax.text(
-			value + 500, 
-			5,
-			f"{value: .1f}",
-			va = 'center',
-			ha = 'left',
-			fontsize = 10,
-			color = 'white',
-			weight = 'bold',
-			zorder = 1
-		)
-		
-		self.ax.set_facecolor('black')
-		
-		self.canvas.draw()
+		if self.changed("Mostab bar", value):
+			self.update_mt_bar(value)
 		
 		# horizontal slider for mostab setvalue
-		mt_set_value = caget(self.pv_dict["Mostab Setvalue"])
+		mt_set_value = setvalue
 		if mt_set_value is None or math.isnan(mt_set_value):
 			mt_set_value = 0
 		mt_set_value = min(max(mt_set_value, 0), 70000)
 		
-		self.mt_slider.setValue(int(mt_set_value))
+		if self.changed("Mostab Setvalue", int(mt_set_value)):
+			self.mt_slider.setValue(int(mt_set_value))
 		
 if __name__ == '__main__':
 	app = QApplication(sys.argv)
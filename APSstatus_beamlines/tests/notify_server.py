@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# notify_server.py
+#
+# Local SMTP + HTTP stand-in for testing the monitor notifications (notify.py).
+#
+# - SMTP on 127.0.0.1:--smtp-port (default 8025): a minimal server that accepts every
+#   message (HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT) and prints it
+# - HTTP on 127.0.0.1:--http-port (default 8080): accepts POSTs on any path and prints
+#   the body; --fail-every N answers every Nth POST with 500 to exercise the retries
+# Everything received is also appended to --log (JSON lines) if given.
+#
+# Usage:
+#   python notify_server.py
+#   python ../02bm_monitor.py --dummy --notify smtp://127.0.0.1:8025/ops@example.org \
+#                                     --notify http://127.0.0.1:8080/hook
+#
+# Requirements:
+#   Python standard library only.
+
+import argparse
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Received:
+    def __init__(self, log=None):
+        self.log = log
+        self._lock = threading.Lock()
+        self.count = {"smtp": 0, "http": 0}
+
+    def add(self, kind, **info):
+        with self._lock:
+            self.count[kind] += 1
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            print(f"[{stamp}] {kind.upper()} #{self.count[kind]}", flush=True)
+            for k, v in info.items():
+                print(f"  {k}: {v}", flush=True)
+            if self.log:
+                with open(self.log, "a") as f:
+                    f.write(json.dumps(dict(info, kind=kind, time=time.time())) + "\n")
+
+
+# ----------------------------
+# SMTP
+# ----------------------------
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        self.reply("220 localhost notify_server ESMTP")
+        sender, rcpts = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            cmd = line.decode(errors="replace").strip()
+            verb = cmd[:4].upper()
+            if verb in ("HELO", "EHLO"):
+                self.reply("250 localhost")
+            elif verb == "MAIL":
+                sender, rcpts = cmd[10:].strip(), []
+                self.reply("250 OK")
+            elif verb == "RCPT":
+                rcpts.append(cmd[8:].strip())
+                self.reply("250 OK")
+            elif verb == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                body = []
+                while True:
+                    data = self.rfile.readline()
+                    if not data or data in (b".\r\n", b".\n"):
+                        break
+                    body.append(data.decode(errors="replace").rstrip("\r\n"))
+                subject = next((b[9:] for b in body if b.startswith("Subject: ")), "")
+                self.server.received.add("smtp", sender=sender, to=", ".join(rcpts),
+                                         subject=subject)
+                self.reply("250 OK queued")
+            elif verb in ("RSET", "NOOP"):
+                self.reply("250 OK")
+            elif verb == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+
+class SMTPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+# ----------------------------
+# HTTP
+# ----------------------------
+
+class HookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        n = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(n).decode(errors="replace")
+        srv = self.server
+        with srv.lock:
+            srv.posts += 1
+            fail = srv.fail_every and srv.posts % srv.fail_every == 0
+        if fail:
+            self.send_response(500)
+            self.end_headers()
+            return
+        srv.received.add("http", path=self.path, body=body)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Local SMTP/HTTP sink for notify.py tests.")
+    parser.add_argument("--smtp-port", type=int, default=8025)
+    parser.add_argument("--http-port", type=int, default=8080)
+    parser.add_argument("--fail-every", type=int, default=0,
+                        help="Answer every Nth HTTP POST with 500 (0: never).")
+    parser.add_argument("--log", default=None, help="Append received messages as JSON lines.")
+    args = parser.parse_args()
+
+    received = Received(args.log)
+    smtp = SMTPServer(("127.0.0.1", args.smtp_port), SMTPHandler)
+    smtp.received = received
+    http = ThreadingHTTPServer(("127.0.0.1", args.http_port), HookHandler)
+    http.received = received
+    http.lock = threading.Lock()
+    http.posts = 0
+    http.fail_every = args.fail_every
+
+    threading.Thread(target=smtp.serve_forever, daemon=True).start()
+    print(f"SMTP on 127.0.0.1:{args.smtp_port}, HTTP on 127.0.0.1:{args.http_port}", flush=True)
+    try:
+        http.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        smtp.shutdown()
+        http.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+# soft_ioc.py
+#
+# In-process EPICS stand-in for the beamline monitors (02bm/07bm/32id_monitor.py).
+#
+# Serves every PV a monitor reads, so EpicsPVSource can be exercised on one Linux box
+# without real IOCs:
+# - CA scalars (PV_DISPLAY + IOC_GROUPS running/status PVs) via caproto
+# - PVA detector image(s) (PV_DISPLAY "... PVA Image" entries) as NTNDArray via pvapy
+# - Values are scripted by the monitor's own DummyPVSource, so they move exactly like --dummy
+#
+# Fault injection:
+# - --latency / --jitter : seconds added to every CA read (per-read uniform jitter)
+# - --dead PV ...        : PVs that are never served (search fails -> connect timeout)
+# - --flap PV:UP:DOWN    : PV is served for UP s, then unserved for DOWN s, repeating.
+#                          Only new searches fail while the PV is down; circuits that are
+#                          already connected keep their channel (caproto limitation).
+#
+# Load test:
+#   --load-test N runs N refresh rounds through the monitor's EpicsPVSource (and with
+#   --render, through the full render function) against the stand-in, then prints
+#   per-round timings and how many reads came back None / were skipped by the dead-PV
+#   cooldown.
+#
+# Usage:
+#   python soft_ioc.py ../02bm_monitor.py                          # serve until Ctrl-C
+#   python soft_ioc.py ../02bm_monitor.py --latency 0.2 --jitter 0.1
+#   python soft_ioc.py ../02bm_monitor.py --dead 2bmb:TomoStream:ServerRunning --load-test 50
+#   python soft_ioc.py ../07bm_monitor.py --flap PB:07BM:STA_A_FES_CLSD_PL.VAL:20:10 --load-test 100 --render
+#
+# Requirements:
+#   pip install caproto pyepics pvapy numpy matplotlib
+#
+# Notes:
+# - The CA server binds to 127.0.0.1 on --ca-port (default 5066) and PVA searches use
+#   --pva-port (default 5086); the client side is pointed at both through EPICS_CA_* /
+#   EPICS_PVA_* environment variables, so real IOCs on the default ports are never shadowed.
+# - Environment variables are set before pyepics is imported (EpicsPVSource imports it
+#   lazily), because libca reads them only once.
+
+import argparse
+import asyncio
+import importlib.util
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+
+# ----------------------------
+# Monitor loading
+# ----------------------------
+
+def load_monitor(path):
+    """Import a monitor script by path (names like 02bm_monitor.py are not importable)."""
+    path = os.path.abspath(path)
+    name = "_monitor_" + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    mod = importlib.util.module_from_spec(spec)
+    sys.path.insert(0, os.path.dirname(path))
+    spec.loader.exec_module(mod)
+    return mod
+
+
+def monitor_pvs(mod):
+    """
+    Split a monitor's PV config into (ca_pvs, pva_channels), both in first-seen order.
+    PV_DISPLAY keys containing "PVA" are image channels; everything else is CA.
+    """
+    ca, pva = [], []
+    for key, pvname in mod.PV_DISPLAY.items():
+        target = pva if "PVA" in key else ca
+        if pvname and pvname not in target:
+            target.append(pvname)
+    for grp in getattr(mod, "IOC_GROUPS", []):
+        for k in ("running_pv", "status_pv"):
+            pvname = grp.get(k)
+            if pvname and pvname not in ca:
+                ca.append(pvname)
+    return ca, pva
+
+
+def find_render(mod):
+    for name in sorted(dir(mod)):
+        if name.startswith("render_") and callable(getattr(mod, name)):
+            return getattr(mod, name)
+    raise RuntimeError(f"No render_* function in {mod.__file__}")
+
+
+# ----------------------------
+# CA server (caproto)
+# ----------------------------
+
+def _make_channel(value, latency, jitter):
+    from caproto import ChannelDouble, ChannelInteger, ChannelString
+
+    if isinstance(value, str):
+        base = ChannelString
+    elif isinstance(value, bool) or isinstance(value, int):
+        base = ChannelInteger
+    else:
+        base = ChannelDouble
+
+    init = value if value is not None else 0.0
+    if latency <= 0 and jitter <= 0:
+        return base(value=init)
+
+    class _SlowChannel(base):
+        async def read(self, data_type):
+            await asyncio.sleep(latency + random.uniform(0.0, jitter))
+            return await super().read(data_type)
+
+    return _SlowChannel(value=init)
+
+
+def _parse_flap(spec):
+    pvname, up, down = spec.rsplit(":", 2)
+    return pvname, float(up), float(down)
+
+
+class SoftIOC:
+    """
+    caproto CA server + pvapy PVA server running in a background thread.
+
+    Values are pulled from `dummy` (a monitor's DummyPVSource) every `update_period` s.
+    """
+
+    def __init__(self, dummy, ca_pvs, pva_channels, update_period=1.0,
+                 latency=0.0, jitter=0.0, dead=(), flap=()):
+        self._dummy = dummy
+        self._ca_pvs = list(ca_pvs)
+        self._pva_channels = list(pva_channels)
+        self._update_period = float(update_period)
+        self._dead = set(dead)
+        self._flap = {pvname: (up, down) for pvname, up, down in flap}
+
+        self._channels = {}     # pvname -> ChannelData (also the ones currently unserved)
+        self.pvdb = {}          # what caproto actually serves; mutated for flapping PVs
+        for pvname in self._ca_pvs:
+            ch = _make_channel(dummy.caget(pvname), latency, jitter)
+            self._channels[pvname] = ch
+            if pvname not in self._dead:
+                self.pvdb[pvname] = ch
+
+        self._pva_server = None
+        self._pva_uid = 0
+        self._loop = None
+        self._task = None
+        self._thread = None
+        self._ready = threading.Event()
+        self._t0 = time.monotonic()
+
+    # --- PVA ---
+
+    def _ntnda(self, img):
+        import pvaccess as pva
+
+        h, w = img.shape[:2]
+        self._pva_uid += 1
+        nt = pva.NtNdArray()
+        nt["uniqueId"] = self._pva_uid
+        nt["dimension"] = [
+            pva.PvDimension(w, 0, w, 1, False),
+            pva.PvDimension(h, 0, h, 1, False),
+        ]
+        nt["value"] = {"ushortValue": img.astype("uint16", copy=False).ravel()}
+        return nt
+
+    def _start_pva(self):
+        if not self._pva_channels:
+            return
+        import pvaccess as pva
+
+        self._pva_server = pva.PvaServer()
+        for chan in self._pva_channels:
+            img = self._dummy.pva_image(chan)
+            self._pva_server.addRecord(chan, self._ntnda(img))
+
+    def _update_pva(self):
+        if self._pva_server is None:
+            return
+        for chan in self._pva_channels:
+            img = self._dummy.pva_image(chan)
+            if img is not None:
+                self._pva_server.update(chan, self._ntnda(img))
+
+    # --- CA ---
+
+    def _apply_flap(self):
+        now = time.monotonic() - self._t0
+        for pvname, (up, down) in self._flap.items():
+            if pvname in self._dead:
+                continue
+            serving = (now % (up + down)) < up
+            if serving:
+                self.pvdb.setdefault(pvname, self._channels[pvname])
+            else:
+                self.pvdb.pop(pvname, None)
+
+    async def _updater(self):
+        while True:
+            self._dummy.next_refresh()
+            for pvname, ch in self._channels.items():
+                val = self._dummy.caget(pvname)
+                if val is None:
+                    continue
+                try:
+                    await ch.write(val)
+                except Exception:
+                    # scripted value of a different type than the channel; keep the old one
+                    pass
+            self._apply_flap()
+            try:
+                self._update_pva()
+            except Exception as e:
+                print(f"[soft_ioc] PVA update failed: {e}", flush=True)
+            await asyncio.sleep(self._update_period)
+
+    async def _main(self):
+        from caproto.asyncio.server import Context
+
+        ctx = Context(self.pvdb, interfaces=["127.0.0.1"])
+        self._task = asyncio.current_task()
+        self._ready.set()
+        await asyncio.gather(ctx.run(log_pv_names=False), self._updater())
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._loop.run_until_complete(self._main())
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._loop.close()
+
+    def start(self):
+        self._start_pva()
+        self._thread = threading.Thread(target=self._run, name="soft_ioc", daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout=5.0)
+        return self
+
+    def stop(self):
+        if self._loop is not None and self._task is not None:
+            self._loop.call_soon_threadsafe(self._task.cancel)
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        if self._pva_server is not None:
+            try:
+                self._pva_server.stop()
+            except Exception:
+                pass
+
+
+def configure_client_env(ca_port, pva_port):
+    """Point pyepics/pvapy clients (and the servers) at ports no real IOC uses."""
+    os.environ["EPICS_CA_SERVER_PORT"] = str(ca_port)
+    os.environ["EPICS_CAS_SERVER_PORT"] = str(ca_port)
+    os.environ["EPICS_CA_ADDR_LIST"] = "127.0.0.1"
+    os.environ["EPICS_CA_AUTO_ADDR_LIST"] = "NO"
+    os.environ["EPICS_CAS_INTF_ADDR_LIST"] = "127.0.0.1"
+    os.environ["EPICS_PVA_BROADCAST_PORT"] = str(pva_port)
+    os.environ["EPICS_PVAS_BROADCAST_PORT"] = str(pva_port)
+
+
+# ----------------------------
+# Load test
+# ----------------------------
+
+def run_load_test(mod, ca_pvs, pva_channels, rounds, render=False, period=0.0):
+    source = mod.EpicsPVSource()
+    render_fn = find_render(mod) if render else None
+    fig = None
+    if render_fn is not None:
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=(6.5, 11.0), dpi=120)
+
+    durations = []
+    n_none = 0
+    n_cooldown = 0
+    n_img_none = 0
+    for i in range(rounds):
+        t0 = time.monotonic()
+        source.next_refresh()
+        if render_fn is not None:
+            render_fn(fig, source, mod.PV_DISPLAY)
+        else:
+            for pvname in ca_pvs:
+                now = time.monotonic()
+                if now < source._dead_until.get(pvname, 0.0):
+                    n_cooldown += 1
+                if source.caget(pvname, timeout=0.3) is None:
+                    n_none += 1
+            for chan in pva_channels:
+                if source.pva_image(chan) is None:
+                    n_img_none += 1
+        durations.append(time.monotonic() - t0)
+        if period > 0:
+            time.sleep(period)
+
+    durations.sort()
+    p95 = durations[min(len(durations) - 1, int(0.95 * len(durations)))]
+    print()
+    print(f"Load test: {rounds} rounds, {len(ca_pvs)} CA PVs, {len(pva_channels)} PVA channels"
+          + (" (full render)" if render_fn is not None else ""))
+    print(f"  round time   min {durations[0]*1e3:8.1f} ms   median {statistics.median(durations)*1e3:8.1f} ms"
+          f"   p95 {p95*1e3:8.1f} ms   max {durations[-1]*1e3:8.1f} ms")
+    if render_fn is None:
+        print(f"  CA reads     None: {n_none}   skipped by cooldown: {n_cooldown}"
+              f"   of {rounds * len(ca_pvs)}")
+        print(f"  PVA images   None: {n_img_none} of {rounds * len(pva_channels)}")
+    print(flush=True)
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Serve a monitor's PVs from a local caproto/pvapy stand-in IOC.")
+    parser.add_argument("monitor", help="Path to a monitor script (e.g. ../02bm_monitor.py).")
+    parser.add_argument("--ca-port", type=int, default=5066,
+                        help="CA server port (client env is pointed at it).")
+    parser.add_argument("--pva-port", type=int, default=5086,
+                        help="PVA search (broadcast) port shared by the server and client.")
+    parser.add_argument("--update", type=float, default=1.0,
+                        help="Seconds between scripted value updates.")
+    parser.add_argument("--latency", type=float, default=0.0,
+                        help="Seconds added to every CA read.")
+    parser.add_argument("--jitter", type=float, default=0.0,
+                        help="Extra uniform random latency (0..jitter s) per CA read.")
+    parser.add_argument("--dead", nargs="*", default=[],
+                        help="PVs that are never served.")
+    parser.add_argument("--flap", nargs="*", default=[], metavar="PV:UP:DOWN",
+                        help="PVs served for UP s then unserved for DOWN s, repeating.")
+    parser.add_argument("--no-pva", action="store_true",
+                        help="Do not start the PVA image server.")
+    parser.add_argument("--load-test", type=int, default=0, metavar="N",
+                        help="Run N refresh rounds through EpicsPVSource, then exit.")
+    parser.add_argument("--render", action="store_true",
+                        help="With --load-test: time the full render function instead of raw reads.")
+    parser.add_argument("--load-period", type=float, default=0.0,
+                        help="With --load-test: seconds to sleep between rounds.")
+    args = parser.parse_args()
+
+    configure_client_env(args.ca_port, args.pva_port)
+
+    mod = load_monitor(args.monitor)
+    ca_pvs, pva_channels = monitor_pvs(mod)
+    if args.no_pva:
+        pva_channels = []
+
+    ioc = SoftIOC(
+        mod.DummyPVSource(), ca_pvs, pva_channels,
+        update_period=args.update,
+        latency=args.latency, jitter=args.jitter,
+        dead=args.dead, flap=[_parse_flap(s) for s in args.flap],
+    ).start()
+
+    print(f"[soft_ioc] serving {len(ca_pvs)} CA PVs on 127.0.0.1:{args.ca_port}"
+          f" and {len(pva_channels)} PVA channel(s) for {os.path.basename(args.monitor)}",
+          flush=True)
+
+    try:
+        if args.load_test > 0:
+            run_load_test(mod, ca_pvs, pva_channels, args.load_test,
+                          render=args.render, period=args.load_period)
+        else:
+            while True:
+                time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        ioc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,287 @@
+# tile_pyramid.py
+#
+# Deep-zoom (DZI) tile pyramid of the full-resolution detector frame, so a
+# zoomable client can load only the tiles it shows instead of a huge image.
+#
+# Layout (OpenSeadragon / Deep Zoom compatible):
+#   ROOT/<name>.dzi                       XML descriptor (size, tile size, format)
+#   ROOT/<name>_files/<level>/<col>_<row>.<fmt>
+# Level `max_level` is the full frame, each level below is half the size, level 0 is 1x1.
+#
+# Incremental updates: every level is kept in memory as 8-bit pixels. A new frame is
+# windowed to 8 bit, compared tile by tile with the stored top level, and only the
+# tiles that changed (mean |diff| > tolerance) are copied, downsampled into their
+# parents and rewritten. Tile files are replaced atomically (temp + rename).
+#
+# Usage:
+#   tiles = TileStore("/path/to/tiles")
+#   tiles.update("2bmSP1:Pva1:Image", frame)     # -> number of tile files written
+#
+#   python tile_pyramid.py --bench               # full build vs. incremental update, 32 MP
+
+import argparse
+import math
+import os
+import shutil
+import time
+
+import numpy as np
+
+DZI_TEMPLATE = (
+    '<?xml version="1.0" encoding="UTF-8"?>\n'
+    '<Image xmlns="http://schemas.microsoft.com/deepzoom/2008"\n'
+    '       TileSize="{tile}" Overlap="0" Format="{fmt}">\n'
+    '  <Size Width="{w}" Height="{h}"/>\n'
+    '</Image>\n'
+)
+
+
+def _downsample2(a):
+    """2x2 mean of an 8-bit array (odd edges replicate the last row/column)."""
+    h, w = a.shape
+    if h % 2 or w % 2:
+        a = np.pad(a, ((0, h % 2), (0, w % 2)), mode="edge")
+    s = a.reshape(a.shape[0] // 2, 2, a.shape[1] // 2, 2).sum(axis=(1, 3), dtype=np.uint16)
+    return ((s + 2) >> 2).astype(np.uint8)
+
+
+class DisplayWindow:
+    """
+    Frame -> uint8 mapping with a stable 1/99 percentile window: the window only
+    moves when the percentiles drift by more than `hysteresis` of its width, so
+    detector noise does not dirty every tile on every frame.
+    """
+
+    def __init__(self, hysteresis=0.05, sample_side=1024):
+        self.hysteresis = float(hysteresis)
+        self.sample_side = int(sample_side)
+        self.lo = self.hi = None
+        self._lut = None        # ((dtype, lo, hi), lut) for integer frames
+
+    def _update_window(self, arr):
+        step = max(1, int(math.ceil(max(arr.shape) / float(self.sample_side))))
+        lo, hi = np.percentile(arr[::step, ::step], (1, 99))
+        if not np.isfinite(lo) or not np.isfinite(hi) or hi <= lo:
+            lo, hi = float(np.min(arr)), float(np.max(arr))
+            if hi <= lo:
+                hi = lo + 1.0
+        if self.lo is None:
+            self.lo, self.hi = float(lo), float(hi)
+            return
+        width = self.hi - self.lo
+        if abs(lo - self.lo) > self.hysteresis * width or abs(hi - self.hi) > self.hysteresis * width:
+            self.lo, self.hi = float(lo), float(hi)
+
+    def to_uint8(self, frame):
+        arr = np.asarray(frame)
+        self._update_window(arr)
+        lo, hi = self.lo, self.hi
+        if arr.dtype in (np.uint8, np.uint16):
+            # one gather through a lookup table instead of float math on every pixel
+            key = (arr.dtype, lo, hi)
+            if self._lut is None or self._lut[0] != key:
+                levels = np.arange(np.iinfo(arr.dtype).max + 1, dtype=np.float32)
+                lut = np.clip((levels - lo) * (255.0 / (hi - lo)), 0, 255).astype(np.uint8)
+                self._lut = (key, lut)
+            return self._lut[1][arr]
+        out = (arr.astype(np.float32) - lo) * (255.0 / (hi - lo))
+        return np.clip(out, 0, 255, out=out).astype(np.uint8)
+
+
+class TilePyramid:
+    """DZI pyramid of one image channel."""
+
+    def __init__(self, root, name, tile_size=256, fmt="png", tolerance=1.0):
+        self.root = root
+        self.name = name
+        self.tile = int(tile_size)
+        self.fmt = fmt
+        self.tolerance = float(tolerance)
+        self.window = DisplayWindow()
+        self.shape = None
+        self.levels = []        # level -> uint8 array, padded to whole tiles
+        self.sizes = []         # level -> (h, w) valid pixels
+
+    @property
+    def files_dir(self):
+        return os.path.join(self.root, f"{self.name}_files")
+
+    def _reset(self, h, w):
+        self.shape = (h, w)
+        self.max_level = int(math.ceil(math.log2(max(h, w)))) if max(h, w) > 1 else 0
+        self.sizes, self.levels = [], []
+        for level in range(self.max_level + 1):
+            f = 2 ** (self.max_level - level)
+            lh, lw = int(math.ceil(h / f)), int(math.ceil(w / f))
+            self.sizes.append((lh, lw))
+            th, tw = -(-lh // self.tile), -(-lw // self.tile)
+            self.levels.append(np.zeros((th * self.tile, tw * self.tile), dtype=np.uint8))
+        # tiles of the previous shape (other levels, rows, columns) must not mix with
+        # the new ones: every tile is rewritten after a reset anyway
+        shutil.rmtree(self.files_dir, ignore_errors=True)
+        os.makedirs(self.files_dir, exist_ok=True)
+        self._write_atomic(
+            os.path.join(self.root, f"{self.name}.dzi"),
+            DZI_TEMPLATE.format(tile=self.tile, fmt=self.fmt, w=w, h=h).encode(),
+        )
+
+    def _dirty_top(self, img8):
+        """Boolean (tiles_y, tiles_x) of top-level tiles whose content changed."""
+        top = self.levels[-1]
+        t = self.tile
+        h, w = img8.shape
+        th, tw = top.shape[0] // t, top.shape[1] // t
+        new = np.zeros_like(top)
+        new[:h, :w] = img8
+        if self.tolerance <= 0:
+            changed = (new != top).reshape(th, t, tw, t).any(axis=(1, 3))
+        else:
+            diff = np.maximum(new, top)
+            diff -= np.minimum(new, top)            # |new - top| without leaving uint8
+            sums = diff.reshape(th, t, tw * t).sum(axis=1, dtype=np.uint32)
+            sums = sums.reshape(th, tw, t).sum(axis=2)
+            changed = sums > self.tolerance * t * t
+        return changed, new
+
+    def update(self, frame):
+        """Refresh the pyramid from a full frame; returns the number of tiles written."""
+        if frame is None:
+            return 0
+        arr = np.asarray(frame)
+        if arr.ndim != 2 or arr.size == 0:
+            return 0
+        first = self.shape != arr.shape
+        if first:
+            self._reset(*arr.shape)
+
+        img8 = self.window.to_uint8(arr)
+        dirty, new = self._dirty_top(img8)
+        if first:
+            dirty[:] = True
+        if not dirty.any():
+            return 0
+
+        t = self.tile
+        written = 0
+        level = self.max_level
+        top = self.levels[level]
+        for ty, tx in zip(*np.nonzero(dirty)):
+            sl = np.s_[ty * t:(ty + 1) * t, tx * t:(tx + 1) * t]
+            top[sl] = new[sl]
+            written += self._write_tile(level, tx, ty)
+
+        # propagate: a parent tile is dirty if any of its 2x2 children is
+        while level > 0:
+            child_dirty = dirty
+            ph, pw = self.levels[level - 1].shape[0] // t, self.levels[level - 1].shape[1] // t
+            dirty = np.zeros((ph, pw), dtype=bool)
+            ys, xs = np.nonzero(child_dirty)
+            dirty[ys // 2, xs // 2] = True
+
+            src, (sh, sw) = self.levels[level], self.sizes[level]
+            dst = self.levels[level - 1]
+            for ty, tx in zip(*np.nonzero(dirty)):
+                y0, x0 = 2 * ty * t, 2 * tx * t
+                block = src[y0:min(y0 + 2 * t, sh), x0:min(x0 + 2 * t, sw)]
+                small = _downsample2(block)
+                dst[ty * t:ty * t + small.shape[0], tx * t:tx * t + small.shape[1]] = small
+                written += self._write_tile(level - 1, tx, ty)
+            level -= 1
+        return written
+
+    def _write_tile(self, level, tx, ty):
+        from PIL import Image
+
+        t = self.tile
+        lh, lw = self.sizes[level]
+        y0, x0 = ty * t, tx * t
+        if y0 >= lh or x0 >= lw:
+            return 0
+        tile = self.levels[level][y0:min(y0 + t, lh), x0:min(x0 + t, lw)]
+        d = os.path.join(self.files_dir, str(level))
+        os.makedirs(d, exist_ok=True)
+        path = os.path.join(d, f"{tx}_{ty}.{self.fmt}")
+        tmp = f"{path}.tmp"
+        Image.fromarray(tile).save(tmp, format="JPEG" if self.fmt in ("jpg", "jpeg") else "PNG")
+        os.replace(tmp, path)
+        return 1
+
+    @staticmethod
+    def _write_atomic(path, data):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+
+class TileStore:
+    """One TilePyramid per image channel under a common root directory."""
+
+    def __init__(self, root, tile_size=256, fmt="png", tolerance=1.0):
+        self.root = root
+        self.tile_size = tile_size
+        self.fmt = fmt
+        self.tolerance = tolerance
+        self._pyramids = {}
+        os.makedirs(root, exist_ok=True)
+
+    def update(self, channel, frame):
+        pyr = self._pyramids.get(channel)
+        if pyr is None:
+            name = channel.replace(":", "_")
+            pyr = TilePyramid(self.root, name, self.tile_size, self.fmt, self.tolerance)
+            self._pyramids[channel] = pyr
+        return pyr.update(frame)
+
+
+# ----------------------------
+# Benchmark
+# ----------------------------
+
+def _bench(root, shape, fmt):
+    rng = np.random.default_rng(0)
+    h, w = shape
+    y = np.linspace(-1, 1, h, dtype=np.float32)[:, None]
+    x = np.linspace(-1, 1, w, dtype=np.float32)[None, :]
+    frame = (40000.0 * np.exp(-(x * x + y * y) / 0.1) + 1000.0).astype(np.uint16)
+
+    pyr = TilePyramid(root, "bench", fmt=fmt)
+    t0 = time.perf_counter()
+    n = pyr.update(frame)
+    t_full = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    n_same = pyr.update(frame)
+    t_same = time.perf_counter() - t0
+
+    frame2 = frame.copy()
+    cy, cx = h // 3, w // 3
+    frame2[cy:cy + 300, cx:cx + 300] = rng.integers(20000, 40000, size=(300, 300), dtype=np.uint16)
+    t0 = time.perf_counter()
+    n_part = pyr.update(frame2)
+    t_part = time.perf_counter() - t0
+
+    print(f"frame {h}x{w} ({h * w / 1e6:.1f} MP), {pyr.max_level + 1} levels, tiles {pyr.tile} px {fmt}")
+    print(f"  full build         {n:6d} tiles  {1e3 * t_full:9.1f} ms")
+    print(f"  unchanged frame    {n_same:6d} tiles  {1e3 * t_same:9.1f} ms")
+    print(f"  300x300 px change  {n_part:6d} tiles  {1e3 * t_part:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Deep-zoom tile pyramid of detector frames.")
+    parser.add_argument("--bench", action="store_true",
+                        help="Time a full build and incremental updates on a synthetic frame.")
+    parser.add_argument("--root", default="/tmp/tile_pyramid_bench",
+                        help="Output directory for --bench.")
+    parser.add_argument("--shape", type=int, nargs=2, default=(4852, 6464), metavar=("H", "W"))
+    parser.add_argument("--format", default="png", choices=("png", "jpg"))
+    args = parser.parse_args()
+
+    if args.bench:
+        _bench(args.root, tuple(args.shape), args.format)
+    else:
+        parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+# timelapse.py
+#
+# Rolling time-lapse of the rendered dashboard frames (last N hours).
+#
+# Frames are grouped into fixed-length segments (default 10 min of wall-clock time).
+# Every segment is encoded exactly once, so nothing already written is ever
+# re-encoded, and segments older than the window are deleted:
+#   - webp: the segment's frames are kept as small WebP stills on disk and turned
+#           into one animated WebP when the segment closes
+#   - mp4:  frames are piped to a local ffmpeg process as they arrive (H.264,
+#           fragmented MP4, playable while it is being written)
+#
+# OUT_DIR/timelapse.json lists the closed segments (file, start, end, frames) for
+# clients; for mp4, OUT_DIR/segments.txt is an ffmpeg concat list, so the whole
+# window can be joined without re-encoding:
+#   ffmpeg -f concat -safe 0 -i OUT_DIR/segments.txt -c copy last_hours.mp4
+#
+# Usage (inside a monitor):
+#   timelapse = TimeLapse("/path/to/timelapse", fmt="webp", hours=12)
+#   timelapse.close_on_exit()       # finish the open segment on exit / SIGTERM
+#   ...render...
+#   timelapse.add_figure(fig)
+#
+# A writer that fails (ffmpeg died) is restarted with a new segment; after
+# MAX_FAILURES failures in a row the time-lapse is disabled and the monitor goes on.
+
+import atexit
+import json
+import os
+import shutil
+import signal
+import subprocess
+import time
+
+import numpy as np
+
+MAX_FAILURES = 3
+
+
+class _WebPSegment:
+    def __init__(self, path, fps, quality):
+        self.path = path
+        self.fps = fps
+        self.quality = quality
+        self.frames = 0
+        self._stills = f"{path}.frames"
+        os.makedirs(self._stills, exist_ok=True)
+
+    def add(self, img):
+        # temp + rename: a stop in the middle of a save leaves no truncated still behind
+        path = os.path.join(self._stills, f"{self.frames:05d}.webp")
+        img.save(f"{path}.tmp", format="WEBP", quality=self.quality)
+        os.replace(f"{path}.tmp", path)
+        self.frames += 1
+
+    def finish(self):
+        from PIL import Image
+
+        names = sorted(n for n in os.listdir(self._stills) if n.endswith(".webp"))
+        if names:
+            frames = [Image.open(os.path.join(self._stills, n)) for n in names]
+            tmp = f"{self.path}.tmp"
+            frames[0].save(tmp, format="WEBP", save_all=True, append_images=frames[1:],
+                           duration=int(round(1000.0 / self.fps)), loop=0,
+                           quality=self.quality)
+            for f in frames:
+                f.close()
+            os.replace(tmp, self.path)
+        shutil.rmtree(self._stills, ignore_errors=True)
+
+
+class _FFmpegSegment:
+    def __init__(self, path, fps, size, ffmpeg, crf):
+        self.path = path
+        self.frames = 0
+        w, h = size
+        cmd = [
+            ffmpeg, "-y", "-loglevel", "error",
+            "-f", "rawvideo", "-pix_fmt", "rgb24", "-s", f"{w}x{h}", "-r", str(fps), "-i", "-",
+            "-an", "-c:v", "libx264", "-preset", "veryfast", "-crf", str(crf),
+            "-pix_fmt", "yuv420p", "-movflags", "+frag_keyframe+empty_moov",
+            path,
+        ]
+        self._proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+        self.failed = None      # why ffmpeg stopped taking frames
+
+    def add(self, img):
+        try:
+            self._proc.stdin.write(img.tobytes())
+        except OSError as e:    # BrokenPipeError: ffmpeg died
+            self.failed = f"ffmpeg stopped (exit status {self._proc.poll()}): {e}"
+            return
+        self.frames += 1
+
+    def finish(self):
+        try:
+            self._proc.stdin.close()
+        except OSError:
+            pass
+        finally:
+            self._proc.wait()
+
+
+class TimeLapse:
+    """Append-only, rolling-window time-lapse writer."""
+
+    def __init__(self, out_dir, fmt="webp", hours=12.0, segment_minutes=10.0,
+                 fps=10, width=480, quality=70, ffmpeg="ffmpeg"):
+        if fmt not in ("webp", "mp4"):
+            raise ValueError(f"unknown time-lapse format: {fmt}")
+        if fmt == "mp4":
+            ffmpeg = shutil.which(ffmpeg)
+            if ffmpeg is None:
+                raise RuntimeError("time-lapse: ffmpeg not found (needed for mp4 output)")
+
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.window = float(hours) * 3600.0
+        self.segment_len = float(segment_minutes) * 60.0
+        self.fps = int(fps)
+        self.width = int(width)
+        self.quality = int(quality)
+        self.ffmpeg = ffmpeg
+
+        os.makedirs(out_dir, exist_ok=True)
+        self._index_path = os.path.join(out_dir, "timelapse.json")
+        self.segments = self._load_index()
+        self._seq = max((s["seq"] for s in self.segments), default=-1) + 1
+        self._cur = None        # open segment encoder
+        self._cur_info = None
+        self._size = None
+        self.failures = 0       # writer failures in a row
+        self.disabled = False
+
+        # leftovers of a segment that was open when the process stopped
+        indexed = {s["file"] for s in self.segments}
+        for name in os.listdir(out_dir):
+            if name.startswith("seg_") and name not in indexed:
+                p = os.path.join(out_dir, name)
+                if os.path.isdir(p):
+                    shutil.rmtree(p, ignore_errors=True)
+                else:
+                    os.remove(p)
+
+    # ---- Index ----
+
+    def _load_index(self):
+        try:
+            with open(self._index_path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return []
+        segs = [s for s in data.get("segments", [])
+                if os.path.exists(os.path.join(self.out_dir, s["file"]))]
+        return segs
+
+    def _write_index(self):
+        data = {"format": self.fmt, "fps": self.fps, "window_hours": self.window / 3600.0,
+                "segments": self.segments}
+        tmp = f"{self._index_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, self._index_path)
+
+        if self.fmt == "mp4":
+            lst = os.path.join(self.out_dir, "segments.txt")
+            with open(f"{lst}.tmp", "w") as f:
+                for s in self.segments:
+                    f.write(f"file '{s['file']}'\n")
+            os.replace(f"{lst}.tmp", lst)
+
+    # ---- Frames ----
+
+    def add_figure(self, fig, t=None):
+        """Append the current (already drawn) Agg canvas of `fig`."""
+        rgba = np.asarray(fig.canvas.buffer_rgba())
+        self.add_frame(rgba[..., :3], t)
+
+    def add_frame(self, rgb, t=None):
+        from PIL import Image
+
+        if self.disabled:
+            return
+        t = time.time() if t is None else t
+        img = Image.fromarray(np.ascontiguousarray(rgb))
+        h = int(round(img.height * self.width / float(img.width)))
+        size = (self.width - self.width % 2, h - h % 2)     # even sizes for yuv420p
+        img = img.resize(size, Image.BILINEAR)
+
+        if self._cur is not None and (t >= self._cur_info["start"] + self.segment_len
+                                      or size != self._size):
+            self._close_segment()
+        if self._cur is None:
+            self._open_segment(t, size)
+
+        self._cur.add(img)
+        if getattr(self._cur, "failed", None):
+            self._writer_failed(self._cur.failed)
+            return
+        self._cur_info["end"] = t
+        self._prune(t)
+
+    def _writer_failed(self, reason):
+        # keep what was written (fragmented MP4), start a new segment with the next frame
+        self._close_segment()
+        self.failures += 1
+        if self.failures >= MAX_FAILURES:
+            self.disabled = True
+            print(f"time-lapse: {reason}; disabled after {self.failures} failures", flush=True)
+        else:
+            print(f"time-lapse: {reason}; restarting with a new segment", flush=True)
+
+    def _open_segment(self, t, size):
+        ext = "webp" if self.fmt == "webp" else "mp4"
+        name = f"seg_{self._seq:06d}.{ext}"
+        path = os.path.join(self.out_dir, name)
+        if self.fmt == "webp":
+            self._cur = _WebPSegment(path, self.fps, self.quality)
+        else:
+            self._cur = _FFmpegSegment(path, self.fps, size, self.ffmpeg, crf=28)
+        self._cur_info = {"seq": self._seq, "file": name, "start": t, "end": t, "frames": 0}
+        self._size = size
+        self._seq += 1
+
+    def _close_segment(self):
+        cur, info = self._cur, self._cur_info
+        self._cur = self._cur_info = None
+        cur.finish()
+        info["frames"] = cur.frames
+        if cur.frames and os.path.exists(cur.path):
+            self.segments.append(info)
+            if not getattr(cur, "failed", None):
+                self.failures = 0
+        self._write_index()
+
+    def _prune(self, now):
+        cutoff = now - self.window
+        old = [s for s in self.segments if s["end"] < cutoff]
+        if not old:
+            return
+        for s in old:
+            try:
+                os.remove(os.path.join(self.out_dir, s["file"]))
+            except OSError:
+                pass
+        self.segments = [s for s in self.segments if s["end"] >= cutoff]
+        self._write_index()
+
+    def close(self):
+        """Finish the open segment (call on shutdown)."""
+        if self._cur is not None:
+            self._close_segment()
+
+    def close_on_exit(self):
+        """
+        close() at interpreter exit, including SIGTERM (turned into SystemExit, so the
+        main loop unwinds); without it a stop or restart loses the open segment.
+        """
+        atexit.register(self.close)
+        if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+
+def _exit_on_sigterm(signum, frame):
+    raise SystemExit(128 + signum)
@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+# wall_compositor.py
+#
+# Control-room wall image: the beamline dashboards and the APS history plot tiled into
+# one PNG, instead of cycling through 02bm/07bm/32id_monitor.png and smallHistory.png.
+#
+# The wall is a persistent RGB canvas (NumPy array). Each source has a fixed cell:
+# - file sources are polled with os.stat; only a source whose (mtime, size) changed is
+#   decoded, resized to its cell and blitted into the canvas
+# - frames can also be handed over in-process (put(name, rgb) / add_figure(name, fig))
+# - a cell whose source is older than --stale seconds gets a red frame (redrawn only
+#   when that flips)
+# The wall file is rewritten (temp + rename) only when at least one cell changed.
+#
+# Usage:
+#   python wall_compositor.py                                  # default tomolog outputs, 2x2
+#   python wall_compositor.py --out /tmp/wall.png --cols 4 a.png b.png c.png d.png
+#   python wall_compositor.py --once                           # compose once and exit
+#
+# Requirements:
+#   pip install numpy pillow
+#
+# Notes:
+# - The monitors write their PNGs in place; a half-written file fails to decode and is
+#   simply retried on the next poll.
+
+import argparse
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+TOMOLOG = "/net/joulefs/coulomb_Public/docroot/tomolog"
+DEFAULT_SOURCES = [
+    os.path.join(TOMOLOG, "02bm_monitor.png"),
+    os.path.join(TOMOLOG, "07bm_monitor.png"),
+    os.path.join(TOMOLOG, "32id_monitor.png"),
+    os.path.join(TOMOLOG, "smallHistory.png"),
+]
+
+BACKGROUND = (30, 30, 30)
+CAPTION_BG = (20, 20, 20)
+CAPTION_FG = (207, 207, 207)
+STALE = (220, 40, 40)
+
+
+class _Cell:
+    def __init__(self, name, path, x, y, w, h):
+        self.name = name
+        self.path = path
+        self.x, self.y, self.w, self.h = x, y, w, h
+        self.stat = None        # (mtime_ns, size) of the file last blitted
+        self.updated = None     # wall-clock time of the frame shown
+        self.stale = False
+
+
+class WallCompositor:
+    """Persistent canvas with one cell per source; only changed cells are redrawn."""
+
+    def __init__(self, sources, cols=2, cell_size=(800, 1000), gap=8, caption=22,
+                 stale_after=600.0):
+        """
+        sources: list of file paths, or (name, path) pairs (path None: in-process only).
+        """
+        self.cols = int(cols)
+        self.cell_w, self.cell_h = cell_size
+        self.gap = int(gap)
+        self.caption = int(caption)
+        self.stale_after = float(stale_after)
+
+        self.cells = {}
+        items = [(os.path.basename(s), s) if isinstance(s, str) else tuple(s) for s in sources]
+        rows = -(-len(items) // self.cols)
+        W = self.cols * self.cell_w + (self.cols + 1) * self.gap
+        H = rows * (self.cell_h + self.caption) + (rows + 1) * self.gap
+        self.canvas = np.empty((H, W, 3), dtype=np.uint8)
+        self.canvas[:] = BACKGROUND
+        for i, (name, path) in enumerate(items):
+            r, c = divmod(i, self.cols)
+            x = self.gap + c * (self.cell_w + self.gap)
+            y = self.gap + r * (self.cell_h + self.caption + self.gap)
+            cell = self.cells[name] = _Cell(name, path, x, y, self.cell_w, self.cell_h)
+            self._draw_caption(cell)
+        self.dirty = True
+
+    # ---- Inputs ----
+
+    def poll(self):
+        """Blit the file sources that changed on disk; returns the names redrawn."""
+        changed = []
+        for cell in self.cells.values():
+            if cell.path is None:
+                continue
+            try:
+                st = os.stat(cell.path)
+            except OSError:
+                continue
+            key = (st.st_mtime_ns, st.st_size)
+            if key == cell.stat:
+                continue
+            try:
+                with Image.open(cell.path) as im:
+                    im.draft("RGB", (cell.w, cell.h))      # JPEG: decode at reduced size
+                    rgb = self._fit(im, cell)
+            except (OSError, ValueError, SyntaxError):
+                continue        # being written; next poll
+            cell.stat = key
+            self._blit(cell, rgb, st.st_mtime)
+            changed.append(cell.name)
+        self._check_stale()
+        return changed
+
+    def put(self, name, rgb, t=None):
+        """Hand a frame (H, W, 3 uint8) to cell `name` directly (in-process sources)."""
+        cell = self.cells[name]
+        im = Image.fromarray(np.ascontiguousarray(np.asarray(rgb)[..., :3]))
+        self._blit(cell, self._fit(im, cell), time.time() if t is None else t)
+
+    def add_figure(self, name, fig):
+        """put() the current (already drawn) Agg canvas of a Matplotlib figure."""
+        self.put(name, np.asarray(fig.canvas.buffer_rgba()))
+
+    # ---- Drawing ----
+
+    def _fit(self, im, cell):
+        """Resize keeping the aspect ratio so the image fits the cell; uint8 RGB array."""
+        if im.mode != "RGB":
+            im = im.convert("RGB")
+        s = min(cell.w / im.width, cell.h / im.height)
+        size = (max(1, round(im.width * s)), max(1, round(im.height * s)))
+        if size != im.size:
+            im = im.resize(size, Image.BILINEAR, reducing_gap=2.0)
+        return np.asarray(im)
+
+    def _blit(self, cell, rgb, t):
+        h, w = rgb.shape[:2]
+        block = self.canvas[cell.y:cell.y + cell.h, cell.x:cell.x + cell.w]
+        block[:] = BACKGROUND
+        oy, ox = (cell.h - h) // 2, (cell.w - w) // 2
+        block[oy:oy + h, ox:ox + w] = rgb
+        cell.updated = t
+        cell.stale = False
+        self._draw_caption(cell)
+        self.dirty = True
+
+    def _draw_caption(self, cell):
+        y0 = cell.y + cell.h
+        strip = Image.new("RGB", (cell.w, self.caption), STALE if cell.stale else CAPTION_BG)
+        when = "-" if cell.updated is None else datetime.fromtimestamp(cell.updated).strftime(
+            "%Y-%m-%d %H:%M:%S")
+        ImageDraw.Draw(strip).text((6, max(0, self.caption // 2 - 6)), f"{cell.name}   {when}",
+                                   fill=CAPTION_FG)
+        self.canvas[y0:y0 + self.caption, cell.x:cell.x + cell.w] = np.asarray(strip)
+
+    def _check_stale(self, now=None):
+        now = time.time() if now is None else now
+        for cell in self.cells.values():
+            stale = cell.updated is None or now - cell.updated > self.stale_after
+            if stale != cell.stale:
+                cell.stale = stale
+                self._draw_caption(cell)
+                self.dirty = True
+
+    # ---- Output ----
+
+    def write(self, out_path, force=False):
+        """Write the wall if anything changed since the last write; True if written."""
+        if not (self.dirty or force):
+            return False
+        tmp = f"{out_path}.tmp"
+        fmt = "JPEG" if out_path.lower().endswith((".jpg", ".jpeg")) else "PNG"
+        opts = {"quality": 85} if fmt == "JPEG" else {"compress_level": 3}
+        Image.fromarray(self.canvas).save(tmp, format=fmt, **opts)
+        os.replace(tmp, out_path)
+        self.dirty = False
+        return True
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Tile the monitor PNGs into one wall image.")
+    parser.add_argument("sources", nargs="*", default=DEFAULT_SOURCES,
+                        help="Source images (default: the 02bm/07bm/32id monitors and smallHistory.png).")
+    parser.add_argument("--out", default=os.path.join(TOMOLOG, "wall.png"),
+                        help="Output image (.png or .jpg).")
+    parser.add_argument("--cols", type=int, default=2, help="Cells per row.")
+    parser.add_argument("--cell", type=int, nargs=2, default=(800, 1000), metavar=("W", "H"),
+                        help="Cell size in pixels.")
+    parser.add_argument("--period", type=float, default=2.0,
+                        help="Seconds between checks of the sources.")
+    parser.add_argument("--stale", type=float, default=600.0,
+                        help="Mark a source older than this many seconds with a red caption.")
+    parser.add_argument("--once", action="store_true", help="Compose once and exit.")
+    args = parser.parse_args()
+
+    wall = WallCompositor(args.sources, cols=args.cols, cell_size=tuple(args.cell),
+                          stale_after=args.stale)
+    while True:
+        t0 = time.perf_counter()
+        changed = wall.poll()
+        try:
+            if wall.write(args.out) and changed:
+                print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] redrew {', '.join(changed)} "
+                      f"({1e3 * (time.perf_counter() - t0):.0f} ms)", flush=True)
+        except OSError as e:
+            print(f"[{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] ERROR: {e}", flush=True)
+        if args.once:
+            break
+        time.sleep(args.period)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# web_mirror.py
+#
+# Local mirror of the APS status images the app downloads, so the phones read a fast
+# cache instead of the origin servers.
+#
+# Each entry is (source, output file, period):
+#   - source is an image URL, or an HTML page (page=True, or a .html/.htm URL) whose
+#     first <img> is mirrored (as aps_monitor.py does for smallHistory.html); the page
+#     is re-checked every `page_recheck` seconds
+#   - every fetch is a conditional GET (If-None-Match / If-Modified-Since); a 304 costs
+#     no transfer and no write
+#   - a 200 whose body hashes to what is already in the cache is not written either
+#   - files are written to the cache directory as-is (temp file + rename)
+#   (the fetching and writing code is image_fetch.py, shared with aps_monitor.py)
+# All entries are fetched concurrently on a thread pool, each on its own period, over the
+# pooled keep-alive connections of http_client. Each entry runs at a fixed rate with
+# jitter, and a failing source is backed off from (circuit breaker, HEAD probe before
+# the next full download); see scheduling.py.
+#
+# Usage:
+#   python web_mirror.py --cache-dir /net/joulefs/coulomb_Public/docroot/tomolog/mirror
+#   python web_mirror.py --cache-dir /tmp/mirror --serve 8000      # also serve the cache
+#   python web_mirror.py --config mirrors.json --once
+#   python web_mirror.py --cache-dir /tmp/mirror --archive /tmp/archive   # keep history (image_archive.py)
+#
+# Status: --status PATH (status_file.py), with one entry per source under "sources";
+# never served, keep it outside the cache directory.
+#
+# mirrors.json:
+#   [{"source": "https://.../smallHistory.html", "out": "smallHistory.png", "period": 60},
+#    {"source": "https://.../WeekHistory.png", "period": 600}]
+#   ("out" defaults to the basename of the source URL, "period" to --period)
+#
+# Requirements:
+#   pip install requests
+#
+# Notes:
+# - --serve uses the standard library http.server: it answers If-Modified-Since with
+#   304 and adds a Cache-Control max-age; put a real web server in front for production.
+#   It listens on 127.0.0.1 unless --bind is given and serves only the mirrored files:
+#   no directory listings, temp files or anything else in the cache directory (e.g. an
+#   --archive placed inside it).
+
+import argparse
+import functools
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+import http_client
+from image_fetch import (download_image_bytes, fetch_first_image_url, forget, image_gone,
+                         invalidate_image_url, new_counters, write_if_changed)
+from image_fetch import probe as probe_url
+from scheduling import CircuitBreaker, FixedRateTimer
+from status_file import StatusFile
+
+APS = "https://www3.aps.anl.gov"
+# the images listed in SDDSAllView.swift (smallHistory.png is written by aps_monitor.py)
+DEFAULT_MIRRORS = [
+    {"source": f"{APS}/aod/blops/plots/smallStatusPlot.png", "period": 60},
+    {"source": f"{APS}/asd/operations/gifplots/HDSRcomfort.png", "period": 60},
+    {"source": f"{APS}/aod/blops/plots/WeekHistory.png", "period": 600},
+]
+
+
+def _stamp():
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class MirrorJob:
+    """One mirrored source: its resolved image URL, schedule and last result."""
+
+    def __init__(self, source, out, period=60.0, page=None, page_recheck=3600.0,
+                 jitter=0.05, breaker=None):
+        self.source = source
+        self.out = out
+        self.period = float(period)
+        self.page = source.lower().endswith((".html", ".htm")) if page is None else bool(page)
+        self.page_recheck = float(page_recheck)
+        self.timer = FixedRateTimer(self.period, jitter=jitter)
+        self.breaker = CircuitBreaker(**(breaker or {}))
+
+        self.image_url = None if self.page else source
+        self.due = 0.0              # monotonic time of the next fetch
+        self.running = False
+        # last result, for logs and status
+        self.status = None
+        self.error = None
+        self.finished = None        # wall-clock time of the last fetch
+        self.updated = None         # wall-clock time `out` was last written
+        self.transfer = new_counters()      # of the last fetch
+
+    def _resolve(self):
+        """Image URL of a page source (first <img>), re-checked every page_recheck s."""
+        self.image_url = fetch_first_image_url(self.source, recheck=self.page_recheck,
+                                               counters=self.transfer)
+        return self.image_url
+
+    def fetch(self, cache_dir, archive=None, probe=False):
+        """Fetch the source into cache_dir (and `archive`); returns the status string."""
+        self.transfer = new_counters()
+        path = os.path.join(cache_dir, self.out)
+        try:
+            if probe:
+                url = self.image_url or self.source
+                if not probe_url(url, counters=self.transfer):
+                    raise RuntimeError(f"probe failed: HEAD {url}")
+            url = self._resolve() if self.page else self.image_url
+            if not os.path.exists(path):
+                forget(url)                         # cache file gone: fetch it again
+            try:
+                data = download_image_bytes(url, counters=self.transfer)
+            except Exception as e:
+                if not (self.page and image_gone(e)):
+                    raise
+                invalidate_image_url(self.source)   # the page may point elsewhere now
+                data = download_image_bytes(self._resolve(), counters=self.transfer)
+            if data is None:
+                self.status = "not modified"
+            else:
+                written = write_if_changed(path, data)
+                if written:
+                    self.updated = time.time()
+                self.status = "updated" if written else "unchanged"
+                if archive is not None and archive.add(self.out, data):
+                    self.status += ", archived"
+            self.error = None
+        except Exception as e:
+            self.status = "error"
+            self.error = str(e)
+        self.finished = time.time()
+        return self.status
+
+    def summary(self):
+        return {"source": self.source, "image_url": self.image_url, "period": self.period,
+                "result": self.status, "error": self.error, "fetched": self.finished,
+                "updated": self.updated, "bytes": self.transfer["bytes"],
+                "circuit": self.breaker.state}
+
+
+def load_mirrors(path=None, period=60.0, page_recheck=3600.0, jitter=0.05, breaker=None):
+    """
+    MirrorJobs from a JSON list (see the header), or the defaults. `breaker`: keyword
+    arguments of each job's CircuitBreaker (threshold, backoff, max_backoff).
+    """
+    entries = DEFAULT_MIRRORS
+    if path:
+        with open(path) as f:
+            entries = json.load(f)
+    jobs = []
+    outs = set()
+    for e in entries:
+        source = e["source"]
+        out = e.get("out") or os.path.basename(urlsplit(source).path)
+        if not out or out in outs:
+            raise ValueError(f"missing or duplicate output file for {source}")
+        outs.add(out)
+        jobs.append(MirrorJob(source, out, period=e.get("period", period), page=e.get("page"),
+                              page_recheck=e.get("page_recheck", page_recheck),
+                              jitter=jitter, breaker=breaker))
+    return jobs
+
+
+# ----------------------------
+# Mirror
+# ----------------------------
+
+class Mirror:
+    """Runs each job on its own period on a thread pool; a job never overlaps itself."""
+
+    def __init__(self, jobs, cache_dir, workers=4, archive=None, status=None):
+        self.jobs = list(jobs)
+        self.cache_dir = cache_dir
+        self.archive = archive
+        self.status = status
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="mirror")
+        self._lock = threading.Lock()
+        os.makedirs(cache_dir, exist_ok=True)
+        http_client.configure(pool_maxsize=max(4, workers))
+
+    def _run(self, job):
+        t0 = time.perf_counter()
+        job.breaker.ready()         # open and due again: half-open
+        status = job.fetch(self.cache_dir, self.archive, probe=job.breaker.state == "half-open")
+        ms = 1e3 * (time.perf_counter() - t0)
+        msg = f"[{_stamp()}] {job.out}: {status}, {job.transfer['requests']} requests, " \
+              f"{job.transfer['bytes'] / 1024:.1f} kB, {ms:.0f} ms"
+        if job.error:
+            msg += f" ({job.error})"
+            if job.breaker.failure():
+                msg += f"; {job.breaker.failures} failures, backing off " \
+                       f"{job.breaker.retry_in():.0f} s"
+        else:
+            job.breaker.success()
+        print(msg, flush=True)
+        if self.status is not None:
+            sources = {j.out: j.summary() for j in self.jobs}
+            if job.error is None:
+                self.status.success(ms / 1e3, bytes=job.transfer["bytes"], sources=sources)
+            else:
+                self.status.failure(f"{job.out}: {job.error}", ms / 1e3, sources=sources)
+        with self._lock:
+            # fixed rate (the fetch time is not added), or later while backing off
+            job.due = max(job.timer.schedule(), time.monotonic() + job.breaker.retry_in())
+            job.running = False
+
+    def run_once(self):
+        """Fetch every job concurrently and wait for all of them."""
+        for job in self.jobs:
+            job.running = True
+        list(self.pool.map(self._run, self.jobs))
+
+    def run_forever(self):
+        while True:
+            now = time.monotonic()
+            with self._lock:
+                for job in self.jobs:
+                    if not job.running and job.due <= now:
+                        job.running = True
+                        self.pool.submit(self._run, job)
+                idle = [j.due for j in self.jobs if not j.running]
+            wait = min(idle) - time.monotonic() if idle else 1.0
+            time.sleep(min(max(wait, 0.05), 1.0))
+
+
+# ----------------------------
+# Serving
+# ----------------------------
+
+class CacheHandler(SimpleHTTPRequestHandler):
+    """Serves the named files of the cache directory only: no listings, no temp files."""
+
+    max_age = 30
+    files = frozenset()         # file names in the cache directory that may be served
+
+    def send_head(self):
+        name = unquote(urlsplit(self.path).path).lstrip("/")
+        if name not in self.files or name.endswith(".tmp"):
+            self.send_error(404)
+            return None
+        return super().send_head()
+
+    def list_directory(self, path):
+        self.send_error(404)
+        return None
+
+    def end_headers(self):
+        self.send_header("Cache-Control", f"max-age={self.max_age}")
+        super().end_headers()
+
+    def log_message(self, fmt, *args):
+        pass
+
+
+def serve(cache_dir, port, files, max_age=30, bind="127.0.0.1"):
+    """Serve `files` (names in cache_dir) over HTTP on a background thread; returns the server."""
+    attrs = {"max_age": int(max_age), "files": frozenset(files)}
+    handler = functools.partial(type("Handler", (CacheHandler,), attrs), directory=cache_dir)
+    httpd = ThreadingHTTPServer((bind, port), handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, name="serve", daemon=True).start()
+    return httpd
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Mirror the APS status images into a local cache.")
+    parser.add_argument("--cache-dir", default="/net/joulefs/coulomb_Public/docroot/tomolog/mirror",
+                        help="Directory the mirrored files are written to.")
+    parser.add_argument("--config", default=None,
+                        help="JSON list of {source, out, period, page} (default: the APS images).")
+    parser.add_argument("--period", type=float, default=60.0,
+                        help="Default update period in seconds (fixed rate).")
+    parser.add_argument("--jitter", type=float, default=0.05,
+                        help="Random shift of each fetch, as a fraction of its period.")
+    parser.add_argument("--breaker-failures", type=int, default=3,
+                        help="Consecutive failures of a source before backing off from it.")
+    parser.add_argument("--breaker-backoff", type=float, default=300.0,
+                        help="Seconds to back off (doubles while the HEAD probe fails).")
+    parser.add_argument("--breaker-max", type=float, default=3600.0,
+                        help="Longest back-off in seconds.")
+    parser.add_argument("--page-recheck", type=float, default=3600.0,
+                        help="Seconds between checks of HTML pages for a new image URL.")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent fetches.")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT",
+                        help="Also serve the cache directory over HTTP on this port.")
+    parser.add_argument("--bind", default="127.0.0.1",
+                        help="Address --serve listens on (0.0.0.0: all interfaces).")
+    parser.add_argument("--max-age", type=int, default=30,
+                        help="Cache-Control max-age (seconds) of the served files.")
+    parser.add_argument("--archive", default=None, metavar="DIR",
+                        help="Also keep every distinct image in a content-addressed archive.")
+    parser.add_argument("--status", default=None, metavar="PATH",
+                        help="Write a status JSON here after every fetch (default: none). It "
+                             "holds host, pid and errors: keep it outside the cache directory.")
+    parser.add_argument("--once", action="store_true", help="Fetch everything once and exit.")
+    args = parser.parse_args()
+
+    archive = None
+    if args.archive:
+        from image_archive import ImageArchive
+        archive = ImageArchive(args.archive)
+    jobs = load_mirrors(args.config, period=args.period, page_recheck=args.page_recheck,
+                        jitter=args.jitter,
+                        breaker={"threshold": args.breaker_failures, "backoff": args.breaker_backoff,
+                                 "max_backoff": args.breaker_max})
+    if not args.once:
+        http_client.configure(retries=0)    # per-job breakers retry, not urllib3
+    os.makedirs(args.cache_dir, exist_ok=True)
+    status = StatusFile(args.status, name="web_mirror",
+                        outputs=[os.path.join(args.cache_dir, j.out) for j in jobs],
+                        period=min(j.period for j in jobs))
+    mirror = Mirror(jobs, args.cache_dir, workers=args.workers, archive=archive, status=status)
+    print(f"[{_stamp()}] mirroring {len(jobs)} sources into {os.path.abspath(args.cache_dir)}",
+          flush=True)
+    if args.serve:
+        files = [j.out for j in jobs]      # never the status JSON, even if it sits there
+        serve(args.cache_dir, args.serve, files, max_age=args.max_age, bind=args.bind)
+        print(f"[{_stamp()}] serving {len(files)} files on {args.bind}:{args.serve}", flush=True)
+
+    try:
+        if args.once:
+            mirror.run_once()
+        else:
+            mirror.run_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        mirror.pool.shutdown(wait=False)
+        http_client.close()
+
+
+if __name__ == "__main__":
+    main()
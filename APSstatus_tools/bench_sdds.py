@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# bench_sdds.py
+#
+# Decode-time benchmark: sdds_reader against the per-row loop of read_sdds_08.py
+# ("row loop") and, if installed, soliday.sdds (the reader of read_sdds_10.py).
+#
+# Synthetic binary files (written with sdds_reader.write, gzip like the APS files):
+#   mainstatus   Description + ValueString string columns, a few parameters
+#   mixed        Description (string) + Value (double) + Status (long) columns
+#   numeric      four double columns
+# at --rows rows each (default: 150, the size of mainStatus.sdds.gz, and 100000).
+# Real files can be added with --file (e.g. a downloaded mainStatus.sdds.gz).
+# Every decoder is checked against sdds_reader before it is timed.
+# A second table times the string decoder alone (one column of --rows strings):
+# a slice + decode per string (the loop of the older read_sdds_*.py scripts) against
+# strings.read_strings.
+#
+# Usage:
+#   python bench_sdds.py
+#   python bench_sdds.py --rows 150 1000 100000 --file mainStatus.sdds.gz --repeat 5
+#
+# Requirements:
+#   pip install numpy            (optional: pip install soliday.sdds)
+
+import argparse
+import gzip
+import os
+import tempfile
+import time
+
+import numpy as np
+
+import sdds_reader
+from sdds_reader.strings import pack_strings, read_strings
+from read_sdds_08 import parse_header_defs, read_i32_le, size_of_numeric
+
+try:
+    import sdds as soliday_sdds
+except ImportError:
+    soliday_sdds = None
+
+
+# ----------------------------
+# Decoders
+# ----------------------------
+
+def legacy_rows(data):
+    """The decode loop of read_sdds_08.py, without the printing."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    off, params, arrays, columns = parse_header_defs(data)
+    while off < len(data) and data[off] in (0x20, 0x09, 0x0A, 0x0D):
+        off += 1
+    nrows = read_i32_le(data, off)
+    off += 4
+    for p in params:
+        if p["type"] == "string":
+            L = read_i32_le(data, off); off += 4
+            data[off:off + L].decode("utf-8", errors="replace"); off += L
+        else:
+            off += size_of_numeric(p["type"])
+    for a in arrays:
+        nelems = read_i32_le(data, off); off += 4
+        if a["type"] == "string":
+            for _ in range(nelems):
+                L = read_i32_le(data, off); off += 4
+                data[off:off + L].decode("utf-8", errors="replace"); off += L
+        else:
+            off += size_of_numeric(a["type"]) * nelems
+    col_values = {c["name"]: [] for c in columns}
+    for _ in range(nrows):
+        for c in columns:
+            name, ctype = c["name"], c["type"]
+            if ctype == "string":
+                L = read_i32_le(data, off); off += 4
+                s = data[off:off + L].decode("utf-8", errors="replace"); off += L
+                col_values[name].append(s)
+            else:
+                sz = size_of_numeric(ctype)
+                col_values[name].append(data[off:off + sz]); off += sz     # left undecoded
+    return col_values
+
+
+def reader(data):
+    f = sdds_reader.loads(data)
+    return f.pages[0].columns
+
+
+def soliday(path):
+    s = soliday_sdds.load(path)
+    return {name: s.columnData[i][0] for i, name in enumerate(s.columnName)}
+
+
+def per_string(buf, off, count):
+    """One slice + decode per string, as the older read_sdds_*.py scripts did."""
+    values = []
+    for _ in range(count):
+        n = read_i32_le(buf, off); off += 4
+        values.append(buf[off:off + n].decode("utf-8", errors="replace")); off += n
+    return values, off
+
+
+def _same(a, b):
+    """Compare decoded columns (legacy numeric values are raw little-endian bytes)."""
+    for name, ref in b.items():
+        got = a[name]
+        if isinstance(ref, list):
+            if list(got) != ref:
+                return False
+        elif isinstance(got, list) and got and isinstance(got[0], bytes):
+            if b"".join(got) != ref.astype(ref.dtype.newbyteorder("<")).tobytes():
+                return False
+        elif not np.array_equal(np.asarray(got), ref):
+            return False
+    return True
+
+
+# ----------------------------
+# Files
+# ----------------------------
+
+def synthetic(kind, nrows, seed=0):
+    rng = np.random.default_rng(seed)
+    labels = [f"Label{i:06d}" for i in range(nrows)]
+    params = {"Time": 1.76e9, "OPSMessage": "Top-up, 200 mA, 324 bunches"}
+    if kind == "mainstatus":
+        columns = {"Description": labels,
+                   "ValueString": [f"{v:.4g}" for v in rng.random(nrows) * 200.0]}
+    elif kind == "mixed":
+        columns = {"Description": labels, "Value": rng.random(nrows),
+                   "Status": rng.integers(0, 4, nrows).astype(np.int32)}
+    else:
+        columns = {f"x{i}": rng.random(nrows) for i in range(4)}
+    return params, columns
+
+
+def best_ms(fn, arg, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        times.append(time.perf_counter() - t0)
+    return 1e3 * min(times)
+
+
+# ----------------------------
+# Main
+# ----------------------------
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark SDDS decoders.")
+    parser.add_argument("--rows", type=int, nargs="+", default=[150, 100000])
+    parser.add_argument("--kinds", nargs="+", default=["mainstatus", "mixed", "numeric"],
+                        choices=["mainstatus", "mixed", "numeric"])
+    parser.add_argument("--file", action="append", default=[], help="Also time this SDDS file.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per measurement (best is shown).")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_sdds_")
+    cases = []
+    for kind in args.kinds:
+        for n in args.rows:
+            path = os.path.join(tmp, f"{kind}_{n}.sdds.gz")
+            params, columns = synthetic(kind, n)
+            sdds_reader.write(path, parameters=params, columns=columns)
+            cases.append((f"{kind} ({n} rows)", path))
+    cases += [(os.path.basename(p), p) for p in args.file]
+
+    print(f"{'FILE':<28} {'DECODER':<14} {'MS':>10} {'SPEEDUP':>8}")
+    print(f"{'-' * 28} {'-' * 14} {'-' * 10} {'-' * 8}")
+    for label, path in cases:
+        with open(path, "rb") as f:
+            data = f.read()
+        ref = reader(data)
+        runs = [("row loop", legacy_rows, data), ("sdds_reader", reader, data)]
+        if soliday_sdds is not None:
+            runs.append(("soliday.sdds", soliday, path))
+        base = None
+        for name, fn, arg in runs:
+            try:
+                ok = _same(fn(arg), ref)
+            except Exception as e:
+                print(f"{label:<28} {name:<14} {'failed':>10}  {type(e).__name__}: {e}")
+                continue
+            ms = best_ms(fn, arg, args.repeat)
+            base = base or ms
+            note = "" if ok else "  (output differs)"
+            print(f"{label:<28} {name:<14} {ms:>10.2f} {base / ms:>7.1f}x{note}")
+
+    print(f"\n{'STRING COLUMN':<28} {'DECODER':<14} {'MS':>10} {'SPEEDUP':>8}")
+    print(f"{'-' * 28} {'-' * 14} {'-' * 10} {'-' * 8}")
+    for n in args.rows:
+        labels = synthetic("mainstatus", n)[1]["Description"]
+        for label, strs in ((f"ascii ({n} rows)", labels),
+                            (f"utf-8 ({n} rows)", [s + " \u00b5A" for s in labels])):
+            buf = pack_strings(strs)
+            base = None
+            for name, fn in (("per string", per_string), ("read_strings", read_strings)):
+                ok = fn(buf, 0, n)[0] == strs
+                ms = best_ms(lambda b: fn(b, 0, n), buf, args.repeat)
+                base = base or ms
+                note = "" if ok else "  (output differs)"
+                print(f"{label:<28} {name:<14} {ms:>10.2f} {base / ms:>7.1f}x{note}")
+
+    if soliday_sdds is None:
+        print("\n(soliday.sdds not installed: pip install soliday.sdds to include it)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,90 +1,22 @@
 #!/usr/bin/env python3
-import struct
 import numpy as np
 import argparse
 import sys
 
+import sdds_reader
+
 def read_sdds(filename):
     """
-    Reads both ASCII and binary SDDS files into a dictionary.
-    Supports standard SDDS numeric columns and parameters.
+    Reads ASCII and binary SDDS files (plain or gzip) into a dictionary:
+    columns of the first page (NumPy arrays, lists for string columns) and parameters.
     """
-
-    with open(filename, "rb") as f:
-        # Read header lines until &data
-        header_lines = []
-        while True:
-            line = f.readline().decode("utf-8", errors="ignore")
-            if not line:
-                raise ValueError("Missing &data section in SDDS file.")
-            header_lines.append(line.strip())
-            if line.strip().lower().startswith("&data"):
-                break
-
-        header = "\n".join(header_lines)
-
-        # Parse columns and parameters
-        columns = []
-        parameters = []
-        for line in header_lines:
-            l = line.lower()
-            if l.startswith("&column"):
-                name = line.split("name=")[1].split(",")[0].strip()
-                columns.append(name)
-            elif l.startswith("&parameter"):
-                name = line.split("name=")[1].split(",")[0].strip()
-                parameters.append(name)
-
-        # Detect mode
-        mode = "ascii"
-        for line in header_lines:
-            if "mode=" in line.lower():
-                mode = line.split("mode=")[1].split(",")[0].strip().lower()
-                break
-
-        if mode == "ascii":
-            text = f.read().decode("utf-8", errors="ignore").strip().split()
-            numbers = np.array([float(x) for x in text])
-        elif mode == "binary":
-            # Skip any whitespace or newlines before binary block
-            while True:
-                pos = f.tell()
-                b = f.read(1)
-                if not b or b not in b" \n\r\t":
-                    f.seek(pos)
-                    break
-
-            # Read the SDDS binary preamble (int32: number of rows)
-            try:
-                nrows = struct.unpack("<i", f.read(4))[0]
-            except Exception as e:
-                raise ValueError(f"Cannot read number of rows: {e}")
-
-            # Now read binary doubles for each column
-            ncols = len(columns)
-            expected = nrows * ncols
-            numbers = np.frombuffer(f.read(expected * 8), dtype="<f8")
-            if len(numbers) != expected:
-                raise ValueError(
-                    f"Binary size mismatch: expected {expected} doubles, got {len(numbers)}"
-                )
-        else:
-            raise ValueError(f"Unsupported SDDS data mode: {mode}")
-
-        # Organize into dictionary
-        data = {}
-        ncols = len(columns)
-        if ncols > 0:
-            nrows = len(numbers) // ncols
-            arr = numbers.reshape((nrows, ncols))
-            for i, col in enumerate(columns):
-                data[col] = arr[:, i]
-
-        # Placeholder for parameters
-        for p in parameters:
-            data[p] = None
-
-        return data
+    f = sdds_reader.load(filename, pages=1)
+    if not f.pages:
+        raise ValueError("SDDS file has no data pages.")
+    page = f.pages[0]
+    data = dict(page.columns)
+    data.update(page.parameters)
+    return data
 
 
 def main():
@@ -105,6 +37,8 @@ def main():
         v = data[k]
         if isinstance(v, np.ndarray):
             print(f"  {k}: array of shape {v.shape}")
+        elif isinstance(v, list):
+            print(f"  {k}: {len(v)} strings")
         else:
             print(f"  {k}: parameter")
     if args.show:
@@ -1,3 +1,7 @@
+# Kept as written: the per-row decode loop of this script is the "row loop" baseline
+# of bench_sdds.py (which imports parse_header_defs, read_i32_le and size_of_numeric).
+# To read SDDS files use sdds_reader (read_sdds.py, read_sdds_05..07, read_sdds_09).
+
 import gzip
 import re
 import sys
@@ -0,0 +1,39 @@
+# sdds_reader
+#
+# Self-contained reader for SDDS files (Self Describing Data Sets, the APS status
+# files: mainStatus.sdds.gz, MpsData.sdds, ...), replacing the per-script header
+# parsers of read_sdds*.py.
+#
+# - every SDDS type: double, float, long64, ulong64, long, ulong, short, ushort,
+#   longdouble, char, string
+# - parameters (including fixed_value), arrays (any number of dimensions) and columns
+# - binary (row- or column-major, little or big endian) and ASCII data, all pages
+# - plain or gzip-compressed; path, http(s) URL (through http_client), bytes or file
+# Numeric columns and arrays come back as NumPy arrays in native byte order, char as
+# str arrays, string columns as lists of str.
+#
+# Usage:
+#   import sdds_reader
+#   f = sdds_reader.load("mainStatus.sdds.gz")
+#   f.column_names                      # ['Description', 'ValueString', ...]
+#   f.column("Description")             # page 0
+#   f.pages[1].parameters["Time"]
+#   for page in f: page["ValueString"]
+#
+# Command line (summary of a file):
+#   python -m sdds_reader mainStatus.sdds.gz [--show]
+#
+# Requirements:
+#   pip install numpy
+#
+# Notes:
+# - The package is named sdds_reader so it does not shadow soliday.sdds ("import sdds"),
+#   which some of the older read_sdds_*.py scripts use.
+# - writer.write() produces small SDDS files for tests and benchmarks (bench_sdds.py).
+
+from .header import TYPES, Definition, SDDSHeader, parse_header
+from .reader import Page, SDDSFile, load, loads
+from .writer import write
+
+__all__ = ["TYPES", "Definition", "SDDSHeader", "parse_header",
+           "Page", "SDDSFile", "load", "loads", "write"]
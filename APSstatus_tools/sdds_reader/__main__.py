@@ -0,0 +1,40 @@
+import argparse
+
+import numpy as np
+
+from . import load
+
+
+def _describe(value):
+    if isinstance(value, np.ndarray):
+        return f"{value.dtype} array {value.shape}"
+    if isinstance(value, list):
+        return f"string x {len(value)}"
+    return repr(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m sdds_reader",
+                                     description="Summary of an SDDS file.")
+    parser.add_argument("source", help="SDDS file (plain or .gz) or http(s) URL.")
+    parser.add_argument("--show", action="store_true", help="Print the values too.")
+    parser.add_argument("--pages", type=int, default=None, help="Read at most this many pages.")
+    args = parser.parse_args()
+
+    f = load(args.source, pages=args.pages)
+    h = f.header
+    print(f"SDDS{h.version} {h.mode}{' column-major' if h.column_major else ''}, "
+          f"{h.endian} endian, {len(f.pages)} pages")
+    if h.description.get("text"):
+        print(f"Description: {h.description['text']}")
+    for d in h.parameters + h.arrays + h.columns:
+        print(f"  {d.kind:<9} {d.name!r:<32} {d.type}")
+    for i, page in enumerate(f.pages):
+        print(f"\nPage {i}: {page.nrows} rows")
+        for group in (page.parameters, page.arrays, page.columns):
+            for name, value in group.items():
+                print(f"  {name}: {value if args.show else _describe(value)}")
+
+
+if __name__ == "__main__":
+    main()
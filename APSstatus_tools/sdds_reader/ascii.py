@@ -0,0 +1,152 @@
+# ascii.py
+#
+# Decoding of ASCII SDDS pages (mode=ascii).
+#
+# Page layout: one line per parameter (except those with fixed_value), per array a line
+# with its dimensions followed by the elements, the row count (unless no_row_counts=1,
+# then the rows end at a blank line), then one row per line (or per lines_per_row
+# lines). Tokens are separated by whitespace; strings may be double-quoted with
+# backslash escapes. Lines starting with "!" are comments.
+#
+# The tokens of each numeric column are converted in one NumPy call.
+
+import re
+
+import numpy as np
+
+from .binary import fixed_value
+from .header import unescape
+
+_TOKEN = re.compile(r'"((?:[^"\\]|\\.)*)"|(\S+)')
+
+
+def tokens(line):
+    """Whitespace-separated tokens of a data line, quoted strings unescaped."""
+    if '"' not in line:
+        return line.split()
+    out = []
+    for m in _TOKEN.finditer(line):
+        quoted, bare = m.group(1), m.group(2)
+        out.append(bare if bare is not None else unescape(quoted))
+    return out
+
+
+class _Lines:
+    def __init__(self, text):
+        self.lines = text.splitlines()
+        self.i = 0
+
+    def next(self, keep_blank=False):
+        """Next data line (comments skipped, blank lines too unless keep_blank); None at EOF."""
+        while self.i < len(self.lines):
+            line = self.lines[self.i]
+            self.i += 1
+            s = line.strip()
+            if s.startswith("!"):
+                continue
+            if s or keep_blank:
+                return line
+        return None
+
+    def at_end(self):
+        """True if only blank and comment lines are left (those are consumed)."""
+        while self.i < len(self.lines):
+            s = self.lines[self.i].strip()
+            if s and not s.startswith("!"):
+                return False
+            self.i += 1
+        return True
+
+
+def _convert(values, d):
+    if d.type == "string":
+        return list(values)
+    if d.type == "char":
+        return np.array([v[:1] for v in values], dtype="U1")
+    dt = d.dtype()
+    if dt.kind in "iu":
+        try:
+            return np.array(values).astype(np.int64).astype(dt.newbyteorder("="))
+        except ValueError:
+            return np.array(values).astype(float).astype(dt.newbyteorder("="))
+    return np.array(values).astype(dt.newbyteorder("="))
+
+
+def _scalar(text, d):
+    return _convert([text], d)[0] if d.type != "string" else text
+
+
+def read_ascii_page(lines, header):
+    """(parameters, arrays, columns) of the next page of `lines` (_Lines)."""
+    parameters = {}
+    for d in header.parameters:
+        if d.fixed_value is not None:
+            parameters[d.name] = fixed_value(d)
+            continue
+        line = lines.next()
+        if line is None:
+            raise ValueError(f"SDDS ascii page ends before parameter {d.name}")
+        if d.type == "string":
+            s = line.strip()
+            parameters[d.name] = tokens(s)[0] if s.startswith('"') else s
+        else:
+            v = _scalar(tokens(line)[0], d)
+            parameters[d.name] = v.item() if hasattr(v, "item") else v
+
+    arrays = {}
+    for d in header.arrays:
+        dims = [int(x) for x in tokens(lines.next())[:d.dimensions]]
+        n = int(np.prod(dims))
+        values = []
+        while len(values) < n:
+            line = lines.next()
+            if line is None:
+                raise ValueError(f"SDDS ascii page ends inside array {d.name}")
+            values.extend(tokens(line))
+        a = _convert(values[:n], d)
+        if d.type == "string":
+            arrays[d.name] = a if len(dims) == 1 else np.array(a, dtype=object).reshape(dims)
+        else:
+            arrays[d.name] = a.reshape(dims)
+
+    ncols = len(header.columns)
+    rows = []
+    if header.no_row_counts:
+        while True:
+            line = lines.next(keep_blank=True)
+            if line is None or not line.strip():
+                break
+            row = tokens(line)
+            while len(row) < ncols:
+                more = lines.next()
+                if more is None:
+                    break
+                row.extend(tokens(more))
+            rows.append(row)
+    elif ncols:
+        line = lines.next()
+        nrows = int(tokens(line)[0]) if line is not None else 0
+        for _ in range(nrows):
+            row = []
+            while len(row) < ncols:
+                line = lines.next()
+                if line is None:
+                    raise ValueError("SDDS ascii page ends inside the table")
+                row.extend(tokens(line))
+            rows.append(row)
+
+    columns = {}
+    cols = list(zip(*rows)) if rows else [()] * ncols
+    for d, values in zip(header.columns, cols):
+        columns[d.name] = _convert(values, d)
+    return parameters, arrays, columns
+
+
+def read_ascii_pages(text, header, max_pages=None):
+    lines = _Lines(text)
+    # skip the additional header lines declared in &data
+    lines.i += int(header.data.get("additional_header_lines", 0) or 0)
+    pages = []
+    while not lines.at_end() and (max_pages is None or len(pages) < max_pages):
+        pages.append(read_ascii_page(lines, header))
+    return pages
@@ -0,0 +1,197 @@
+# binary.py
+#
+# Decoding of binary SDDS pages (mode=binary).
+#
+# Page layout: row count (int32; SDDS5 writes INT32_MIN then an int64 for large pages),
+# the parameters in header order (except those with fixed_value), the arrays (one int32
+# per dimension, then the elements), then the columns: row by row, or column by column
+# with column_major_order=1. Numbers are little endian unless the header says
+# "!# big-endian"; strings are an int32 length followed by the bytes.
+#
+# Vectorized where the layout allows it:
+#   - numeric arrays and column-major numeric columns: one np.frombuffer each
+#   - row-major pages without string columns: one structured np.frombuffer for all rows
+#   - string columns (either layout): see strings.py, one offset walk then a bulk
+#     gather + decode per column
+#   - row-major pages with string columns: one walk over the rows records where each
+#     string and each numeric run between two strings starts; every run is then
+#     gathered with NumPy and decoded with one np.frombuffer
+
+import math
+
+import numpy as np
+
+from .strings import decode_strings, gather, int32_views, read_string, read_strings, scan_strings
+
+INT32_MIN = -2 ** 31
+
+
+def native(arr):
+    """Copy of `arr` in native byte order; char (S1) becomes a str (U1) array."""
+    if arr.dtype.kind == "S":
+        return arr.astype("U1")
+    return arr.astype(arr.dtype.newbyteorder("="))
+
+
+def _scalar(buf, off, dtype):
+    v = np.frombuffer(buf, dtype=dtype, count=1, offset=off)[0]
+    return (v.decode("latin-1") if dtype.kind == "S" else v.item()), off + dtype.itemsize
+
+
+def fixed_value(d):
+    """Value of a parameter defined with fixed_value= (not stored in the pages)."""
+    text = d.fixed_value
+    if d.type == "string":
+        return text
+    if d.type == "char":
+        return text[:1]
+    if d.dtype().kind == "f":
+        return float(text)
+    return int(float(text)) if "." in text or "e" in text.lower() else int(text)
+
+
+def _row_count(buf, off, order):
+    i32 = np.dtype(f"{order}i4")
+    n = int(np.frombuffer(buf, dtype=i32, count=1, offset=off)[0])
+    off += 4
+    if n == INT32_MIN:
+        n = int(np.frombuffer(buf, dtype=np.dtype(f"{order}i8"), count=1, offset=off)[0])
+        off += 8
+    return n, off
+
+
+def _segments(columns, order):
+    """Row layout as runs: ("string", def) or ("numeric", structured dtype, [defs])."""
+    segs = []
+    run = []
+    for d in columns:
+        if d.type == "string":
+            if run:
+                segs.append(("numeric", _record(run, order), run))
+                run = []
+            segs.append(("string", d))
+        else:
+            run.append(d)
+    if run:
+        segs.append(("numeric", _record(run, order), run))
+    return segs
+
+
+def _record(defs, order):
+    return np.dtype({"names": [f"f{i}" for i in range(len(defs))],
+                     "formats": [d.dtype(order) for d in defs]})
+
+
+def _scan_rows(buf, off, nrows, sizes, order):
+    """(starts, lengths, offset after the rows): one (nrows, len(sizes)) pair of arrays.
+
+    sizes[k] is the byte size of segment k, or None for a string (its int32 length
+    prefix is read here, the start is that of the characters).
+    """
+    if all(size is None for size in sizes):            # strings only: one flat sequence
+        starts, lengths, off = scan_strings(buf, off, nrows * len(sizes), order)
+        shape = (nrows, len(sizes))
+        return starts.reshape(shape), lengths.reshape(shape), off
+    views = int32_views(buf, order)
+    ends = [0] * (nrows * len(sizes))
+    first = off
+    i = 0
+    try:
+        for _ in range(nrows):
+            for size in sizes:
+                if size is None:
+                    off += views[off & 3][off >> 2] + 4
+                else:
+                    off += size
+                ends[i] = off
+                i += 1
+    except IndexError:
+        raise ValueError(f"SDDS row data truncated at offset {off}") from None
+    if off > len(buf):
+        raise ValueError(f"SDDS row data truncated at offset {len(buf)}")
+    ends = np.array(ends, dtype=np.int64)
+    starts = np.empty_like(ends)
+    starts[:1] = first
+    starts[1:] = ends[:-1]
+    starts = starts.reshape(nrows, len(sizes))
+    starts += np.array([4 if size is None else 0 for size in sizes])
+    ends = ends.reshape(nrows, len(sizes))
+    return starts, ends - starts, off
+
+
+def _read_rows(buf, off, header, nrows, encoding):
+    """Row-major columns."""
+    order = header.order
+    segs = _segments(header.columns, order)
+    out = {}
+    if all(s[0] == "numeric" for s in segs):
+        for _, rec, defs in segs:                  # (a single run)
+            recs = np.frombuffer(buf, dtype=rec, count=nrows, offset=off)
+            off += rec.itemsize * nrows
+            for i, d in enumerate(defs):
+                out[d.name] = native(recs[f"f{i}"])
+        return out, off
+
+    # walk the rows once for the offsets, then gather each segment in bulk
+    sizes = [None if s[0] == "string" else s[1].itemsize for s in segs]
+    starts, lengths, off = _scan_rows(buf, off, nrows, sizes, order)
+    for k, s in enumerate(segs):
+        offsets, data = gather(buf, starts[:, k], lengths[:, k])
+        if s[0] == "string":
+            out[s[1].name] = decode_strings(offsets, data, encoding)
+        else:
+            recs = np.frombuffer(data, dtype=s[1], count=nrows)
+            for i, d in enumerate(s[2]):
+                out[d.name] = native(recs[f"f{i}"])
+    return {d.name: out[d.name] for d in header.columns}, off
+
+
+def _read_columns(buf, off, header, nrows, encoding):
+    """Column-major columns."""
+    out = {}
+    for d in header.columns:
+        if d.type == "string":
+            out[d.name], off = read_strings(buf, off, nrows, header.order, encoding)
+        else:
+            dt = d.dtype(header.order)
+            out[d.name] = native(np.frombuffer(buf, dtype=dt, count=nrows, offset=off))
+            off += dt.itemsize * nrows
+    return out, off
+
+
+def read_binary_page(buf, off, header, encoding="utf-8"):
+    """(parameters, arrays, columns, offset after the page) of the page at buf[off]."""
+    order = header.order
+    nrows, off = _row_count(buf, off, order)
+    if nrows < 0:
+        raise ValueError(f"bad SDDS row count {nrows} at offset {off - 4}")
+
+    parameters = {}
+    for d in header.parameters:
+        if d.fixed_value is not None:
+            parameters[d.name] = fixed_value(d)
+        elif d.type == "string":
+            parameters[d.name], off = read_string(buf, off, order, encoding)
+        else:
+            parameters[d.name], off = _scalar(buf, off, d.dtype(order))
+
+    arrays = {}
+    for d in header.arrays:
+        dims = tuple(int(x) for x in np.frombuffer(buf, dtype=f"{order}i4",
+                                                  count=d.dimensions, offset=off))
+        off += 4 * d.dimensions
+        n = math.prod(dims)
+        if d.type == "string":
+            values, off = read_strings(buf, off, n, order, encoding)
+            arrays[d.name] = values if len(dims) == 1 else \
+                np.array(values, dtype=object).reshape(dims)
+        else:
+            dt = d.dtype(order)
+            arrays[d.name] = native(np.frombuffer(buf, dtype=dt, count=n, offset=off)).reshape(dims)
+            off += dt.itemsize * n
+
+    if header.column_major:
+        columns, off = _read_columns(buf, off, header, nrows, encoding)
+    else:
+        columns, off = _read_rows(buf, off, header, nrows, encoding)
+    return parameters, arrays, columns, off
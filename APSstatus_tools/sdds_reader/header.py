@@ -0,0 +1,214 @@
+# header.py
+#
+# SDDS header: the "SDDSn" line, "!#" endianness comments and the namelists
+# (&description, &parameter, &array, &column, &data; &include/&associate are kept
+# but not used) up to and including the &data line.
+
+import re
+
+import numpy as np
+
+
+# SDDS type -> NumPy dtype (little endian; byte-swapped for big-endian files).
+# string has no fixed size: int32 length + bytes in binary mode.
+NUMERIC_TYPES = {
+    "double": "<f8",
+    "float": "<f4",
+    "long64": "<i8",
+    "ulong64": "<u8",
+    "long": "<i4",
+    "ulong": "<u4",
+    "short": "<i2",
+    "ushort": "<u2",
+    "char": "S1",
+}
+if np.dtype(np.longdouble).itemsize == 16:
+    NUMERIC_TYPES["longdouble"] = np.dtype(np.longdouble).newbyteorder("<").str
+TYPE_ALIASES = {"longlong": "long64", "ulonglong": "ulong64", "uchar": "char"}
+TYPES = tuple(NUMERIC_TYPES) + ("string",)
+
+
+class Definition:
+    """One &parameter, &array or &column definition."""
+
+    def __init__(self, kind, fields):
+        self.kind = kind
+        self.fields = fields
+        self.name = fields.get("name")
+        if not self.name:
+            raise ValueError(f"&{kind} without a name")
+        t = fields.get("type", "double").lower()
+        self.type = TYPE_ALIASES.get(t, t)
+        if self.type not in TYPES:
+            raise ValueError(f"&{kind} {self.name}: unsupported type {t!r}")
+        self.units = fields.get("units")
+        self.description = fields.get("description")
+        self.fixed_value = fields.get("fixed_value")    # parameters only
+        self.dimensions = int(fields.get("dimensions", 1))  # arrays only
+
+    def dtype(self, order="<"):
+        """NumPy dtype of a numeric definition in the file's byte order (None: string)."""
+        if self.type == "string":
+            return None
+        dt = np.dtype(NUMERIC_TYPES[self.type])
+        return dt if order == "<" or dt.itemsize == 1 else dt.newbyteorder(">")
+
+    def __repr__(self):
+        return f"Definition({self.kind} {self.name!r}, {self.type})"
+
+
+class SDDSHeader:
+    def __init__(self):
+        self.version = None
+        self.description = {}
+        self.parameters = []
+        self.arrays = []
+        self.columns = []
+        self.data = {}
+        self.other = []             # (&include / &associate ...) namelists, unused
+        self.endian = "little"
+        self.data_offset = 0        # byte offset of the first page
+
+    @property
+    def mode(self):
+        return self.data.get("mode", "binary").lower()
+
+    @property
+    def column_major(self):
+        return _flag(self.data.get("column_major_order"))
+
+    @property
+    def no_row_counts(self):
+        return _flag(self.data.get("no_row_counts"))
+
+    @property
+    def order(self):
+        return ">" if self.endian == "big" else "<"
+
+
+def _flag(value):
+    return value is not None and str(value).strip() not in ("", "0")
+
+
+# ----------------------------
+# Namelists
+# ----------------------------
+
+_ESCAPES = {"n": "\n", "t": "\t", "\\": "\\", '"': '"'}
+_GROUP = re.compile(r"&(\w+)")
+_SKIP = re.compile(r"[\s,]*")
+_PAIR = re.compile(r"(\w+)\s*=\s*")
+_BARE = re.compile(r"[^,\s&]*")
+
+
+def unescape(s):
+    """Undo SDDS/C-style backslash escapes of a quoted string."""
+    if "\\" not in s:
+        return s
+    return re.sub(r"\\(.)", lambda m: _ESCAPES.get(m.group(1), m.group(1)), s)
+
+
+def _quoted(text, i):
+    """Value of the quoted string starting at text[i] == '"', and the index after it."""
+    j = i + 1
+    while True:
+        k = text.find('"', j)
+        if k < 0:
+            raise ValueError("unterminated quoted string in SDDS header")
+        n = 0
+        while text[k - 1 - n] == "\\":
+            n += 1
+        if n % 2 == 0:
+            return unescape(text[i + 1:k]), k + 1
+        j = k + 1
+
+
+def parse_namelists(text):
+    """[(group, {field: value})] for every &group ... &end in `text`."""
+    out = []
+    i = 0
+    while True:
+        i = text.find("&", i)
+        if i < 0:
+            return out
+        m = _GROUP.match(text, i)
+        if m is None:
+            i += 1
+            continue
+        group = m.group(1).lower()
+        i = m.end()
+        fields = {}
+        while True:
+            i = _SKIP.match(text, i).end()
+            if text[i:i + 4].lower() == "&end":
+                i += 4
+                break
+            p = _PAIR.match(text, i)
+            if p is None:
+                raise ValueError(f"bad SDDS namelist near {text[i:i + 40]!r}")
+            key = p.group(1).lower()
+            i = p.end()
+            if text.startswith('"', i):
+                value, i = _quoted(text, i)
+            else:
+                b = _BARE.match(text, i)
+                value, i = b.group(0), b.end()
+            fields[key] = value
+        out.append((group, fields))
+
+
+def parse_header(data):
+    """SDDSHeader of `data` (bytes of the whole file, or at least of its header)."""
+    h = SDDSHeader()
+    first_nl = data.find(b"\n")
+    first = data[:first_nl if first_nl >= 0 else len(data)].strip()
+    if not first.startswith(b"SDDS"):
+        raise ValueError("not an SDDS file (no SDDSn first line)")
+    h.version = int(first[4:] or 1)
+
+    # header lines up to the one that closes &data
+    off = first_nl + 1
+    lines = []
+    in_data = False
+    while True:
+        nl = data.find(b"\n", off)
+        if nl < 0:
+            raise ValueError("SDDS header without a complete &data namelist")
+        line = data[off:nl].decode("latin-1").rstrip("\r")
+        off = nl + 1
+        stripped = line.strip()
+        if stripped.startswith("!"):
+            if stripped.startswith("!#"):
+                tag = stripped[2:].strip().lower()
+                if tag in ("big-endian", "little-endian"):
+                    h.endian = tag.split("-")[0]
+            continue
+        lines.append(line)
+        low = line.lower()
+        if not in_data and "&data" in low:
+            in_data = True
+            tail = low[low.find("&data"):]
+        elif in_data:
+            tail += "\n" + low
+        if in_data and "&end" in tail:
+            break
+    h.data_offset = off
+
+    for group, fields in parse_namelists("\n".join(lines)):
+        if group == "description":
+            h.description = fields
+        elif group == "parameter":
+            h.parameters.append(Definition("parameter", fields))
+        elif group == "array":
+            h.arrays.append(Definition("array", fields))
+        elif group == "column":
+            h.columns.append(Definition("column", fields))
+        elif group == "data":
+            h.data = fields
+        else:
+            h.other.append((group, fields))
+    if h.mode not in ("binary", "ascii"):
+        raise ValueError(f"unsupported SDDS data mode {h.mode!r}")
+    if h.mode == "binary" and "endian" in h.data:
+        h.endian = h.data["endian"].lower()
+    return h
@@ -0,0 +1,115 @@
+# reader.py
+#
+# load(): SDDS file (path, URL, bytes or file object; plain or gzip) -> SDDSFile.
+
+import gzip
+import os
+
+from .ascii import read_ascii_pages
+from .binary import read_binary_page
+from .header import parse_header
+
+
+class Page:
+    """One SDDS page: parameters, arrays and columns by name."""
+
+    def __init__(self, parameters, arrays, columns):
+        self.parameters = parameters
+        self.arrays = arrays
+        self.columns = columns
+
+    @property
+    def nrows(self):
+        return len(next(iter(self.columns.values()))) if self.columns else 0
+
+    def __getitem__(self, name):
+        for group in (self.columns, self.parameters, self.arrays):
+            if name in group:
+                return group[name]
+        raise KeyError(name)
+
+    def __contains__(self, name):
+        return name in self.columns or name in self.parameters or name in self.arrays
+
+    def __repr__(self):
+        return (f"Page({len(self.parameters)} parameters, {len(self.arrays)} arrays, "
+                f"{len(self.columns)} columns x {self.nrows} rows)")
+
+
+class SDDSFile:
+    """Header definitions and decoded pages of an SDDS file."""
+
+    def __init__(self, header, pages):
+        self.header = header
+        self.pages = pages
+
+    @property
+    def parameter_names(self):
+        return [d.name for d in self.header.parameters]
+
+    @property
+    def array_names(self):
+        return [d.name for d in self.header.arrays]
+
+    @property
+    def column_names(self):
+        return [d.name for d in self.header.columns]
+
+    def column(self, name, page=0):
+        return self.pages[page].columns[name]
+
+    def parameter(self, name, page=0):
+        return self.pages[page].parameters[name]
+
+    def array(self, name, page=0):
+        return self.pages[page].arrays[name]
+
+    def __len__(self):
+        return len(self.pages)
+
+    def __iter__(self):
+        return iter(self.pages)
+
+    def __getitem__(self, page):
+        return self.pages[page]
+
+    def __repr__(self):
+        return (f"SDDSFile(SDDS{self.header.version} {self.header.mode}, {len(self.pages)} pages, "
+                f"{len(self.header.columns)} columns)")
+
+
+def _read_source(source):
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, "read"):
+        return source.read()
+    source = os.fspath(source)
+    if source.startswith(("http://", "https://")):
+        import http_client          # sibling module of the APSstatus_tools scripts
+        r = http_client.get(source)
+        r.raise_for_status()
+        return r.content
+    with open(source, "rb") as f:
+        return f.read()
+
+
+def loads(data, pages=None, encoding="utf-8"):
+    """SDDSFile from the bytes of an SDDS file (gzip is detected); at most `pages` pages."""
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    header = parse_header(data)
+    if header.mode == "ascii":
+        text = data[header.data_offset:].decode(encoding, errors="replace")
+        return SDDSFile(header, [Page(*p) for p in read_ascii_pages(text, header, pages)])
+
+    out = []
+    off = header.data_offset
+    while len(data) - off >= 4 and (pages is None or len(out) < pages):
+        parameters, arrays, columns, off = read_binary_page(data, off, header, encoding)
+        out.append(Page(parameters, arrays, columns))
+    return SDDSFile(header, out)
+
+
+def load(source, pages=None, encoding="utf-8"):
+    """SDDSFile from a path, http(s) URL, bytes or binary file object."""
+    return loads(_read_source(source), pages=pages, encoding=encoding)
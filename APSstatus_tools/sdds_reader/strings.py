@@ -0,0 +1,139 @@
+# strings.py
+#
+# Length-prefixed strings of binary SDDS data: int32 length, then that many bytes.
+#
+# Bulk decoding in two steps instead of a slice + decode per string:
+#   1. walk the length prefixes in one tight loop over int32 memoryviews, which is
+#      all that is sequential (each offset depends on the previous length), recording
+#      where every string ends -> NumPy arrays of starts and lengths
+#   2. gather all string bytes with one NumPy take into a contiguous buffer
+#      (Arrow-style: offsets + data), decode that once and cut the str at the
+#      character offsets, computed with NumPy from the UTF-8 continuation bytes
+# Invalid UTF-8 (or an encoding other than UTF-8/ASCII/latin-1) falls back to
+# decoding string by string, with errors="replace" as before.
+
+import struct
+import sys
+
+import numpy as np
+
+_NATIVE = "<" if sys.byteorder == "little" else ">"
+_SINGLE_BYTE = {"ascii", "latin-1", "latin1", "iso-8859-1", "iso8859-1"}
+
+
+def read_string(buf, off, order="<", encoding="utf-8"):
+    """(str, offset after it) of the string at buf[off]."""
+    n = int.from_bytes(buf[off:off + 4], "little" if order == "<" else "big", signed=True)
+    off += 4
+    return buf[off:off + n].decode(encoding, errors="replace"), off + n
+
+
+class _Swapped:
+    """int32 (non-native byte order) at byte k + 4 * i of buf, for int32_views()."""
+
+    def __init__(self, buf, k, order):
+        self.unpack = struct.Struct(f"{order}i").unpack_from
+        self.buf = buf
+        self.k = k
+
+    def __getitem__(self, i):
+        try:
+            return self.unpack(self.buf, self.k + 4 * i)[0]
+        except struct.error:
+            raise IndexError(i) from None
+
+
+def int32_views(buf, order="<"):
+    """Four views of buf as int32: views[off & 3][off >> 2] is the int32 at byte off.
+
+    In native order (the usual little-endian files) these are zero-copy memoryview
+    casts, so reading a length prefix is one index operation, not a slice + unpack.
+    """
+    if order == _NATIVE:
+        m = memoryview(buf).cast("B")
+        return [m[k:k + (len(m) - k) // 4 * 4].cast("i") for k in range(4)]
+    return [_Swapped(buf, k, order) for k in range(4)]
+
+
+def scan_strings(buf, off, count, order="<"):
+    """(starts, lengths, offset after them) of `count` consecutive strings at buf[off]."""
+    views = int32_views(buf, order)
+    ends = [0] * count
+    first = off
+    try:
+        for i in range(count):
+            off += views[off & 3][off >> 2] + 4
+            ends[i] = off
+    except IndexError:
+        raise ValueError(f"SDDS string data truncated at offset {off}") from None
+    if off > len(buf):
+        raise ValueError(f"SDDS string data truncated at offset {len(buf)}")
+    ends = np.array(ends, dtype=np.int64)
+    starts = np.empty_like(ends)
+    starts[:1] = first
+    starts[1:] = ends[:-1]
+    starts += 4
+    return starts, ends - starts, off
+
+
+def gather(buf, starts, lengths):
+    """(offsets, data): the strings at starts/lengths as one buffer, Arrow style.
+
+    String i is data[offsets[i]:offsets[i + 1]].
+    """
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    if len(lengths) and (lengths < 0).any():
+        raise ValueError("negative SDDS string length")
+    total = int(offsets[-1])
+    if total == 0:
+        return offsets, b""
+    # byte j of the output comes from buf[j + shift], shift constant within a string
+    shift = np.repeat(starts - offsets[:-1], lengths)
+    index = np.arange(total, dtype=np.int64)
+    index += shift
+    data = np.frombuffer(buf, dtype=np.uint8).take(index).tobytes()
+    return offsets, data
+
+
+def decode_strings(offsets, data, encoding="utf-8"):
+    """[str] of an offsets + data buffer (see gather())."""
+    bounds = offsets.tolist()
+    codec = encoding.lower().replace("_", "-")
+    if codec in _SINGLE_BYTE or codec in ("utf-8", "utf8"):
+        try:
+            text = data.decode(encoding)
+        except UnicodeDecodeError:
+            text = None
+        if text is not None and len(text) != len(data):
+            # a character split across two strings decodes as a whole but not per string
+            u8 = np.frombuffer(data, dtype=np.uint8)
+            firsts = offsets[:-1][offsets[:-1] < len(u8)]
+            if ((u8[firsts] & 0xC0) == 0x80).any():
+                text = None
+        if text is not None:
+            if len(text) != len(data):
+                # UTF-8 multi-byte characters: char offset = byte offset - number of
+                # continuation bytes (10xxxxxx) before it
+                cont = np.zeros(len(u8) + 1, dtype=np.int64)
+                np.cumsum((u8 & 0xC0) == 0x80, out=cont[1:])
+                bounds = (offsets - cont[offsets]).tolist()
+            return [text[a:b] for a, b in zip(bounds, bounds[1:])]
+    return [data[a:b].decode(encoding, errors="replace") for a, b in zip(bounds, bounds[1:])]
+
+
+def read_strings(buf, off, count, order="<", encoding="utf-8"):
+    """([str] * count, offset after them) of `count` consecutive strings at buf[off]."""
+    starts, lengths, off = scan_strings(buf, off, count, order)
+    return decode_strings(*gather(buf, starts, lengths), encoding), off
+
+
+def pack_strings(strings, order="<", encoding="utf-8"):
+    """Bytes of `strings` as consecutive length-prefixed SDDS strings."""
+    i32 = np.dtype(f"{order}i4")
+    parts = []
+    for s in strings:
+        b = s.encode(encoding)
+        parts.append(np.array(len(b), dtype=i32).tobytes())
+        parts.append(b)
+    return b"".join(parts)
@@ -0,0 +1,170 @@
+# writer.py
+#
+# Minimal SDDS writer (binary or ASCII), used to make test and benchmark files.
+#
+#   write("out.sdds", columns={"Description": [...], "Value": np.arange(10.0)},
+#         parameters={"Time": 1.7e9}, mode="binary")
+#   write("out.sdds.gz", pages=[{"columns": {...}}, {"columns": {...}}])
+#
+# Types are taken from the values (str -> string, NumPy dtypes -> the matching SDDS
+# type, Python int -> long64, float -> double) unless given in `types`.
+
+import gzip
+import math
+
+import numpy as np
+
+from .header import NUMERIC_TYPES
+from .strings import pack_strings
+
+_BY_DTYPE = {np.dtype(v).str.lstrip("<>|="): k for k, v in NUMERIC_TYPES.items() if k != "char"}
+
+
+def sdds_type(value):
+    """SDDS type name of a parameter value or of a column/array's values."""
+    if isinstance(value, str):
+        return "string"
+    if isinstance(value, bool):
+        return "short"
+    if isinstance(value, int):
+        return "long64"
+    if isinstance(value, float):
+        return "double"
+    a = np.asarray(value)
+    if a.dtype.kind == "S" and a.dtype.itemsize == 1:
+        return "char"
+    if a.dtype.kind in "USO":
+        return "string"
+    if a.dtype.kind == "b":
+        return "short"
+    return _BY_DTYPE[a.dtype.str.lstrip("<>|=")]
+
+
+def _escape(s):
+    return '"' + s.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"'
+
+
+def _field(v):
+    v = str(v)
+    return _escape(v) if not v or any(c in v for c in ' ,&"\\\t') else v
+
+
+def _namelist(group, fields):
+    body = ", ".join(f"{k}={_field(v)}" for k, v in fields.items() if v is not None)
+    return f"&{group} {body}, &end\n"
+
+
+def _dtype(t, order):
+    dt = np.dtype(NUMERIC_TYPES[t])
+    return dt if order == "<" or dt.itemsize == 1 else dt.newbyteorder(">")
+
+
+def write(target, columns=None, parameters=None, arrays=None, pages=None, types=None,
+          mode="binary", column_major=False, endian="little", description=None,
+          compress=None):
+    """Write an SDDS file; `pages` (list of {"parameters", "arrays", "columns"}) or one page."""
+    if pages is None:
+        pages = [{"parameters": parameters or {}, "arrays": arrays or {}, "columns": columns or {}}]
+    types = dict(types or {})
+    first = pages[0]
+    for group in ("parameters", "arrays", "columns"):
+        for name, value in first.get(group, {}).items():
+            types.setdefault(name, sdds_type(value))
+    order = ">" if endian == "big" else "<"
+
+    head = ["SDDS1\n"]
+    if mode == "binary":
+        head.append(f"!# {endian}-endian\n")
+    if description:
+        head.append(_namelist("description", {"text": description}))
+    for name in first.get("parameters", {}):
+        head.append(_namelist("parameter", {"name": name, "type": types[name]}))
+    for name, value in first.get("arrays", {}).items():
+        head.append(_namelist("array", {"name": name, "type": types[name],
+                                        "dimensions": np.ndim(value) or 1}))
+    for name in first.get("columns", {}):
+        head.append(_namelist("column", {"name": name, "type": types[name]}))
+    head.append(_namelist("data", {"mode": mode,
+                                   "column_major_order": 1 if column_major else None}))
+    out = ["".join(head).encode("latin-1")]
+    for page in pages:
+        if mode == "binary":
+            out.append(_binary_page(page, types, order, column_major))
+        else:
+            out.append(_ascii_page(page, types).encode("utf-8"))
+    data = b"".join(out)
+
+    if compress is None:
+        compress = str(target).endswith(".gz")
+    if compress:
+        data = gzip.compress(data, compresslevel=6)
+    if hasattr(target, "write"):
+        target.write(data)
+    else:
+        with open(target, "wb") as f:
+            f.write(data)
+    return len(data)
+
+
+def _binary_page(page, types, order, column_major):
+    i32 = np.dtype(f"{order}i4")
+    cols = page.get("columns", {})
+    nrows = len(next(iter(cols.values()))) if cols else 0
+    parts = [np.array(nrows, dtype=i32).tobytes()]
+    for name, v in page.get("parameters", {}).items():
+        t = types[name]
+        parts.append(pack_strings([v], order) if t == "string" else
+                     np.array(v, dtype=_dtype(t, order)).tobytes())
+    for name, v in page.get("arrays", {}).items():
+        t = types[name]
+        a = np.asarray(v, dtype=object if t == "string" else _dtype(t, order))
+        dims = a.shape or (1,)
+        parts.append(np.array(dims, dtype=i32).tobytes())
+        parts.append(pack_strings(list(a.ravel()), order) if t == "string" else a.tobytes())
+    if column_major:
+        for name, v in cols.items():
+            t = types[name]
+            parts.append(pack_strings(list(v), order) if t == "string" else
+                         np.asarray(v, dtype=_dtype(t, order)).tobytes())
+    elif all(types[n] != "string" for n in cols):
+        rec = np.empty(nrows, dtype=[(n, _dtype(types[n], order)) for n in cols])
+        for n, v in cols.items():
+            rec[n] = v
+        parts.append(rec.tobytes())
+    else:
+        cells = [[pack_strings([x], order) for x in v] if types[n] == "string" else
+                 _cells(np.asarray(v, dtype=_dtype(types[n], order))) for n, v in cols.items()]
+        parts.append(b"".join(b"".join(row) for row in zip(*cells)))
+    return b"".join(parts)
+
+
+def _cells(a):
+    # (not a scalar's tobytes(): NumPy scalars are always in native byte order)
+    size = a.dtype.itemsize
+    raw = a.tobytes()
+    return [raw[i:i + size] for i in range(0, len(raw), size)]
+
+
+def _ascii_value(x, t):
+    if t in ("string", "char"):
+        return _escape(str(x.decode("latin-1") if isinstance(x, bytes) else x))
+    if t in ("double", "float", "longdouble"):
+        return repr(float(x)) if math.isfinite(float(x)) else str(float(x))
+    return str(int(x))
+
+
+def _ascii_page(page, types):
+    lines = []
+    for name, v in page.get("parameters", {}).items():
+        lines.append(_ascii_value(v, types[name]))
+    for name, v in page.get("arrays", {}).items():
+        a = np.asarray(v, dtype=object)
+        lines.append(" ".join(str(d) for d in (a.shape or (1,))))
+        lines.append(" ".join(_ascii_value(x, types[name]) for x in a.ravel()))
+    cols = page.get("columns", {})
+    if cols:
+        nrows = len(next(iter(cols.values())))
+        lines.append(str(nrows))
+        for row in zip(*cols.values()):
+            lines.append(" ".join(_ascii_value(x, types[n]) for x, n in zip(row, cols)))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,17 @@
+#!/usr/bin/env python3
+# http_client.py
+#
+# Loads the shared HTTP client, ../APSstatus_beamlines/http_client.py, so the scripts of
+# this directory keep using `import http_client` while there is one copy to maintain.
+
+import importlib.util
+import os
+import sys
+
+_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir,
+                     "APSstatus_beamlines", "http_client.py")
+
+_spec = importlib.util.spec_from_file_location(__name__, os.path.normpath(_PATH))
+_module = importlib.util.module_from_spec(_spec)
+sys.modules[__name__] = _module
+_spec.loader.exec_module(_module)
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import requests
+import http_client
 import json
 import sys
 
@@ -10,7 +10,7 @@ def fetch_status(beamline_name: str):
     Fetch design content for the given beamline, e.g. 'ID14'.
     """
     params = {"name": f"mstatus|{beamline_name}"}
-    resp = requests.get(BASE_URL, params=params)
+    resp = http_client.get(BASE_URL, params=params)
     resp.raise_for_status()
     data = resp.json()
 
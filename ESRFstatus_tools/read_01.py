@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import requests
+import http_client
 import json
 import time
 
@@ -7,7 +7,7 @@ BASE_URL = "https://mstatus.esrf.fr/jyse/rest/player/designs/content"
 
 def try_design(name_param: str):
     params = {"name": name_param}
-    r = requests.get(BASE_URL, params=params)
+    r = http_client.get(BASE_URL, params=params)
     # Some servers use 200 with empty array when not found; some 404.
     if r.status_code != 200:
         return None
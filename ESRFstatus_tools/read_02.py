@@ -1,10 +1,10 @@
 import json
-import requests
+import http_client
 
 BASE_URL = "https://mstatus.esrf.fr/jyse/rest/player/designs/content"
 
 def fetch_design(beamline: str):
-    resp = requests.get(BASE_URL, params={"name": f"mstatus|{beamline}"})
+    resp = http_client.get(BASE_URL, params={"name": f"mstatus|{beamline}"})
     resp.raise_for_status()
     data = resp.json()
     inner = json.loads(data[0]["content"])
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import requests
+import http_client
 import json
 import time
 
@@ -27,7 +27,7 @@ def fetch_design_content(beamline_name: str):
     Returns the inner JSON object from the 'content' field, or None if not found.
     """
     params = {"name": f"mstatus|{beamline_name}"}
-    r = requests.get(BASE_URL, params=params)
+    r = http_client.get(BASE_URL, params=params)
     if r.status_code != 200:
         return None
 
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import requests
+import http_client
 import json
 
 BASE_URL = "https://mstatus.esrf.fr/jyse/rest/player/designs/content"
@@ -10,7 +10,7 @@ CANDIDATES = [
 
 def try_design(name_param: str):
     params = {"name": f"mstatus|{name_param}"}
-    r = requests.get(BASE_URL, params=params)
+    r = http_client.get(BASE_URL, params=params)
     if r.status_code != 200:
         return None
     try:
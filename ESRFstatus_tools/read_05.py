@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import requests
+import http_client
 import json
 
 BASE_URL = "https://mstatus.esrf.fr/jyse/rest/player/designs/content"
@@ -8,7 +8,7 @@ FACADE_NAME = "mstatus|Facade_SMARTPHONE_Lite"
 
 def fetch_design(name_param: str):
     params = {"name": name_param}
-    resp = requests.get(BASE_URL, params=params)
+    resp = http_client.get(BASE_URL, params=params)
     resp.raise_for_status()
     outer = resp.json()
     if not outer:
@@ -1,5 +1,5 @@
 #!/usr/bin/env python3
-import requests
+import http_client
 import json
 
 BASE_URL = "https://mstatus.esrf.fr/jyse/rest/player/designs/content"
@@ -21,7 +21,7 @@ LABEL_MAP = {
 
 def fetch_facade():
     params = {"name": FACADE_NAME}
-    resp = requests.get(BASE_URL, params=params)
+    resp = http_client.get(BASE_URL, params=params)
     resp.raise_for_status()
     outer = resp.json()
     if not outer: